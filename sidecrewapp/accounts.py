@@ -0,0 +1,86 @@
+"""
+Registration, login and approval of client, worker and agent accounts.
+
+The email, password hash and status of every role live in one Account
+table, unique on (email, role). Registering is a single insert guarded by
+that index, with no exists() query first, and logging in is one indexed
+lookup whatever the role. The Client / Worker / Agent row is the profile;
+it keeps copies of `email` and `status` for the pages and queries that
+already read them (e.g. only approved agents are offered to clients), and
+the functions here change both rows together.
+"""
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+
+from .adminstats import invalidate_admin_stats
+from .models import Account
+from .principals import ROLE_MODELS
+
+
+class EmailTaken(ValueError):
+    pass
+
+
+def create_account(role, email, password, **profile_fields):
+    """
+    Creates the Account and the profile for `role`, both pending approval.
+    Returns the profile; raises EmailTaken when the email is already
+    registered for this role.
+    """
+    with transaction.atomic():
+        try:
+            # Own savepoint: the IntegrityError must not break the outer block
+            with transaction.atomic():
+                account = Account.objects.create(role=role, email=email, password=make_password(password))
+        except IntegrityError:
+            raise EmailTaken("Email already registered")
+        # Inserted after the account, so a taken email never stores the picture
+        profile = ROLE_MODELS[role].objects.create(
+            account=account, email=email, status=account.status, **profile_fields
+        )
+        invalidate_admin_stats()
+        return profile
+
+
+def get_account(role, email):
+    """
+    The account for a login form, with its profile. Raises
+    Account.DoesNotExist like .get().
+    """
+    return Account.objects.select_related(role).get(role=role, email=email)
+
+
+def log_in(request, account):
+    profile = getattr(account, account.role)
+    request.session['is_loggedin'] = True
+    request.session[f'{account.role}_id'] = profile.id
+    request.session['user_role'] = account.role
+    request.session[f'{account.role}_name'] = profile.name
+    return profile
+
+
+def set_status(profile, status):
+    """
+    Approves or rejects a client / worker / agent.
+    """
+    with transaction.atomic():
+        profile.status = status
+        profile.save(update_fields=['status'])
+        Account.objects.filter(pk=profile.account_id).update(status=status)
+        invalidate_admin_stats()
+
+
+def change_email(profile, email):
+    """
+    Moves the account to `email` and sets it on `profile`; the caller
+    saves the profile. Raises EmailTaken when another account of the same
+    role already uses it.
+    """
+    if email == profile.email:
+        return
+    try:
+        with transaction.atomic():
+            Account.objects.filter(pk=profile.account_id).update(email=email)
+    except IntegrityError:
+        raise EmailTaken("This email address is already in use by another account.")
+    profile.email = email
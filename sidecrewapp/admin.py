@@ -1,8 +1,9 @@
 from django.contrib import admin
 from .models import *
 
+admin.site.register(Account)
 admin.site.register(Client)
 admin.site.register(Worker)
 admin.site.register(Agent)
 
-
+admin.site.register(Task)
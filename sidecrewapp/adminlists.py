@@ -0,0 +1,114 @@
+"""
+Paginated, searchable admin lists with bulk approve / reject / delete.
+
+The client, worker, agent and job lists are read one page at a time with
+keyset pagination (pagination.py) in index order: profiles by status,
+then name (the (status, name) indexes), jobs newest first. Search is a
+prefix match on name or email (job title for jobs), i.e. LIKE 'abc%',
+which an index can serve where a substring match could not. A page costs
+the same with a thousand workers or a million.
+
+Bulk actions change every selected row with one UPDATE or DELETE per
+table instead of a save() per row. Queryset updates send no signals, so
+the caches those rows appear in are dropped here.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .adminstats import invalidate_admin_stats
+from .dashboard import invalidate_agent_dashboard, invalidate_all_dashboards, invalidate_job_board
+from .geo import agent_coordinates
+from .models import Account, Job
+from .pagination import keyset_page
+from .principals import ROLE_MODELS, invalidate_principal
+
+ADMIN_PAGE_SIZE = getattr(settings, 'ADMIN_PAGE_SIZE', 50)
+MAX_BULK_ACTION = 500
+
+APPROVE = 'approve'
+REJECT = 'reject'
+DELETE = 'delete'
+ACTION_STATUS = {APPROVE: 'approved', REJECT: 'rejected'}
+
+
+def profile_page(role, status='', query='', cursor=None):
+    """
+    One page of clients / workers / agents. Returns (items, next_cursor);
+    raises InvalidCursor for a cursor from another filter.
+    """
+    profiles = ROLE_MODELS[role].objects.all()
+    fields = ('status', 'name', 'id')
+    if status:
+        profiles = profiles.filter(status=status)
+        fields = ('name', 'id')
+    if query:
+        profiles = profiles.filter(Q(name__istartswith=query) | Q(email__istartswith=query))
+    return keyset_page(profiles, cursor, fields=fields, page_size=ADMIN_PAGE_SIZE, descending=False)
+
+
+def job_page(status='', query='', cursor=None):
+    """
+    One page of jobs, newest first. Returns (items, next_cursor).
+    """
+    jobs = Job.objects.select_related('client', 'agent')
+    if status:
+        jobs = jobs.filter(status=status)
+    if query:
+        jobs = jobs.filter(title__istartswith=query)
+    return keyset_page(jobs, cursor, fields=('created_at', 'id'), page_size=ADMIN_PAGE_SIZE)
+
+
+def bulk_set_status(role, ids, status):
+    """
+    Approves or rejects the given clients / workers / agents. Returns the
+    number of profiles changed.
+    """
+    model = ROLE_MODELS[role]
+    with transaction.atomic():
+        changed = list(model.objects.filter(pk__in=ids).exclude(status=status).values_list('pk', flat=True))
+        if not changed:
+            return 0
+        model.objects.filter(pk__in=changed).update(status=status)
+        Account.objects.filter(**{f'{role}__in': changed}).update(status=status)
+
+        for pk in changed:
+            invalidate_principal(role, pk)
+        invalidate_admin_stats()
+        if role == 'agent':
+            transaction.on_commit(agent_coordinates.invalidate)
+    return len(changed)
+
+
+def bulk_delete(role, ids):
+    """
+    Deletes the given clients / workers / agents with their accounts, and
+    everything that cascades from them. Returns the number of profiles
+    deleted.
+    """
+    model = ROLE_MODELS[role]
+    with transaction.atomic():
+        # Deleting the accounts cascades to the profiles; the post_delete
+        # signals release their pictures and drop the cached principals
+        _, deleted = Account.objects.filter(**{f'{role}__in': ids}).delete()
+        # Profiles without an account (created outside the register views)
+        _, orphans = model.objects.filter(pk__in=ids).delete()
+        count = deleted.get(model._meta.label, 0) + orphans.get(model._meta.label, 0)
+        if count:
+            invalidate_all_dashboards()
+    return count
+
+
+def bulk_delete_jobs(ids):
+    """
+    Deletes the given jobs with their postings, applications and proofs.
+    Returns the number of jobs deleted.
+    """
+    with transaction.atomic():
+        agent_ids = set(Job.objects.filter(pk__in=ids).values_list('agent_id', flat=True))
+        _, deleted = Job.objects.filter(pk__in=ids).delete()
+        for agent_id in agent_ids:
+            invalidate_agent_dashboard(agent_id)
+        invalidate_job_board()
+        invalidate_admin_stats()
+    return deleted.get(Job._meta.label, 0)
@@ -0,0 +1,96 @@
+"""
+Statistics snapshot for the admin dashboard (admin_home).
+
+The numbers come from one conditional aggregate per table (accounts, jobs,
+applications) and are cached together as a snapshot. The snapshot lives
+for ADMIN_STATS_CACHE_TIMEOUT seconds; approvals, rejections, deletes and
+new registrations bump its version, so the counts an admin acts on are
+never behind. Job status and payment changes are only picked up when the
+snapshot expires.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .cacheversions import bump_version, get_version
+from .models import Account, Application, Job
+
+ADMIN_STATS_CACHE_TIMEOUT = getattr(settings, 'ADMIN_STATS_CACHE_TIMEOUT', 60)
+
+ROLES = ('client', 'worker', 'agent')
+ACCOUNT_STATUSES = ('pending', 'approved', 'rejected')
+# SEEKING_AGENT is the default status but not one of the model's choices
+JOB_STATUSES = [('SEEKING_AGENT', 'Seeking Agent')] + Job.JOB_STATUS_CHOICES
+
+
+def _key():
+    return f"adminstats:{get_version('adminstats:version')}"
+
+
+def invalidate_admin_stats():
+    transaction.on_commit(lambda: bump_version('adminstats:version'))
+
+
+def _account_counts():
+    aggregates = {f'{role}_count': Count('id', filter=Q(role=role)) for role in ROLES}
+    for role in ROLES:
+        for status in ACCOUNT_STATUSES:
+            aggregates[f'{role}_{status}'] = Count('id', filter=Q(role=role, status=status))
+    return Account.objects.aggregate(**aggregates)
+
+
+def _job_counts():
+    aggregates = {'total': Count('id')}
+    for status, _ in JOB_STATUSES:
+        aggregates[f'status_{status}'] = Count('id', filter=Q(status=status))
+    for status, _ in Job.CLIENT_PAYMENT_CHOICES:
+        aggregates[f'payment_{status}'] = Count('id', filter=Q(client_payment_status=status))
+    return Job.objects.aggregate(**aggregates)
+
+
+def _payout_counts():
+    aggregates = {}
+    for status, _ in Application.WORKER_PAYMENT_CHOICES:
+        aggregates[status] = Count('id', filter=Q(worker_payment_status=status))
+    return Application.objects.filter(status='COMPLETED').aggregate(**aggregates)
+
+
+def build_admin_stats():
+    accounts = _account_counts()
+    jobs = _job_counts()
+    payouts = _payout_counts()
+    return {
+        'client_count': accounts['client_count'],
+        'worker_count': accounts['worker_count'],
+        'agent_count': accounts['agent_count'],
+        'pending_clients': accounts['client_pending'],
+        'pending_workers': accounts['worker_pending'],
+        'pending_agents': accounts['agent_pending'],
+        'account_breakdown': [
+            (role, [(status, accounts[f'{role}_{status}']) for status in ACCOUNT_STATUSES])
+            for role in ROLES
+        ],
+        'total_jobs': jobs['total'],
+        'job_status_breakdown': [(label, jobs[f'status_{status}']) for status, label in JOB_STATUSES],
+        'client_payment_breakdown': [
+            (label, jobs[f'payment_{status}']) for status, label in Job.CLIENT_PAYMENT_CHOICES
+        ],
+        'worker_payout_breakdown': [
+            (label, payouts[status]) for status, label in Application.WORKER_PAYMENT_CHOICES
+        ],
+        'stats_generated_at': timezone.now(),
+    }
+
+
+def get_admin_stats():
+    """
+    Returns the admin_home context, from the cached snapshot when possible.
+    """
+    key = _key()
+    stats = cache.get(key)
+    if stats is None:
+        stats = build_admin_stats()
+        cache.set(key, stats, ADMIN_STATS_CACHE_TIMEOUT)
+    return stats
@@ -0,0 +1,114 @@
+"""
+Async JSON endpoints behind the map and the worker job feed.
+
+Under ASGI (sidecrewproject/asgi.py) these views wait on the database
+without holding a worker thread, so a burst of map clicks does not queue
+up behind a fixed thread pool. The ORM calls use the async queryset API
+(`async for`, ain_bulk()); the NumPy distance pass runs in a small
+thread pool of its own so it never blocks the event loop. Under WSGI
+Django runs them through async_to_sync and they answer the same.
+
+When the browser gives up on a request (create_job.html aborts the
+previous lookup as soon as the user picks another spot on the map) the
+ASGI handler cancels the view: the CancelledError is raised at the next
+await, so the queries after it are never sent.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+
+from .geo import agent_coordinates, points_within
+from .models import Agent
+from .pagination import InvalidCursor, akeyset_page
+from .views import WORKER_FEED_PAGE_SIZE, available_postings
+
+# Radius of the nearby-agent search on create_job
+AGENT_SEARCH_RADIUS_KM = 50
+
+# Threads for the distance math; NumPy releases the GIL while it runs
+API_DISTANCE_THREADS = getattr(settings, 'API_DISTANCE_THREADS', 4)
+
+_distance_pool = ThreadPoolExecutor(max_workers=API_DISTANCE_THREADS, thread_name_prefix='distance')
+
+
+async def _logged_in_id(request, role):
+    """
+    The id of the logged-in `role` user from the session, or None.
+    """
+    if not await request.session.aget('is_loggedin') or await request.session.aget('user_role') != role:
+        return None
+    return await request.session.aget(f'{role}_id')
+
+
+async def agents_near(request):
+    """
+    JSON list of approved agents within AGENT_SEARCH_RADIUS_KM of
+    ?lat=&lng=, nearest first. For logged-in clients only.
+    """
+    if await _logged_in_id(request, 'client') is None:
+        return JsonResponse({'error': 'You must be logged in as a client'}, status=403)
+
+    try:
+        job_lat = float(request.GET.get('lat'))
+        job_lng = float(request.GET.get('lng'))
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'Invalid location data'}, status=400)
+    if not (-90 <= job_lat <= 90 and -180 <= job_lng <= 180):
+        return JsonResponse({'error': 'Invalid location data'}, status=400)
+
+    # Usually already in memory; a reload queries the database, so it
+    # stays on the thread that owns the connection
+    arrays = await sync_to_async(agent_coordinates.arrays)()
+    matches = await asyncio.get_running_loop().run_in_executor(
+        _distance_pool, points_within, arrays, job_lat, job_lng, AGENT_SEARCH_RADIUS_KM
+    )
+    agents = await Agent.objects.filter(
+        id__in=[agent_id for agent_id, _ in matches],
+        status='approved'
+    ).only('id', 'name', 'agency_name', 'rating').ain_bulk()
+
+    nearby_agents = []
+    for agent_id, distance in matches:
+        agent = agents.get(agent_id)
+        if agent is None:
+            continue
+        nearby_agents.append({
+            'id': agent.id,
+            'name': agent.name,
+            'agency_name': agent.agency_name,
+            'rating': agent.rating,
+            'distance': f"{distance:.1f}"
+        })
+
+    return JsonResponse({'agents': nearby_agents})
+
+
+async def worker_job_feed(request):
+    """
+    Infinite-scroll endpoint for the "Available Jobs" list on worker_home.
+    """
+    worker_id = await _logged_in_id(request, 'worker')
+    if worker_id is None:
+        return JsonResponse({'error': 'You must be logged in as a worker'}, status=403)
+
+    try:
+        postings, next_cursor = await akeyset_page(
+            available_postings(worker_id), request.GET.get('cursor'),
+            fields=('created_at', 'id'), page_size=WORKER_FEED_PAGE_SIZE
+        )
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    html = await sync_to_async(_render_cards)(request, postings)
+    return JsonResponse({'html': html, 'count': len(postings), 'next_cursor': next_cursor})
+
+
+def _render_cards(request, postings):
+    return ''.join(
+        render_to_string('partials/worker_job_card.html', {'job': posting}, request=request)
+        for posting in postings
+    )
@@ -0,0 +1,33 @@
+"""
+Version stamps for cache keys.
+
+A cached value is stored under a key that contains a version number kept
+in the cache itself. Bumping the version makes every key built from the
+old one unreachable, so nothing stale is served and nothing needs to be
+deleted.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _fresh_version():
+    # Used whenever a version key is missing (first use or evicted). It is
+    # always larger than any version handed out before, so an old cache
+    # entry can never be picked up again.
+    return time.time_ns()
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), timeout=None)
@@ -0,0 +1,184 @@
+"""
+Cached sections for the agent dashboard (agent_home).
+
+Each agent's sections are cached under a key that contains a per-agent
+version number, and the public job board under a key with its own version.
+Views that change an agent's data call invalidate_agent_dashboard() /
+invalidate_job_board(), which bump the version once the transaction
+commits; a worker or client edit only drops the dashboards that show them
+(invalidate_worker_dashboards() / invalidate_client_dashboards()). A dashboard built from the old data can only ever be stored under
+the old version, so a stale dashboard is never served after a change.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, prefetch_related_objects
+
+from .cacheversions import bump_version, get_version
+from .models import Application, Job, JobPosting, WorkProof
+
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+HITS_KEY = 'dashboard:stats:hits'
+MISSES_KEY = 'dashboard:stats:misses'
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def _generation():
+    return get_version('dashboard:generation')
+
+
+def _agent_key(agent_id):
+    return f"dashboard:{_generation()}:agent:{agent_id}:{get_version(f'dashboard:agent:{agent_id}:version')}"
+
+
+def _board_key():
+    return f"dashboard:{_generation()}:board:{get_version('dashboard:board:version')}"
+
+
+def _cached(key, build):
+    sections = cache.get(key)
+    if sections is None:
+        _count(MISSES_KEY)
+        sections = build()
+        cache.set(key, sections, DASHBOARD_CACHE_TIMEOUT)
+    else:
+        _count(HITS_KEY)
+    return sections
+
+
+def invalidate_agent_dashboard(agent_id):
+    """
+    Drops the cached sections of one agent after the current transaction.
+    """
+    if agent_id is not None:
+        transaction.on_commit(lambda: bump_version(f'dashboard:agent:{agent_id}:version'))
+
+
+def invalidate_job_board():
+    """
+    Drops the cached public job board (jobs still seeking an agent).
+    """
+    transaction.on_commit(lambda: bump_version('dashboard:board:version'))
+
+
+def invalidate_worker_dashboards(worker_id):
+    """
+    Drops the cached sections that show `worker_id` (name, phone, skills,
+    rating): those of every agent whose postings the worker applied to.
+    """
+    agent_ids = Application.objects.filter(worker_id=worker_id).values_list(
+        'job_posting__agent_id', flat=True
+    ).distinct()
+    for agent_id in agent_ids:
+        invalidate_agent_dashboard(agent_id)
+
+
+def invalidate_client_dashboards(client_id):
+    """
+    Drops the cached sections that show `client_id`: those of the agents
+    of the client's jobs, and the job board while one of them is on it.
+    """
+    on_board = False
+    for agent_id, status in Job.objects.filter(client_id=client_id).values_list('agent_id', 'status').distinct():
+        if agent_id is None:
+            on_board = on_board or status == 'SEEKING_AGENT'
+        else:
+            invalidate_agent_dashboard(agent_id)
+    if on_board:
+        invalidate_job_board()
+
+
+def invalidate_all_dashboards():
+    """
+    Drops every cached dashboard, e.g. when a worker or client that may be
+    shown on many dashboards is deleted.
+    """
+    transaction.on_commit(lambda: bump_version('dashboard:generation'))
+
+
+def dashboard_cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else 0.0,
+    }
+
+
+def _build_agent_sections(agent_id):
+    # Every job this agent manages, in one query. The dashboard sections
+    # are split out of this list in Python instead of one query each.
+    agent_jobs = Job.objects.filter(
+        agent_id=agent_id,
+        status__in=['PENDING_AGENT', 'OPEN', 'FILLED', 'COMPLETED']
+    ).select_related('client').annotate(
+        has_postings=Exists(JobPosting.objects.filter(job=OuterRef('pk')))
+    ).order_by('-created_at')
+
+    direct_invites, unposted_jobs, active_postings, completed_jobs = [], [], [], []
+    for job in agent_jobs:
+        if job.status == 'PENDING_AGENT':
+            direct_invites.append(job)
+        elif job.status == 'OPEN' and not job.has_postings:
+            unposted_jobs.append(job)
+        elif job.status in ['OPEN', 'FILLED'] and job.has_postings:
+            active_postings.append(job)
+        elif job.status == 'COMPLETED' and job.has_postings:
+            completed_jobs.append(job)
+
+    # Postings -> applications -> workers for the posted jobs: two queries
+    # no matter how many jobs or applications there are.
+    prefetch_related_objects(
+        active_postings + completed_jobs,
+        Prefetch('postings', queryset=JobPosting.objects.order_by('id').prefetch_related(
+            Prefetch('applications', queryset=Application.objects.select_related('worker').order_by('applied_at'))
+        ))
+    )
+
+    pending_applications = list(Application.objects.filter(
+        job_posting__agent_id=agent_id,
+        status='PENDING'
+    ).select_related('worker', 'job_posting').order_by('applied_at'))
+
+    pending_proof_count = WorkProof.objects.filter(
+        application__job_posting__agent_id=agent_id,
+        status='PENDING'
+    ).count()
+
+    return {
+        'direct_invites': direct_invites,
+        'active_jobs': unposted_jobs,
+        'active_postings': active_postings,
+        'completed_jobs': completed_jobs,
+        'pending_applications': pending_applications,
+        'pending_proof_count': pending_proof_count,
+    }
+
+
+def _build_job_board():
+    return {
+        'new_invites': list(Job.objects.filter(
+            agent__isnull=True,
+            status='SEEKING_AGENT'
+        ).select_related('client').order_by('-created_at')),
+    }
+
+
+def get_agent_dashboard(agent_id):
+    """
+    Returns the template context sections for agent_home, from the cache
+    when possible.
+    """
+    sections = dict(_cached(_agent_key(agent_id), lambda: _build_agent_sections(agent_id)))
+    sections.update(_cached(_board_key(), _build_job_board))
+    return sections
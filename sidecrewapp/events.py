@@ -0,0 +1,259 @@
+"""
+Live events for the agent, client and worker pages.
+
+Views that change something another actor is looking at publish a small
+typed event to that actor's channel ("agent:12", "worker:7") once their
+transaction commits. `/events/` streams the logged-in actor's channel to
+the browser as Server-Sent Events and static/assets/js/live.js patches the page
+in place, instead of the page being reloaded to find out. Events that add
+or change a row carry it rendered from the same partial the page uses
+(`html`), so the script only has to insert or swap the node.
+
+The stream view is async and holds no thread or database connection while
+it waits, so it is served from the ASGI app (sidecrewproject/asgi.py, e.g.
+`uvicorn sidecrewproject.asgi:application`). Under WSGI it answers 204,
+which tells the browser not to reconnect; the pages work as before.
+
+Two buses, chosen with the EVENT_BUS setting:
+
+- LocalEventBus (default) fans events out to asyncio queues in this
+  process. It is enough for a single ASGI process.
+- CacheEventBus appends events to a numbered log per channel in the cache
+  and subscribers poll it. With a cache shared between processes
+  (Memcached, Redis) it stands in for a message broker, and a reconnecting
+  browser gets the events it missed (Last-Event-ID).
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.module_loading import import_string
+
+EVENT_BUS = getattr(settings, 'EVENT_BUS', 'sidecrewapp.events.LocalEventBus')
+# Seconds between keep-alive comments on an idle stream
+EVENT_HEARTBEAT_SECONDS = getattr(settings, 'EVENT_HEARTBEAT_SECONDS', 15)
+# CacheEventBus: how long events are kept for replay, and the poll interval
+EVENT_RETENTION_SECONDS = getattr(settings, 'EVENT_RETENTION_SECONDS', 300)
+EVENT_POLL_INTERVAL = getattr(settings, 'EVENT_POLL_INTERVAL', 1.0)
+# Events a slow subscriber may have waiting before new ones are dropped
+EVENT_QUEUE_SIZE = 100
+
+ROLES = ('agent', 'client', 'worker')
+
+# --- Event types ---
+APPLICATION_CREATED = 'application.created'   # to the agent
+APPLICATION_STATUS = 'application.status'     # to the worker
+PROOF_SUBMITTED = 'proof.submitted'           # to the agent
+JOB_STATUS = 'job.status'                     # to the client
+PAYMENT = 'payment'                           # to the agent (client paid) or the worker (payout)
+
+
+def channel(role, actor_id):
+    return f'{role}:{actor_id}'
+
+
+def _encode(event_id, event):
+    return {'id': event_id, 'type': event['type'], 'data': event['data']}
+
+
+class LocalEventBus:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._ids = itertools.count(1)
+
+    def publish(self, channel_name, event):
+        event = _encode(next(self._ids), event)
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel_name, ()))
+        # Views run in worker threads; each queue belongs to its stream's loop
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The stream's loop has shut down without closing it
+                self._unsubscribe(subscription)
+
+    def subscribe(self, channel_name, last_event_id=None):
+        # Events are not kept, so there is nothing to replay
+        subscription = LocalSubscription(self, channel_name)
+        with self._lock:
+            self._subscribers[channel_name].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+
+class LocalSubscription:
+
+    def __init__(self, bus, channel_name):
+        self.bus = bus
+        self.channel = channel_name
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+    async def receive(self, timeout):
+        """
+        Waits up to `timeout` seconds; returns the waiting events (maybe none).
+        """
+        try:
+            events = [await asyncio.wait_for(self.queue.get(), timeout)]
+        except asyncio.TimeoutError:
+            return []
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait())
+        return events
+
+    def close(self):
+        self.bus._unsubscribe(self)
+
+
+class CacheEventBus:
+
+    def publish(self, channel_name, event):
+        sequence_key = f'events:{channel_name}:seq'
+        cache.add(sequence_key, 0, timeout=None)
+        try:
+            event_id = cache.incr(sequence_key)
+        except ValueError:
+            # Evicted between add() and incr()
+            cache.add(sequence_key, 1, timeout=None)
+            event_id = 1
+        cache.set(f'events:{channel_name}:{event_id}', _encode(event_id, event), EVENT_RETENTION_SECONDS)
+
+    def subscribe(self, channel_name, last_event_id=None):
+        return CacheSubscription(channel_name, last_event_id)
+
+
+class CacheSubscription:
+
+    def __init__(self, channel_name, last_event_id=None):
+        self.channel = channel_name
+        try:
+            self.last_id = int(last_event_id)
+        except (TypeError, ValueError):
+            self.last_id = None
+
+    async def receive(self, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            current = await cache.aget(f'events:{self.channel}:seq') or 0
+            if self.last_id is None or current < self.last_id:
+                # New subscriber, or the counter was reset: start from now
+                self.last_id = current
+            elif current > self.last_id:
+                first = max(self.last_id + 1, current - EVENT_QUEUE_SIZE + 1)
+                keys = [f'events:{self.channel}:{event_id}' for event_id in range(first, current + 1)]
+                found = await cache.aget_many(keys)
+                self.last_id = current
+                return [found[key] for key in keys if key in found]
+            if loop.time() >= deadline:
+                return []
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+    def close(self):
+        pass
+
+
+_bus = None
+
+
+def get_bus():
+    global _bus
+    if _bus is None:
+        _bus = import_string(EVENT_BUS)()
+    return _bus
+
+
+def publish(role, actor_id, event_type, **data):
+    """
+    Sends an event to the agent / client / worker with id `actor_id` once
+    the current transaction commits. `data` must be JSON-serializable and
+    should include a short `message` for the notification.
+    """
+    if actor_id is None:
+        return
+    event = {'type': event_type, 'data': data}
+    transaction.on_commit(lambda: get_bus().publish(channel(role, actor_id), event))
+
+
+APPLICATION_MESSAGES = {
+    'ACCEPTED': "You were accepted for '{}'. Upload your proof of work when it is done.",
+    'REJECTED': "Your application for '{}' was not accepted.",
+    'PROOF_REJECTED': "Your proof of work for '{}' was rejected. Please resubmit.",
+    'COMPLETED': "Your proof of work for '{}' was approved.",
+}
+# Badge text for the job statuses pushed to the client, as rendered by
+# client_home.html
+JOB_BADGES = {
+    'SEEKING_AGENT': 'Seeking Agent',
+    'OPEN': 'Open',
+    'FILLED': 'Filled',
+    'COMPLETED': 'Completed',
+}
+
+
+def publish_application_created(application):
+    """
+    Tells the agent a worker applied, with the row for their pending
+    applications list; `application` needs its worker and job_posting
+    loaded.
+    """
+    publish('agent', application.job_posting.agent_id, APPLICATION_CREATED,
+            application_id=application.id, posting_id=application.job_posting_id,
+            html=render_to_string('partials/agent_pending_application.html', {'app': application}),
+            message=f"{application.worker.name} applied for '{application.job_posting.title}'.")
+
+
+def publish_proof_submitted(application, proof):
+    """
+    Tells the agent a proof is waiting for review; the page adds one to its
+    pending-proof count. `application` needs its job_posting loaded.
+    """
+    publish('agent', application.job_posting.agent_id, PROOF_SUBMITTED,
+            application_id=application.id, proof_id=proof.id, pending_proofs_delta=1,
+            message=f"New work proof for '{application.job_posting.title}' is waiting for review.")
+
+
+def publish_application_status(application):
+    """
+    Tells the worker their application moved to its current status, with
+    the re-rendered row for their applications list; `application` needs
+    its job_posting loaded (and its work_proof, once the proof is rejected).
+    """
+    publish('worker', application.worker_id, APPLICATION_STATUS,
+            application_id=application.id, status=application.status,
+            html=render_to_string('partials/worker_application_item.html', {'app': application}),
+            message=APPLICATION_MESSAGES[application.status].format(application.job_posting.title))
+
+
+def publish_job_status(job, message):
+    """
+    Tells the client their job moved to `job.status`.
+    """
+    publish('client', job.client_id, JOB_STATUS, job_id=job.id, status=job.status,
+            label=JOB_BADGES[job.status], message=message)
+
+
+def format_sse(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
@@ -0,0 +1,173 @@
+"""
+Distance helpers shared by the map endpoints.
+"""
+import math
+import threading
+import time
+
+import numpy as np
+
+# Mean radius of the earth in kilometres
+EARTH_RADIUS_KM = 6371
+
+# Length of one degree of latitude in kilometres (close enough everywhere)
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in km between two (lat, lon) points.
+    """
+    lat1, lon1, lat2, lon2 = float(lat1), float(lon1), float(lat2), float(lon2)
+
+    dLat = math.radians(lat2 - lat1)
+    dLon = math.radians(lon2 - lon1)
+    lat1 = math.radians(lat1)
+    lat2 = math.radians(lat2)
+
+    a = math.sin(dLat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dLon / 2) ** 2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return EARTH_RADIUS_KM * c
+
+
+def haversine_many(lat, lng, lats, lngs):
+    """
+    Vectorised haversine: distances in km from one origin (lat, lng) to
+    every point in the `lats` / `lngs` arrays, computed in one NumPy pass.
+    """
+    lat1 = math.radians(float(lat))
+    lng1 = math.radians(float(lng))
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lng2 = np.radians(np.asarray(lngs, dtype=np.float64))
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Returns (min_lat, max_lat, min_lng, max_lng) for a box that fully
+    contains the circle of `radius_km` around (lat, lng).
+
+    The box is used as a prefilter (in SQL for the worker's nearby jobs, on
+    the latitude-sorted arrays of CoordinateCache for agents), so every
+    point inside the radius must be inside the box. When the box would wrap the poles or the
+    180th meridian the longitude bounds are None (no longitude filter).
+    """
+    lat, lng = float(lat), float(lng)
+
+    delta_lat = radius_km / KM_PER_DEGREE_LAT
+    min_lat = lat - delta_lat
+    max_lat = lat + delta_lat
+
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
+
+    # A degree of longitude shrinks towards the poles, so widen the box using
+    # the latitude edge that is closest to a pole.
+    widest_lat = max(abs(min_lat), abs(max_lat))
+    delta_lng = radius_km / (KM_PER_DEGREE_LAT * math.cos(math.radians(widest_lat)))
+    min_lng = lng - delta_lng
+    max_lng = lng + delta_lng
+
+    if min_lng < -180 or max_lng > 180:
+        return min_lat, max_lat, None, None
+
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def bounding_box_filter(lat, lng, radius_km, lat_field='latitude', lng_field='longitude'):
+    """
+    Builds queryset filter kwargs for the bounding box around (lat, lng),
+    e.g. Agent.objects.filter(**bounding_box_filter(lat, lng, 50)).
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+
+    filters = {
+        f'{lat_field}__gte': min_lat,
+        f'{lat_field}__lte': max_lat,
+    }
+    if min_lng is not None:
+        filters[f'{lng_field}__gte'] = min_lng
+        filters[f'{lng_field}__lte'] = max_lng
+    return filters
+
+
+class CoordinateCache:
+    """
+    Keeps (ids, lats, lngs) float64 arrays for a set of rows in memory,
+    sorted by latitude so a bounding box can be cut out by binary search.
+
+    `loader` is a callable returning an iterable of (id, lat, lng) tuples.
+    The arrays are rebuilt lazily after invalidate() or once `ttl` seconds
+    have passed, so other processes pick up changes within `ttl`.
+    """
+
+    def __init__(self, loader, ttl=60):
+        self.loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._arrays = None
+        self._loaded_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._arrays = None
+
+    def arrays(self):
+        with self._lock:
+            if self._arrays is None or time.monotonic() - self._loaded_at > self.ttl:
+                rows = list(self.loader())
+                ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+                lats = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+                lngs = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+                order = np.argsort(lats, kind='stable')
+                self._arrays = (ids[order], lats[order], lngs[order])
+                self._loaded_at = time.monotonic()
+            return self._arrays
+
+    def within(self, lat, lng, radius_km):
+        """
+        Returns [(id, distance_km), ...] for every cached point within
+        `radius_km` of (lat, lng), nearest first.
+        """
+        return points_within(self.arrays(), lat, lng, radius_km)
+
+
+def points_within(arrays, lat, lng, radius_km):
+    """
+    CoordinateCache.within() on (ids, lats, lngs) arrays already loaded,
+    for callers that run the distance math off the request thread. The
+    arrays must be sorted by latitude, as CoordinateCache.arrays() keeps
+    them: only the points inside the bounding box of the circle (a
+    binary search on latitude, then a longitude comparison) reach the
+    exact distance check.
+    """
+    ids, lats, lngs = arrays
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    start = np.searchsorted(lats, min_lat, side='left')
+    stop = np.searchsorted(lats, max_lat, side='right')
+    candidates = np.arange(start, stop)
+    if min_lng is not None:
+        candidates = candidates[(lngs[start:stop] >= min_lng) & (lngs[start:stop] <= max_lng)]
+    if not len(candidates):
+        return []
+
+    distances = haversine_many(lat, lng, lats[candidates], lngs[candidates])
+    inside = np.flatnonzero(distances <= radius_km)
+    inside = inside[np.argsort(distances[inside], kind='stable')]
+    return [(int(ids[candidates[i]]), float(distances[i])) for i in inside]
+
+
+def _load_agent_coordinates():
+    from .models import Agent
+
+    return Agent.objects.filter(
+        status='approved',
+        latitude__isnull=False,
+        longitude__isnull=False
+    ).order_by('latitude').values_list('id', 'latitude', 'longitude').iterator()
+
+
+# Coordinates of every approved agent; see signals.py for invalidation
+agent_coordinates = CoordinateCache(_load_agent_coordinates)
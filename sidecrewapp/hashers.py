@@ -0,0 +1,32 @@
+"""
+Password hashers with work factors taken from the settings.
+
+Django's defaults are sized for a general-purpose site; every login here
+pays for one hash, so the cost is tuned in settings.py instead
+(SCRYPT_* / ARGON2_*). The first entry of PASSWORD_HASHERS hashes new
+passwords; the others only verify older hashes. A login with an older
+hash, or one made with different parameters, re-hashes the password with
+the current settings (see logins.py), so changing them upgrades accounts
+as their owners log in.
+
+Argon2 is opt-in and not in the default PASSWORD_HASHERS: it needs the
+argon2-cffi package, which requirements.txt does not install. Once it is
+installed, put 'sidecrewapp.hashers.TunedArgon2PasswordHasher' first.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    # Same algorithm name as Django's hasher, so existing scrypt hashes
+    # verify and get re-hashed when the parameters differ
+    work_factor = getattr(settings, 'SCRYPT_WORK_FACTOR', 2 ** 14)
+    block_size = getattr(settings, 'SCRYPT_BLOCK_SIZE', 8)
+    parallelism = getattr(settings, 'SCRYPT_PARALLELISM', 1)
+    maxmem = getattr(settings, 'SCRYPT_MAXMEM', 0)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    time_cost = getattr(settings, 'ARGON2_TIME_COST', 2)
+    memory_cost = getattr(settings, 'ARGON2_MEMORY_COST', 19 * 1024)  # KiB
+    parallelism = getattr(settings, 'ARGON2_PARALLELISM', 1)
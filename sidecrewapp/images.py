@@ -0,0 +1,170 @@
+"""
+Upload pipeline for profile pictures and work-proof photos.
+
+Phone-camera originals are decoded once with Pillow, rotated upright,
+downscaled to bounded dimensions and re-encoded without any metadata (EXIF
+often carries the phone model, timestamps and the exact location). For
+work proofs the camera's GPS position is read out first and kept as
+structured fields. Every image also gets a small thumbnail variant, which
+is what list and dashboard pages show.
+
+Uploads are only verified in the request (verify_image); the processing
+itself runs in the background worker (see tasks.py).
+"""
+import io
+import os
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils.text import get_valid_filename
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError, features
+
+# Longest side in pixels of the stored image / its thumbnail
+PROFILE_PIC_SIZE = getattr(settings, 'PROFILE_PIC_SIZE', 1024)
+PROFILE_THUMB_SIZE = getattr(settings, 'PROFILE_THUMB_SIZE', 256)
+WORK_PROOF_SIZE = getattr(settings, 'WORK_PROOF_SIZE', 1920)
+WORK_PROOF_THUMB_SIZE = getattr(settings, 'WORK_PROOF_THUMB_SIZE', 480)
+
+IMAGE_QUALITY = getattr(settings, 'IMAGE_QUALITY', 80)
+
+# WebP is a good deal smaller than JPEG at the same quality; fall back to
+# JPEG when Pillow was built without libwebp
+if features.check('webp'):
+    IMAGE_FORMAT, IMAGE_EXTENSION = 'WEBP', '.webp'
+else:
+    IMAGE_FORMAT, IMAGE_EXTENSION = 'JPEG', '.jpg'
+
+ProcessedImage = namedtuple('ProcessedImage', ['image', 'thumbnail', 'gps'])
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def _gps_coordinate(values, ref):
+    degrees, minutes, seconds = (Decimal(str(float(value))) for value in values)
+    coordinate = degrees + minutes / 60 + seconds / 3600
+    if ref in ('S', 'W'):
+        coordinate = -coordinate
+    return coordinate.quantize(Decimal('0.0000001'))
+
+
+def read_gps(image):
+    """
+    Returns the (latitude, longitude) stored in the image's EXIF GPS block
+    as Decimals, or None when there is no usable position.
+    """
+    try:
+        gps = image.getexif().get_ifd(ExifTags.IFD.GPSInfo)
+        latitude = _gps_coordinate(gps[ExifTags.GPS.GPSLatitude], gps.get(ExifTags.GPS.GPSLatitudeRef))
+        longitude = _gps_coordinate(gps[ExifTags.GPS.GPSLongitude], gps.get(ExifTags.GPS.GPSLongitudeRef))
+    except (KeyError, TypeError, ValueError, ZeroDivisionError, ArithmeticError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+def _encode(image, name):
+    buffer = io.BytesIO()
+    # No exif= argument: the re-encoded file carries no metadata at all
+    image.save(buffer, IMAGE_FORMAT, quality=IMAGE_QUALITY, optimize=True)
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+def _clean_name(name):
+    # "Ahammed_Mishal_Photo.pdf.jpg" -> "Ahammed_Mishal_Photo"
+    stem = os.path.basename(name or '').split('.')[0]
+    return get_valid_filename(stem) if stem.strip() else 'image'
+
+
+def process_image(upload, max_size, thumb_size):
+    """
+    Reads an uploaded file (or any file object) and returns a
+    ProcessedImage with the downscaled image and its thumbnail as unsaved
+    ContentFiles, plus the GPS position from its EXIF data (or None).
+
+    Raises InvalidImage when the file is not a readable image.
+    """
+    try:
+        source = Image.open(upload)
+        # Lets the JPEG decoder scale down by 2/4/8 while decoding, which is
+        # much faster than decoding a 12 MP photo at full size
+        source.draft('RGB', (max_size, max_size))
+        gps = read_gps(source)
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as exc:
+        raise InvalidImage("The uploaded file is not a valid image.") from exc
+
+    keep_alpha = IMAGE_FORMAT == 'WEBP' and image.has_transparency_data
+    if image.mode != ('RGBA' if keep_alpha else 'RGB'):
+        image = image.convert('RGBA' if keep_alpha else 'RGB')
+
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    thumbnail = image.copy()
+    thumbnail.thumbnail((thumb_size, thumb_size), Image.Resampling.LANCZOS)
+
+    stem = _clean_name(getattr(upload, 'name', None))
+    return ProcessedImage(
+        image=_encode(image, stem + IMAGE_EXTENSION),
+        thumbnail=_encode(thumbnail, f'{stem}_thumb{IMAGE_EXTENSION}'),
+        gps=gps,
+    )
+
+
+def verify_image(upload):
+    """
+    Cheap check that an upload is an image Pillow can read, without
+    decoding it, so the user gets an error straight away. The real work
+    happens later in process_stored_image().
+    """
+    try:
+        with Image.open(upload) as image:
+            image.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as exc:
+        raise InvalidImage("The uploaded file is not a valid image.") from exc
+    finally:
+        upload.seek(0)
+
+
+def process_stored_image(obj, field, thumb_field, max_size, thumb_size, delete_original=False):
+    """
+    Replaces the file in `obj.<field>` with its processed version and
+    stores the thumbnail in `obj.<thumb_field>`. Models with
+    photo_latitude / photo_longitude also get the camera's GPS position.
+
+    The row is only updated if it still points at the file that was
+    processed; if it was replaced meanwhile (a new upload), the new files
+    are discarded and False is returned.
+    """
+    original = getattr(obj, field)
+    original_name = original.name
+    with original.open('rb') as source:
+        processed = process_image(source, max_size, thumb_size)
+
+    storage = original.storage
+    image_name = storage.save(original.field.generate_filename(obj, processed.image.name), processed.image)
+    thumb_name = storage.save(
+        getattr(obj, thumb_field).field.generate_filename(obj, processed.thumbnail.name), processed.thumbnail
+    )
+
+    values = {field: image_name, thumb_field: thumb_name}
+    if hasattr(obj, 'photo_latitude') and processed.gps:
+        values['photo_latitude'], values['photo_longitude'] = processed.gps
+
+    updated = type(obj).objects.filter(pk=obj.pk, **{field: original_name}).update(**values)
+    if not updated:
+        storage.delete(image_name)
+        storage.delete(thumb_name)
+        return False
+
+    for name, value in values.items():
+        setattr(obj, name, value)
+    # Saving the processed image took a reference of its own, so when it
+    # came out identical the row's old reference to it goes too
+    if delete_original or original_name == image_name:
+        storage.delete(original_name)
+    return True
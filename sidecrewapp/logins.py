@@ -0,0 +1,131 @@
+"""
+Password checks and brute-force protection for the client, worker, agent
+and admin logins.
+
+Failed logins are counted in the cache in fixed windows of
+LOGIN_RATE_WINDOW seconds:
+
+- per client IP, and per email from that IP: once either reaches its
+  limit, further attempts from the IP are refused;
+- per email across all IPs: past LOGIN_BACKOFF_AFTER failures, each new
+  failure makes the email wait twice as long before the next attempt (up
+  to LOGIN_BACKOFF_MAX seconds). Guessing from many addresses is slowed
+  down, but cannot lock the owner out of their account for long.
+
+Refused attempts return before the account is loaded or a password is
+hashed, so guessing cannot tie up the CPU that real logins need. A
+successful login clears the counts for its email.
+
+Behind a reverse proxy REMOTE_ADDR is the proxy's address; set
+LOGIN_CLIENT_IP_HEADER to the header the proxy adds (e.g.
+'HTTP_X_FORWARDED_FOR'). Only the entries appended by the
+LOGIN_TRUSTED_PROXY_COUNT proxies are trusted, not what the client sent.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+
+LOGIN_RATE_WINDOW = getattr(settings, 'LOGIN_RATE_WINDOW', 15 * 60)
+LOGIN_MAX_FAILURES_PER_EMAIL_IP = getattr(settings, 'LOGIN_MAX_FAILURES_PER_EMAIL_IP', 5)
+LOGIN_MAX_FAILURES_PER_IP = getattr(settings, 'LOGIN_MAX_FAILURES_PER_IP', 50)
+LOGIN_BACKOFF_AFTER = getattr(settings, 'LOGIN_BACKOFF_AFTER', 5)
+LOGIN_BACKOFF_BASE = getattr(settings, 'LOGIN_BACKOFF_BASE', 1)
+LOGIN_BACKOFF_MAX = getattr(settings, 'LOGIN_BACKOFF_MAX', 60)
+LOGIN_CLIENT_IP_HEADER = getattr(settings, 'LOGIN_CLIENT_IP_HEADER', None)
+LOGIN_TRUSTED_PROXY_COUNT = getattr(settings, 'LOGIN_TRUSTED_PROXY_COUNT', 1)
+
+
+def client_ip(request):
+    """
+    The client's address: from LOGIN_CLIENT_IP_HEADER when it is set and
+    the request came through the trusted proxies, else REMOTE_ADDR.
+    """
+    if LOGIN_CLIENT_IP_HEADER:
+        forwarded = [ip.strip() for ip in request.META.get(LOGIN_CLIENT_IP_HEADER, '').split(',') if ip.strip()]
+        # The client can put anything in front; each proxy appends one entry
+        if len(forwarded) >= LOGIN_TRUSTED_PROXY_COUNT:
+            return forwarded[-LOGIN_TRUSTED_PROXY_COUNT]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def _normalize(email):
+    return (email or '').strip().lower()
+
+
+def _email_key(email):
+    return f'login:failures:email:{_digest(_normalize(email))}'
+
+
+def _retry_key(email):
+    return f'login:retry:email:{_digest(_normalize(email))}'
+
+
+def _email_ip_key(email, ip):
+    return f'login:failures:email-ip:{_digest(f"{_normalize(email)} {ip}")}'
+
+
+def _ip_key(ip):
+    return f'login:failures:ip:{ip}'
+
+
+def login_blocked(request, email):
+    """
+    True when the client's IP, or `email` from that IP, has failed too
+    often recently, or `email` is still waiting out its backoff.
+    """
+    ip = client_ip(request)
+    keys = [_ip_key(ip), _email_ip_key(email, ip), _retry_key(email)]
+    counts = cache.get_many(keys)
+    return (
+        counts.get(keys[0], 0) >= LOGIN_MAX_FAILURES_PER_IP
+        or counts.get(keys[1], 0) >= LOGIN_MAX_FAILURES_PER_EMAIL_IP
+        or counts.get(keys[2], 0) > time.time()
+    )
+
+
+def _count_failure(key):
+    # add() starts the window; incr() never extends it
+    if cache.add(key, 1, LOGIN_RATE_WINDOW):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(key, 1, LOGIN_RATE_WINDOW)
+        return 1
+
+
+def record_login_failure(request, email):
+    ip = client_ip(request)
+    _count_failure(_ip_key(ip))
+    _count_failure(_email_ip_key(email, ip))
+    failures = _count_failure(_email_key(email))
+    if failures >= LOGIN_BACKOFF_AFTER:
+        delay = min(LOGIN_BACKOFF_MAX, LOGIN_BACKOFF_BASE * 2 ** (failures - LOGIN_BACKOFF_AFTER))
+        # Holds the time of the next allowed attempt
+        cache.set(_retry_key(email), time.time() + delay, delay)
+
+
+def reset_login_failures(request, email):
+    cache.delete_many([_email_key(email), _retry_key(email), _email_ip_key(email, client_ip(request))])
+
+
+def verify_password(user, password):
+    """
+    Checks `password` against the user's stored hash. When the hash was
+    made with an older hasher or other work factors, it is replaced with
+    a hash from the current PASSWORD_HASHERS settings.
+    """
+    def upgrade(raw_password):
+        user.password = make_password(raw_password)
+        # Plain UPDATE: no signals, the password is not part of any cache
+        type(user).objects.filter(pk=user.pk).update(password=user.password)
+
+    return check_password(password, user.password, setter=upgrade)
@@ -0,0 +1,56 @@
+import random
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from django.core.management.base import BaseCommand
+
+from sidecrewapp.geo import haversine, haversine_many
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the per-row haversine() loop against the vectorised haversine_many()."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--radius', type=float, default=50)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        origin_lat, origin_lng = Decimal('11.2588'), Decimal('75.7804')
+        radius = options['radius']
+
+        self.stdout.write(f"{'agents':>8}  {'loop (ms)':>10}  {'numpy (ms)':>10}  {'speedup':>8}")
+        for size in options['sizes']:
+            # Random agents spread over roughly the size of Kerala, stored as
+            # Decimals exactly like Agent.latitude / Agent.longitude.
+            lats = [Decimal(f"{rng.uniform(8.0, 13.0):.7f}") for _ in range(size)]
+            lngs = [Decimal(f"{rng.uniform(74.5, 77.5):.7f}") for _ in range(size)]
+            # The float64 arrays geo.CoordinateCache keeps between requests
+            lat_array = np.array(lats, dtype=np.float64)
+            lng_array = np.array(lngs, dtype=np.float64)
+
+            loop_time, loop_hits = self._best_of(options['repeat'], lambda: sum(
+                1 for lat, lng in zip(lats, lngs)
+                if haversine(origin_lat, origin_lng, lat, lng) <= radius
+            ))
+            numpy_time, numpy_hits = self._best_of(options['repeat'], lambda: int(
+                (haversine_many(origin_lat, origin_lng, lat_array, lng_array) <= radius).sum()
+            ))
+
+            if loop_hits != numpy_hits:
+                self.stderr.write(f"Result mismatch at {size}: loop={loop_hits} numpy={numpy_hits}")
+
+            self.stdout.write(
+                f"{size:>8}  {loop_time * 1000:>10.2f}  {numpy_time * 1000:>10.2f}  {loop_time / numpy_time:>7.1f}x"
+            )
+
+    def _best_of(self, repeat, func):
+        best, result = float('inf'), None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+        return best, result
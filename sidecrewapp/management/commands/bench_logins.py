@@ -0,0 +1,76 @@
+import multiprocessing
+import time
+
+from django.contrib.auth.hashers import check_password, get_hashers, make_password
+from django.core.management.base import BaseCommand
+
+PASSWORD = 'correct horse battery staple'
+
+
+def verify_for(encoded, seconds):
+    """
+    Checks the password against `encoded` for about `seconds` seconds.
+    Returns (checks, elapsed seconds).
+    """
+    checks = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        check_password(PASSWORD, encoded)
+        checks += 1
+    return checks, time.perf_counter() - started
+
+
+def _verify_worker(encoded, seconds, results):
+    import django
+    django.setup()
+    results.put(verify_for(encoded, seconds))
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures how many logins per second one CPU core can verify with each "
+        "configured password hasher (PASSWORD_HASHERS). Hashing dominates the "
+        "cost of a login, so this is the ceiling for the login views."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=3.0, help="Time spent on each hasher.")
+        parser.add_argument('--processes', type=int, default=1,
+                            help="Verify in this many processes at once to check scaling across cores.")
+
+    def handle(self, *args, **options):
+        seconds = options['seconds']
+        processes = max(1, options['processes'])
+
+        self.stdout.write(f"{'hasher':<40} {'ms/login':>10} {'logins/s/core':>14} {'logins/s':>10}")
+        for hasher in get_hashers():
+            name = type(hasher).__name__
+            try:
+                encoded = make_password(PASSWORD, hasher=hasher)
+            except ValueError as exc:
+                # e.g. Argon2 without argon2-cffi installed
+                self.stdout.write(f"{name:<40} skipped: {exc}")
+                continue
+
+            runs = self._measure(encoded, seconds, processes)
+            checks = sum(count for count, _ in runs)
+            per_core = sum(count / elapsed for count, elapsed in runs) / len(runs)
+            total = checks / max(elapsed for _, elapsed in runs)
+            self.stdout.write(f"{name:<40} {1000 / per_core:>10.1f} {per_core:>14.1f} {total:>10.1f}")
+
+    def _measure(self, encoded, seconds, processes):
+        if processes == 1:
+            return [verify_for(encoded, seconds)]
+
+        results = multiprocessing.Queue()
+        pool = [
+            multiprocessing.Process(target=_verify_worker, args=(encoded, seconds, results))
+            for _ in range(processes)
+        ]
+        for process in pool:
+            process.start()
+        runs = [results.get() for _ in pool]
+        for process in pool:
+            process.join()
+        return runs
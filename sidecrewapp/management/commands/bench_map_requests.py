@@ -0,0 +1,136 @@
+import asyncio
+import io
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from sidecrewapp.models import Agent, Client
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks bursts of concurrent map requests (get_agents_near) through the "
+        "WSGI handler with a fixed thread pool, as under gunicorn --threads, against "
+        "the ASGI handler with one event loop, as under uvicorn. Requests are fed "
+        "in-process to the same handlers the servers call, so the numbers leave out the "
+        "server and the network. Run it against a database with realistic data (e.g. after "
+        "seed_marketplace)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=50, help="Requests in flight per burst.")
+        parser.add_argument('--bursts', type=int, default=10)
+        parser.add_argument('--threads', type=int, default=8, help="WSGI worker threads.")
+
+    def handle(self, *args, **options):
+        agent = Agent.objects.filter(status='approved', latitude__isnull=False).first()
+        client = Client.objects.first()
+        if not (agent and client):
+            raise CommandError("Needs at least one client and one approved agent with a location.")
+
+        session = SessionStore()
+        session.update({
+            'is_loggedin': True,
+            'user_role': 'client',
+            'client_id': client.id,
+            'client_name': client.name,
+        })
+        session.save()
+
+        self.path = reverse('get_agents_near')
+        self.query = urlencode({'lat': agent.latitude, 'lng': agent.longitude})
+        self.cookie = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+        self.wsgi, self.asgi = WSGIHandler(), ASGIHandler()
+
+        concurrency, bursts = options['concurrency'], options['bursts']
+        try:
+            # One request each first, so both sides start with warm caches
+            self.wsgi_burst(1, 1)
+            asyncio.run(self.asgi_burst(1))
+
+            self.stdout.write(f"{concurrency} concurrent requests x {bursts} bursts")
+            self.stdout.write(f"{'':<26}{'req/s':>8}  {'p50 (ms)':>9}  {'p95 (ms)':>9}  {'max (ms)':>9}")
+            started = time.perf_counter()
+            latencies = []
+            for _ in range(bursts):
+                latencies += self.wsgi_burst(concurrency, options['threads'])
+            self.report(f"WSGI, {options['threads']} threads", latencies, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            latencies = []
+            for _ in range(bursts):
+                latencies += asyncio.run(self.asgi_burst(concurrency))
+            self.report("ASGI, one event loop", latencies, time.perf_counter() - started)
+        finally:
+            session.delete()
+
+    def wsgi_burst(self, concurrency, threads):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            return list(pool.map(self.wsgi_request, [start] * concurrency))
+
+    def wsgi_request(self, start):
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': self.path, 'QUERY_STRING': self.query,
+            'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+            'HTTP_COOKIE': self.cookie, 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+            'wsgi.url_scheme': 'http',
+        }
+        statuses = []
+        response = self.wsgi(environ, lambda status, headers: statuses.append(status))
+        try:
+            b''.join(response)
+        finally:
+            # Fires request_finished, which closes the database connection
+            response.close()
+        self.check_status(int(statuses[0].split()[0]))
+        return time.perf_counter() - start
+
+    async def asgi_burst(self, concurrency):
+        start = time.perf_counter()
+        return await asyncio.gather(*(self.asgi_request(start) for _ in range(concurrency)))
+
+    async def asgi_request(self, start):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': self.path, 'query_string': self.query.encode(),
+            'headers': [(b'host', b'localhost'), (b'cookie', self.cookie.encode())],
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        disconnect = asyncio.get_running_loop().create_future()
+        messages = iter([{'type': 'http.request', 'body': b'', 'more_body': False}])
+
+        async def receive():
+            # The body, then nothing: the client never goes away
+            return next(messages, None) or await disconnect
+
+        statuses = []
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        await self.asgi(scope, receive, send)
+        self.check_status(statuses[0])
+        return time.perf_counter() - start
+
+    def check_status(self, status):
+        if status != 200:
+            raise CommandError(f"get_agents_near answered {status}")
+
+    def report(self, label, latencies, elapsed):
+        latencies = sorted(latency * 1000 for latency in latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f"{label:<26}{len(latencies) / elapsed:>8.0f}  {statistics.median(latencies):>9.1f}  "
+            f"{p95:>9.1f}  {latencies[-1]:>9.1f}"
+        )
@@ -0,0 +1,113 @@
+import io
+import statistics
+import sys
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from sidecrewapp import metrics
+from sidecrewapp.models import Agent, Client, Job, Worker
+
+METRICS_MIDDLEWARE = 'sidecrewapp.metrics.MetricsMiddleware'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the overhead of the per-view metrics (sidecrewapp/metrics.py): "
+        "requests agent_home, worker_home, client_home and get_agents_near through the "
+        "WSGI handler, alternating between the stock setup and the instrumented one, "
+        "and compares the median times. The stock setup runs without the middleware and "
+        "the SQL timing wrapper; the template backend is shared, and without a request "
+        "record it costs one ContextVar lookup per render. Run it against a database "
+        "with realistic data (e.g. after seed_marketplace)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per view and setup.")
+
+    def handle(self, *args, **options):
+        agent = Agent.objects.filter(status='approved', latitude__isnull=False).first()
+        worker = Worker.objects.filter(status='approved').first()
+        client = Job.objects.select_related('client').order_by('-created_at').first()
+        client = client.client if client else Client.objects.first()
+        if not (agent and worker and client):
+            raise CommandError("Needs at least one approved agent (with a location), worker and client.")
+
+        sessions = {role: self.session(role, user) for role, user in
+                    [('agent', agent), ('worker', worker), ('client', client)]}
+        views = {
+            'agent_home': ('agent', reverse('agent_home'), {}),
+            'worker_home': ('worker', reverse('worker_home'), {}),
+            'client_home': ('client', reverse('client_home'), {}),
+            'get_agents_near': ('client', reverse('get_agents_near'),
+                                {'lat': agent.latitude, 'lng': agent.longitude}),
+        }
+
+        with override_settings(MIDDLEWARE=[m for m in settings.MIDDLEWARE if m != METRICS_MIDDLEWARE]):
+            stock = WSGIHandler()
+        instrumented = WSGIHandler()
+        setups = {stock: False, instrumented: True}
+
+        try:
+            self.stdout.write(f"{'view':<18}{'stock (ms)':>12}{'metrics (ms)':>14}{'overhead':>10}")
+            for name, (role, path, params) in views.items():
+                environ = self.environ(path, params, sessions[role])
+                timings = {stock: [], instrumented: []}
+                for handler, instrument in setups.items():
+                    self.request(handler, instrument, environ)  # warm up
+                for _ in range(options['requests']):
+                    for handler, instrument in setups.items():
+                        timings[handler].append(self.request(handler, instrument, environ))
+                before = statistics.median(timings[stock]) * 1000
+                after = statistics.median(timings[instrumented]) * 1000
+                self.stdout.write(f"{name:<18}{before:>12.2f}{after:>14.2f}{(after - before) / before:>10.1%}")
+        finally:
+            connection_created.connect(metrics.instrument_connection)
+            for session in sessions.values():
+                session.delete()
+            metrics.registry.reset()
+
+    def session(self, role, user):
+        session = SessionStore()
+        session.update({'is_loggedin': True, 'user_role': role, f'{role}_id': user.id, f'{role}_name': user.name})
+        session.save()
+        return session
+
+    def environ(self, path, params, session):
+        return {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': urlencode(params),
+            'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+            'HTTP_COOKIE': f'{settings.SESSION_COOKIE_NAME}={session.session_key}',
+            'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+        }
+
+    def request(self, handler, instrument, environ):
+        # Every request opens a new connection (CONN_MAX_AGE = 0); only the
+        # instrumented setup gets the SQL timing wrapper on it
+        if instrument:
+            connection_created.connect(metrics.instrument_connection)
+        else:
+            connection_created.disconnect(metrics.instrument_connection)
+            for connection in connections.all(initialized_only=True):
+                if metrics._time_query in connection.execute_wrappers:
+                    connection.execute_wrappers.remove(metrics._time_query)
+
+        statuses = []
+        start = time.perf_counter()
+        response = handler({**environ, 'wsgi.input': io.BytesIO()}, lambda status, headers: statuses.append(status))
+        try:
+            b''.join(response)
+        finally:
+            response.close()
+        elapsed = time.perf_counter() - start
+        if not statuses[0].startswith('200'):
+            raise CommandError(f"{environ['PATH_INFO']} answered {statuses[0]}")
+        return elapsed
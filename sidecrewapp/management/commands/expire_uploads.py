@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from sidecrewapp.uploads import UPLOAD_EXPIRY_HOURS, expire_uploads
+
+
+class Command(BaseCommand):
+    help = "Deletes chunked proof uploads that were started but never finished, and their chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=UPLOAD_EXPIRY_HOURS,
+                            help="Remove uploads started more than this many hours ago.")
+
+    def handle(self, *args, **options):
+        count = expire_uploads(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f"Removed {count} unfinished upload(s)."))
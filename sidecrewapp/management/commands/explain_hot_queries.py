@@ -0,0 +1,98 @@
+import re
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client as TestClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from sidecrewapp.geo import agent_coordinates
+from sidecrewapp.models import Agent, Client, Job, Worker
+
+# Index each hot view is expected to use, by view name
+EXPECTED_INDEXES = {
+    'agent_home': ['job_agent_status_idx', 'job_status_agent_created_idx'],
+    'worker_home': ['posting_active_created_idx', 'application_worker_applied_idx'],
+    'client_home': ['job_client_created_idx'],
+    # The coordinate cache reload: approved agents in latitude order, read
+    # from the index. The bounding box is then cut out of the cached
+    # arrays (geo.points_within), so the per-click SQL is a primary key lookup.
+    'get_agents_near': ['agent_status_lat_lng_idx'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Requests agent_home, worker_home, client_home and get_agents_near as a real "
+        "user from the current database, runs EXPLAIN on every SQL statement they "
+        "issue and checks that the expected indexes are used. Works on MySQL and "
+        "SQLite. Run it against a database with realistic data (e.g. after "
+        "seed_marketplace): on near-empty tables MySQL may prefer a full scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help="Print the full plan of every query.")
+
+    def handle(self, *args, **options):
+        agent = Agent.objects.filter(status='approved', latitude__isnull=False).first()
+        worker = Worker.objects.filter(status='approved').first()
+        client = Job.objects.select_related('client').order_by('-created_at').first()
+        client = client.client if client else Client.objects.first()
+        if not (agent and worker and client):
+            raise CommandError("Needs at least one approved agent (with a location), worker and client.")
+
+        requests = {
+            'agent_home': (('agent', agent), reverse('agent_home'), {}),
+            'worker_home': (('worker', worker), reverse('worker_home'), {}),
+            'client_home': (('client', client), reverse('client_home'), {}),
+            'get_agents_near': (('client', client), reverse('get_agents_near'), {'lat': agent.latitude, 'lng': agent.longitude}),
+        }
+
+        failures = []
+        for view_name, (login, url, params) in requests.items():
+            used = self.explain_view(view_name, login, url, params, options['verbose_plans'])
+            missing = [index for index in EXPECTED_INDEXES[view_name] if index not in used]
+            status = self.style.SUCCESS('OK') if not missing else self.style.ERROR('MISSING ' + ', '.join(missing))
+            self.stdout.write(f"{view_name:<18} {status}   uses: {', '.join(sorted(used)) or '-'}")
+            if missing:
+                failures.append(view_name)
+
+        if failures:
+            raise CommandError(f"Expected indexes not used by: {', '.join(failures)}")
+
+    def explain_view(self, view_name, login, url, params, verbose):
+        # Cold caches, so every query of the view actually runs
+        cache.clear()
+        agent_coordinates.invalidate()
+
+        browser = TestClient(HTTP_HOST='localhost')
+        if login:
+            role, user = login
+            session = browser.session
+            session.update({
+                'is_loggedin': True,
+                'user_role': role,
+                f'{role}_id': user.id,
+                f'{role}_name': user.name,
+            })
+            session.save()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = browser.get(url, params)
+        if response.status_code != 200:
+            raise CommandError(f"{view_name} returned HTTP {response.status_code}")
+
+        used = set()
+        prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT') or 'django_session' in sql:
+                    continue
+                cursor.execute(f"{prefix} {sql}")
+                plan = '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+                used.update(re.findall(r'\b[a-z]+(?:_[a-z]+)*_idx\b', plan))
+                if verbose:
+                    self.stdout.write(f"\n[{view_name}] {sql}\n{plan}")
+        return used
@@ -0,0 +1,138 @@
+import os
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from sidecrewapp.models import MediaBlob
+from sidecrewapp.signals import MEDIA_FIELDS
+from sidecrewapp.storage import BLOB_DIR, ContentAddressedStorage, is_blob
+
+
+class Command(BaseCommand):
+    help = (
+        "Garbage-collects the content-addressed media storage: moves files uploaded "
+        "before it into the blob store (deduplicating them), repairs the reference "
+        "counts from the database and deletes blobs nothing refers to any more."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would change.")
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help="Leave blobs touched this recently alone (uploads in progress).")
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError("The default storage is not ContentAddressedStorage.")
+
+        self.dry_run = options['dry_run']
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+
+        self.adopt_legacy_files()
+        references = self.count_references()
+        self.reconcile(references, cutoff)
+        self.delete_orphans(cutoff)
+        self.delete_stray_files(cutoff)
+
+        totals = MediaBlob.objects.aggregate(size=Sum('size'))
+        self.stdout.write(self.style.SUCCESS(
+            f"{MediaBlob.objects.count()} blobs, {(totals['size'] or 0) / 1024 / 1024:.1f} MB, "
+            f"{sum(references.values())} references"
+        ))
+
+    def references(self):
+        for model, fields in MEDIA_FIELDS.items():
+            for field in fields:
+                rows = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                for pk, name in rows.values_list('pk', field).iterator():
+                    yield model, field, pk, name
+
+    def adopt_legacy_files(self):
+        legacy = [ref for ref in self.references() if not is_blob(ref[3])]
+        adopted = missing = 0
+        for model, field, pk, name in legacy:
+            if not default_storage.exists(name):
+                missing += 1
+                continue
+            if self.dry_run:
+                adopted += 1
+                continue
+            with default_storage.open(name, 'rb') as source:
+                new_name = default_storage.save(name, source)
+            if model.objects.filter(pk=pk, **{field: name}).update(**{field: new_name}):
+                adopted += 1
+            else:
+                default_storage.delete(new_name)
+
+        # Django renamed re-uploads (x_AbC123.jpg), so a legacy file belongs
+        # to one row; delete the ones no row points at any more
+        still_used = {ref[3] for ref in self.references() if not is_blob(ref[3])}
+        if not self.dry_run:
+            for name in {ref[3] for ref in legacy} - still_used:
+                default_storage.delete(name)
+
+        self.stdout.write(f"Legacy files: {adopted} moved into the blob store, {missing} missing on disk")
+
+    def count_references(self):
+        return Counter(name for _, _, _, name in self.references() if is_blob(name))
+
+    def reconcile(self, references, cutoff):
+        fixed = 0
+        for blob in MediaBlob.objects.filter(updated_at__lt=cutoff).iterator():
+            actual = references.get(blob.name, 0)
+            if blob.refcount != actual:
+                fixed += 1
+                if not self.dry_run:
+                    MediaBlob.objects.filter(pk=blob.pk, refcount=blob.refcount).update(refcount=actual)
+
+        known = set(MediaBlob.objects.filter(name__in=list(references)).values_list('name', flat=True))
+        for name in set(references) - known:
+            if default_storage.exists(name):
+                fixed += 1
+                if not self.dry_run:
+                    MediaBlob.objects.get_or_create(
+                        name=name, defaults={'size': default_storage.size(name), 'refcount': references[name]}
+                    )
+        self.stdout.write(f"Reference counts repaired: {fixed}")
+
+    def delete_orphans(self, cutoff):
+        orphans = MediaBlob.objects.filter(refcount=0, updated_at__lt=cutoff)
+        if self.dry_run:
+            self.stdout.write(f"Orphaned blobs: {orphans.count()}")
+            return
+
+        deleted = freed = 0
+        for blob_id in orphans.values_list('id', flat=True):
+            # Same locking as ContentAddressedStorage.delete(), so a
+            # concurrent upload of the same content is not lost
+            with transaction.atomic():
+                blob = MediaBlob.objects.select_for_update().filter(id=blob_id, refcount=0).first()
+                if blob is None:
+                    continue
+                blob.delete()
+                if default_storage.exists(blob.name):
+                    os.remove(default_storage.path(blob.name))
+            deleted += 1
+            freed += blob.size
+        self.stdout.write(f"Orphaned blobs deleted: {deleted} ({freed / 1024 / 1024:.1f} MB)")
+
+    def delete_stray_files(self, cutoff):
+        # Files in the blob store without a row, e.g. from a crash between
+        # writing the file and recording it
+        root = default_storage.path(BLOB_DIR)
+        known = set(MediaBlob.objects.values_list('name', flat=True))
+        stray = 0
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, default_storage.location).replace('\\', '/')
+                modified = datetime.fromtimestamp(os.path.getmtime(path), tz=dt_timezone.utc)
+                if name not in known and modified < cutoff:
+                    stray += 1
+                    if not self.dry_run:
+                        os.remove(path)
+        self.stdout.write(f"Stray files{' found' if self.dry_run else ' deleted'}: {stray}")
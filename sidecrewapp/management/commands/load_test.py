@@ -0,0 +1,173 @@
+import io
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from sidecrewapp import metrics
+from sidecrewapp.models import Agent, Client, JobPosting, Worker, WorkProof
+
+# Share of the traffic per action
+TRAFFIC_MIX = {
+    'agent_home': 25,
+    'worker_home': 25,
+    'client_home': 15,
+    'get_agents_near': 15,
+    'apply_for_job': 10,
+    'agent_approve_proof': 10,
+}
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of the sorted list `values`.
+    """
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays a mix of agent, worker and client traffic (agent_home, worker_home, "
+        "client_home, get_agents_near, apply for a job, approve a proof) against the "
+        "current database through the WSGI handler, from --concurrency threads, and "
+        "reports p50/p95/p99 latency and SQL queries per view. Runs offline, in-process. "
+        "The apply and approve requests change data: run it on a seeded scratch database "
+        "(manage.py seed_marketplace)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2_000)
+        parser.add_argument('--concurrency', type=int, default=8, help="Threads sending requests.")
+        parser.add_argument('--users', type=int, default=200, help="Distinct users per role.")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed, for a repeatable mix.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        users = {
+            role: list(model.objects.filter(status='approved').order_by('?').values_list('id', 'name')[:options['users']])
+            for role, model in (('agent', Agent), ('worker', Worker), ('client', Client))
+        }
+        if not all(users.values()):
+            raise CommandError("Needs approved agents, workers and clients; run seed_marketplace first.")
+
+        self.csrf_secret = get_random_string(32)
+        self.sessions = {}
+        self.handler = WSGIHandler()
+        try:
+            plan = self.plan(options['requests'], users)
+            metrics.registry.reset()
+            self.stdout.write(f"Sending {len(plan)} requests from {options['concurrency']} threads...")
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                results = list(pool.map(self.send, plan))
+            elapsed = time.perf_counter() - started
+            self.report(results, elapsed)
+        finally:
+            for session in self.sessions.values():
+                session.delete()
+
+    def session_key(self, role, user):
+        if (role, user[0]) not in self.sessions:
+            session = SessionStore()
+            session.update({'is_loggedin': True, 'user_role': role, f'{role}_id': user[0], f'{role}_name': user[1]})
+            session.save()
+            self.sessions[role, user[0]] = session
+        return self.sessions[role, user[0]].session_key
+
+    def plan(self, count, users):
+        """
+        The requests to send, as (view name, method, path, query, session key).
+        """
+        actions, weights = zip(*TRAFFIC_MIX.items())
+        agent_ids = [agent_id for agent_id, _ in users['agent']]
+        postings = list(JobPosting.objects.filter(is_active=True).order_by('?').values_list('id', flat=True)[:2_000])
+        # Each pending proof can only be approved once
+        proofs = list(WorkProof.objects.filter(
+            status='PENDING', application__job_posting__agent_id__in=agent_ids
+        ).values_list('application__job_posting__agent_id', 'id')[:count])
+        self.rng.shuffle(proofs)
+        agents = dict(users['agent'])
+        locations = list(Agent.objects.filter(
+            status='approved', latitude__isnull=False
+        ).order_by('?').values_list('latitude', 'longitude')[:500])
+
+        plan = []
+        for _ in range(count):
+            action = self.rng.choices(actions, weights)[0]
+            if action == 'apply_for_job' and not postings or action == 'agent_approve_proof' and not proofs:
+                action = 'worker_home'
+            if action == 'get_agents_near' and not locations:
+                action = 'client_home'
+
+            if action in ('agent_home', 'worker_home', 'client_home'):
+                role = action.split('_')[0]
+                plan.append((action, 'GET', reverse(action), '', self.session_key(role, self.rng.choice(users[role]))))
+            elif action == 'get_agents_near':
+                lat, lng = self.rng.choice(locations)
+                plan.append((action, 'GET', reverse(action), urlencode({'lat': lat, 'lng': lng}),
+                             self.session_key('client', self.rng.choice(users['client']))))
+            elif action == 'apply_for_job':
+                plan.append((action, 'GET', reverse(action, args=[self.rng.choice(postings)]), '',
+                             self.session_key('worker', self.rng.choice(users['worker']))))
+            else:
+                agent_id, proof_id = proofs.pop()
+                plan.append((action, 'POST', reverse(action, args=[proof_id]), '',
+                             self.session_key('agent', (agent_id, agents[agent_id]))))
+        return plan
+
+    def send(self, request):
+        view, method, path, query, session_key = request
+        environ = {
+            'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': query,
+            'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+            'HTTP_COOKIE': f'{settings.SESSION_COOKIE_NAME}={session_key}; '
+                           f'{settings.CSRF_COOKIE_NAME}={self.csrf_secret}',
+            'HTTP_X_CSRFTOKEN': self.csrf_secret,
+            'CONTENT_LENGTH': '0', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+            'wsgi.url_scheme': 'http',
+        }
+        statuses = []
+        start = time.perf_counter()
+        response = self.handler(environ, lambda status, headers: statuses.append(status))
+        try:
+            b''.join(response)
+        finally:
+            response.close()
+        return view, int(statuses[0].split()[0]), time.perf_counter() - start
+
+    def report(self, results, elapsed):
+        timings, errors = defaultdict(list), defaultdict(int)
+        for view, status, seconds in results:
+            timings[view].append(seconds * 1000)
+            if status >= 400:
+                errors[view] += 1
+
+        self.stdout.write(f"{len(results)} requests in {elapsed:.1f}s ({len(results) / elapsed:.0f} req/s)")
+        self.stdout.write(
+            f"{'view':<22}{'requests':>9}{'errors':>8}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'queries':>9}"
+        )
+        for view in TRAFFIC_MIX:
+            if view not in timings:
+                continue
+            values = sorted(timings[view])
+            # Mean SQL statements per request, from the metrics middleware
+            recorded = metrics.registry.views.get(view)
+            if recorded is not None:
+                histogram = recorded.histograms['db_queries']
+                queries = f"{histogram.sum / sum(histogram.counts):.1f}"
+            else:
+                queries = '-'
+            self.stdout.write(
+                f"{view:<22}{len(values):>9}{errors[view]:>8}{percentile(values, 0.50):>10.1f}"
+                f"{percentile(values, 0.95):>10.1f}{percentile(values, 0.99):>10.1f}{queries:>9}"
+            )
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from sidecrewapp.images import (
+    InvalidImage, process_stored_image,
+    PROFILE_PIC_SIZE, PROFILE_THUMB_SIZE, WORK_PROOF_SIZE, WORK_PROOF_THUMB_SIZE,
+)
+from sidecrewapp.models import Agent, Client, Worker, WorkProof
+
+# (model, image field, thumbnail field, max size, thumbnail size)
+TARGETS = [
+    (WorkProof, 'image', 'thumbnail', WORK_PROOF_SIZE, WORK_PROOF_THUMB_SIZE),
+    (Client, 'profile_pic', 'profile_thumbnail', PROFILE_PIC_SIZE, PROFILE_THUMB_SIZE),
+    (Worker, 'profile_pic', 'profile_thumbnail', PROFILE_PIC_SIZE, PROFILE_THUMB_SIZE),
+    (Agent, 'profile_pic', 'profile_thumbnail', PROFILE_PIC_SIZE, PROFILE_THUMB_SIZE),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs existing profile pictures and work-proof photos through the upload "
+        "pipeline (downscale, strip EXIF, re-encode, thumbnail). Only rows without a "
+        "thumbnail are processed, so the command can be re-run safely. The originals are "
+        "deleted once processed, as for new uploads, unless --keep-originals is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be processed.")
+        # Deleting only drops this row's reference: a file other rows share
+        # (content-addressed storage) stays until its last reference goes
+        parser.add_argument('--keep-originals', action='store_true',
+                            help="Keep the original files instead of deleting them once their processed copy is saved.")
+
+    def handle(self, *args, **options):
+        for model, field, thumb_field, max_size, thumb_size in TARGETS:
+            pending = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).filter(
+                Q(**{f'{thumb_field}__isnull': True}) | Q(**{thumb_field: ''})
+            ).order_by('id')
+
+            if options['dry_run']:
+                self.stdout.write(f"{model.__name__}: {pending.count()} image(s) to process")
+                continue
+
+            done = skipped = saved_bytes = 0
+            for obj in pending.iterator():
+                original = getattr(obj, field)
+                try:
+                    original_size = original.size
+                    processed = process_stored_image(obj, field, thumb_field, max_size, thumb_size,
+                                                     delete_original=not options['keep_originals'])
+                except (FileNotFoundError, InvalidImage) as e:
+                    self.stderr.write(f"{model.__name__} {obj.id}: skipped {original.name} ({e})")
+                    skipped += 1
+                    continue
+
+                if processed:
+                    saved_bytes += original_size - getattr(obj, field).size
+                    done += 1
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{model.__name__}: processed {done}, skipped {skipped}, "
+                f"{saved_bytes / 1024 / 1024:.1f} MB smaller"
+            ))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from sidecrewapp.models import Agent, Worker
+from sidecrewapp.ratings import totals_from_history
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes Agent/Worker rating_sum, rating_count and rating from every "
+        "historical rating and reports rows whose stored totals did not match. "
+        "With --check nothing is written and a mismatch exits non-zero."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only verify, do not fix.")
+
+    def handle(self, *args, **options):
+        agent_totals, worker_totals = totals_from_history()
+
+        with transaction.atomic():
+            mismatches = self.sync(Agent, agent_totals, options['check'])
+            mismatches += self.sync(Worker, worker_totals, options['check'])
+
+        if options['check'] and mismatches:
+            raise CommandError(f"{mismatches} rating aggregate(s) do not match history.")
+        verb = "found" if options['check'] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"Rating aggregates checked, {mismatches} mismatch(es) {verb}."))
+
+    def sync(self, model, totals, check_only):
+        label = model._meta.model_name
+        to_update = []
+        rows = model.objects.only('id', 'rating', 'rating_sum', 'rating_count')
+        if not check_only:
+            rows = rows.select_for_update()
+
+        for row in rows.iterator(chunk_size=2000):
+            total, count = totals.get(row.id, (0, 0))
+            average = total / count if count else 0.0
+            if (row.rating_sum, row.rating_count) == (total, count) and abs(row.rating - average) < 1e-9:
+                continue
+
+            self.stdout.write(
+                f"{label} {row.id}: stored {row.rating_sum}/{row.rating_count} ({row.rating:.3f}), "
+                f"history {total}/{count} ({average:.3f})"
+            )
+            row.rating_sum, row.rating_count, row.rating = total, count, average
+            to_update.append(row)
+
+        if not check_only and to_update:
+            model.objects.bulk_update(to_update, ['rating_sum', 'rating_count', 'rating'], batch_size=1000)
+        return len(to_update)
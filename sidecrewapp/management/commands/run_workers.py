@@ -0,0 +1,72 @@
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from sidecrewapp import tasks  # noqa: F401  (registers the task handlers)
+from sidecrewapp.taskqueue import TASK_VISIBILITY_TIMEOUT, claim, run
+
+
+def work(visibility_timeout, poll_interval, once):
+    """
+    Worker loop: claim a task, run it, repeat. Sleeps `poll_interval`
+    seconds whenever the queue is empty, or returns if `once` is set.
+    """
+    import django
+    django.setup()
+
+    try:
+        while True:
+            close_old_connections()
+            task_obj = claim(visibility_timeout)
+            if task_obj is None:
+                if once:
+                    return
+                time.sleep(poll_interval)
+                continue
+            run(task_obj)
+    except KeyboardInterrupt:
+        # A task cut short here is picked up again after its visibility timeout
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued background tasks (image processing etc.) from the database "
+        "task table using a pool of worker processes. No broker needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=getattr(settings, 'TASK_WORKER_PROCESSES', 2),
+                            help="Number of worker processes (1 runs in this process).")
+        parser.add_argument('--visibility-timeout', type=int, default=TASK_VISIBILITY_TIMEOUT,
+                            help="Seconds before a claimed but unfinished task is handed out again.")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        worker_args = (options['visibility_timeout'], options['poll_interval'], options['once'])
+
+        if options['processes'] <= 1:
+            work(*worker_args)
+            return
+
+        # Child processes must open their own database connections
+        connections.close_all()
+        pool = [
+            multiprocessing.Process(target=work, args=worker_args, name=f"sidecrew-worker-{i}")
+            for i in range(options['processes'])
+        ]
+        for process in pool:
+            process.start()
+        self.stdout.write(f"Started {len(pool)} worker processes.")
+
+        try:
+            for process in pool:
+                process.join()
+        except KeyboardInterrupt:
+            for process in pool:
+                process.join()
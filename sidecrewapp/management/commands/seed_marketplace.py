@@ -0,0 +1,229 @@
+import random
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from sidecrewapp.models import Account, Agent, Application, Client, Job, JobPosting, Worker, WorkProof
+
+# Every seeded account's email ends with this, so --clear can find them
+SEED_EMAIL_DOMAIN = 'seed.sidecrew.test'
+SEED_PASSWORD = 'sidecrew-seed'
+
+# Job status mix; SEEKING_AGENT jobs have no agent, PENDING_AGENT ones are
+# invitations, the rest are posted to workers
+JOB_STATUSES = [('SEEKING_AGENT', 10), ('PENDING_AGENT', 5), ('OPEN', 35), ('FILLED', 20), ('COMPLETED', 30)]
+
+# Application status mix by job status, and the proof each state implies
+APPLICATION_STATUSES = {
+    'OPEN': [('PENDING', 45), ('ACCEPTED', 15), ('REJECTED', 15), ('PROOF_SUBMITTED', 15), ('PROOF_REJECTED', 10)],
+    'FILLED': [('ACCEPTED', 30), ('REJECTED', 20), ('PROOF_SUBMITTED', 25), ('PROOF_REJECTED', 10), ('COMPLETED', 15)],
+    'COMPLETED': [('COMPLETED', 85), ('REJECTED', 15)],
+}
+PROOF_STATUS = {'PROOF_SUBMITTED': 'PENDING', 'PROOF_REJECTED': 'REJECTED', 'COMPLETED': 'APPROVED'}
+ACCEPTED_STATUSES = {'ACCEPTED', 'PROOF_SUBMITTED', 'PROOF_REJECTED', 'COMPLETED'}
+
+# Roughly Kerala: where agents and jobs are placed
+LAT_RANGE = (8.2, 12.8)
+LNG_RANGE = (74.9, 77.4)
+
+JOB_TITLES = ['Event staff', 'Catering crew', 'Stage hands', 'Ushers', 'Warehouse packing',
+              'Promoters', 'Registration desk', 'Parking attendants', 'Kitchen helpers', 'Decorators']
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the database with a synthetic marketplace for load and performance tests: "
+        "clients, workers, agents with coordinates, jobs in every status, postings, "
+        "applications and work proofs in every lifecycle state. Rows are written with "
+        "bulk_create in batches and explicit ids, so it runs offline on MySQL or SQLite. "
+        f"Every seeded account has the password '{SEED_PASSWORD}'. Use --scale for a "
+        "smaller or larger run and --clear to remove an earlier seed first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=100_000)
+        parser.add_argument('--agents', type=int, default=5_000)
+        parser.add_argument('--clients', type=int, default=10_000)
+        parser.add_argument('--jobs', type=int, default=50_000)
+        parser.add_argument('--applications', type=int, default=250_000,
+                            help="Applications spread over the jobs that have a posting.")
+        parser.add_argument('--scale', type=float, default=1.0, help="Multiplies every count above.")
+        parser.add_argument('--batch-size', type=int, default=2_000)
+        parser.add_argument('--seed', type=int, default=1, help="Random seed, for a repeatable data set.")
+        parser.add_argument('--clear', action='store_true', help="Delete earlier seeded rows first.")
+
+    def handle(self, *args, **options):
+        counts = {name: max(1, int(options[name] * options['scale']))
+                  for name in ('workers', 'agents', 'clients', 'jobs', 'applications')}
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        if options['clear']:
+            self.clear()
+        elif Account.objects.filter(email__endswith=f'@{SEED_EMAIL_DOMAIN}').exists():
+            raise CommandError("The database already holds seeded rows; run with --clear to replace them.")
+
+        # One hash for every account: hashing 100k passwords would take hours
+        self.password = make_password(SEED_PASSWORD)
+
+        clients = self.create_profiles(Client, 'client', counts['clients'], lambda n: {
+            'phone': f'9{n:09d}'[:10], 'company_name': f"Company {n}" if n % 3 else None,
+        })
+        workers = self.create_profiles(Worker, 'worker', counts['workers'], lambda n: {
+            'phone': f'8{n:09d}'[:10], 'address': "Kochi, Kerala",
+            'skills': self.rng.choice(["Serving", "Cooking", "Driving", "Cleaning", "Setup"]),
+        })
+        agents = self.create_profiles(Agent, 'agent', counts['agents'], lambda n: {
+            'phone': f'7{n:09d}'[:10], 'address': "Kerala", 'agency_name': f"Agency {n}",
+            'latitude': self.coordinate(*LAT_RANGE), 'longitude': self.coordinate(*LNG_RANGE),
+        })
+        totals = self.create_jobs(counts['jobs'], counts['applications'], *(
+            [pk for pk, status in rows if status == 'approved'] for rows in (clients, workers, agents)
+        ))
+
+        # Ratings were written on the jobs and applications only; the
+        # per-row report of rebuild_ratings would be every rated profile
+        call_command('rebuild_ratings', stdout=StringIO())
+        # Dashboards, statistics and cached principals all predate the seed
+        cache.clear()
+
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded {clients} clients, {workers} workers, {agents} agents, {jobs} jobs, "
+            "{postings} postings, {applications} applications and {proofs} work proofs.".format(
+                clients=len(clients), workers=len(workers), agents=len(agents), **totals)
+        ))
+
+    def clear(self):
+        # Deleting the accounts cascades to the profiles and everything below
+        accounts = Account.objects.filter(email__endswith=f'@{SEED_EMAIL_DOMAIN}')
+        ids = list(accounts.values_list('id', flat=True))
+        for start in range(0, len(ids), self.batch_size):
+            with transaction.atomic():
+                Account.objects.filter(id__in=ids[start:start + self.batch_size]).delete()
+        self.stdout.write(f"Removed {len(ids)} seeded accounts.")
+
+    def coordinate(self, low, high):
+        return Decimal(f"{self.rng.uniform(low, high):.7f}")
+
+    def status(self):
+        return self.rng.choices(['approved', 'pending', 'rejected'], [92, 6, 2])[0]
+
+    def next_id(self, model):
+        return (model.objects.aggregate(top=Max('id'))['top'] or 0) + 1
+
+    def insert(self, model, rows):
+        for start in range(0, len(rows), self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(rows[start:start + self.batch_size])
+
+    def create_profiles(self, model, role, count, extra_fields):
+        """
+        Creates `count` accounts with their profiles; returns [(id, status)].
+        """
+        account_id, profile_id = self.next_id(Account), self.next_id(model)
+        created = []
+        for start in range(0, count, self.batch_size):
+            accounts, profiles = [], []
+            for n in range(start, min(start + self.batch_size, count)):
+                email = f"{role}{n}@{SEED_EMAIL_DOMAIN}"
+                status = self.status()
+                accounts.append(Account(id=account_id, role=role, email=email,
+                                        password=self.password, status=status))
+                profiles.append(model(id=profile_id, account_id=account_id, name=f"{role.title()} {n}",
+                                      email=email, status=status, **extra_fields(n)))
+                created.append((profile_id, status))
+                account_id += 1
+                profile_id += 1
+            self.insert(Account, accounts)
+            self.insert(model, profiles)
+            self.stdout.write(f"  {role}s: {len(created)}/{count}")
+        return created
+
+    def create_jobs(self, job_count, application_count, clients, workers, agents):
+        if not (clients and workers and agents):
+            raise CommandError("Needs at least one approved client, worker and agent.")
+
+        ids = {model: self.next_id(model) for model in (Job, JobPosting, Application, WorkProof)}
+        totals = dict.fromkeys(('jobs', 'postings', 'applications', 'proofs'), 0)
+        statuses, weights = zip(*JOB_STATUSES)
+        posted_share = sum(weight for status, weight in JOB_STATUSES if status in APPLICATION_STATUSES) / 100
+        per_posting = application_count / max(1, job_count * posted_share)
+
+        for start in range(0, job_count, self.batch_size):
+            jobs, postings, applications, proofs = [], [], [], []
+            for n in range(start, min(start + self.batch_size, job_count)):
+                status = self.rng.choices(statuses, weights)[0]
+                job = Job(
+                    id=ids[Job], client_id=self.rng.choice(clients), status=status,
+                    agent_id=None if status == 'SEEKING_AGENT' else self.rng.choice(agents),
+                    title=f"{self.rng.choice(JOB_TITLES)} #{n}", description="Synthetic job for load tests.",
+                    location_address="Kerala, India",
+                    location_latitude=self.coordinate(*LAT_RANGE), location_longitude=self.coordinate(*LNG_RANGE),
+                    client_pay_per_worker=Decimal(self.rng.randrange(500, 2500, 50)),
+                    workers_needed=self.rng.randint(1, 10),
+                )
+                ids[Job] += 1
+                jobs.append(job)
+                if status not in APPLICATION_STATUSES:
+                    continue
+
+                posting = JobPosting(
+                    id=ids[JobPosting], job_id=job.id, agent_id=job.agent_id, title=job.title,
+                    description=job.description, worker_pay_rate=job.client_pay_per_worker * Decimal('0.90'),
+                    is_active=status == 'OPEN',
+                )
+                ids[JobPosting] += 1
+                postings.append(posting)
+
+                app_statuses, app_weights = zip(*APPLICATION_STATUSES[status])
+                size = min(len(workers), max(1, round(self.rng.expovariate(1 / per_posting))))
+                for worker_id in self.rng.sample(workers, size):
+                    app_status = self.rng.choices(app_statuses, app_weights)[0]
+                    application = Application(id=ids[Application], job_posting_id=posting.id,
+                                              worker_id=worker_id, status=app_status)
+                    ids[Application] += 1
+                    if app_status in ACCEPTED_STATUSES:
+                        job.workers_accepted += 1
+                    if app_status == 'COMPLETED':
+                        job.workers_completed += 1
+                        application.worker_payment_status = self.rng.choice(['paid', 'unpaid'])
+                        if self.rng.random() < 0.6:
+                            application.agent_rating_for_worker = self.rng.randint(1, 5)
+                    applications.append(application)
+
+                    if app_status in PROOF_STATUS:
+                        proofs.append(WorkProof(
+                            id=ids[WorkProof], application_id=application.id, image='work_proofs/seed.jpg',
+                            latitude=job.location_latitude, longitude=job.location_longitude,
+                            status=PROOF_STATUS[app_status],
+                            agent_remarks="Photo does not show the venue." if app_status == 'PROOF_REJECTED' else None,
+                        ))
+                        ids[WorkProof] += 1
+
+                # Counters as the views would have left them
+                if status == 'OPEN':
+                    job.workers_needed = max(job.workers_needed, job.workers_accepted + 1)
+                elif status == 'FILLED':
+                    job.workers_needed = max(1, job.workers_accepted)
+                else:
+                    job.workers_needed = max(1, job.workers_completed)
+                if status == 'COMPLETED':
+                    job.client_payment_status = self.rng.choices(['paid', 'pending'], [80, 20])[0]
+                    if self.rng.random() < 0.5:
+                        job.client_rating_for_agent = self.rng.randint(1, 5)
+
+            self.insert(Job, jobs)
+            self.insert(JobPosting, postings)
+            self.insert(Application, applications)
+            self.insert(WorkProof, proofs)
+            for name, rows in (('jobs', jobs), ('postings', postings), ('applications', applications),
+                               ('proofs', proofs)):
+                totals[name] += len(rows)
+            self.stdout.write(f"  jobs: {totals['jobs']}/{job_count}")
+        return totals
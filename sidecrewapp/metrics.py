@@ -0,0 +1,312 @@
+"""
+Per-view performance metrics.
+
+MetricsMiddleware times every request and files it under its URL name
+(e.g. "agent_home"): wall time, number of SQL queries, time spent in the
+database, time spent rendering templates and response size. Each goes
+into a fixed-bucket histogram kept in this process; /metrics/ renders them
+in the Prometheus text format. Every process (gunicorn / uvicorn worker)
+keeps its own numbers, so point the scraper at each of them, or sum the
+series per view.
+
+SQL is timed by a database execute wrapper installed on every connection
+as it opens; templates by InstrumentedDjangoTemplates, the template
+backend in settings.TEMPLATES. Both add to the running request's record,
+which lives in a context variable, so the queries an async view sends
+through sync_to_async are counted too. Outside a request they cost one
+ContextVar lookup.
+
+Requests slower than METRICS_SLOW_REQUEST_SECONDS are logged to the
+"sidecrewapp.slow_requests" logger with their slowest statements, and the
+worst METRICS_SLOW_LOG_SIZE of them are kept for /metrics/slow/.
+
+Overhead: a few microseconds per request plus under a microsecond per
+query; `manage.py bench_metrics` measures it on the hot views.
+"""
+import bisect
+import contextvars
+import heapq
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template as DjangoTemplate
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger('sidecrewapp.slow_requests')
+
+METRICS_SLOW_REQUEST_SECONDS = getattr(settings, 'METRICS_SLOW_REQUEST_SECONDS', 1.0)
+METRICS_SLOW_LOG_SIZE = getattr(settings, 'METRICS_SLOW_LOG_SIZE', 20)
+# Lets a Prometheus server scrape /metrics/ without an admin session
+METRICS_TOKEN = getattr(settings, 'METRICS_TOKEN', None)
+
+# Statements kept per request for the slow-request log
+SLOW_QUERIES_KEPT = 5
+
+# Histogram upper bounds
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+BYTES_BUCKETS = (1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000)
+
+
+class RequestRecord:
+    """
+    What one request has spent so far.
+    """
+    __slots__ = ('queries', 'db_seconds', 'template_seconds', 'slowest')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        # Min-heap of (seconds, sql): the SLOW_QUERIES_KEPT slowest statements
+        self.slowest = []
+
+    def add_query(self, sql, seconds):
+        self.queries += 1
+        self.db_seconds += seconds
+        if len(self.slowest) < SLOW_QUERIES_KEPT:
+            heapq.heappush(self.slowest, (seconds, sql))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, sql))
+
+
+_current = contextvars.ContextVar('sidecrewapp_request_record', default=None)
+
+
+def _time_query(execute, sql, params, many, context):
+    record = _current.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record.add_query(sql, time.perf_counter() - start)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+class InstrumentedTemplate(DjangoTemplate):
+
+    def render(self, context=None, request=None):
+        record = _current.get()
+        if record is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            record.template_seconds += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, timing every render for the metrics.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        # Goes through DjangoTemplates for its TemplateDoesNotExist handling
+        return InstrumentedTemplate(super().get_template(template_name).template, self)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One count per bucket plus +Inf; made cumulative when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class ViewMetrics:
+
+    def __init__(self):
+        self.responses = {}
+        self.histograms = {
+            'request_duration_seconds': Histogram(SECONDS_BUCKETS),
+            'db_queries': Histogram(QUERY_BUCKETS),
+            'db_duration_seconds': Histogram(SECONDS_BUCKETS),
+            'template_duration_seconds': Histogram(SECONDS_BUCKETS),
+            'response_size_bytes': Histogram(BYTES_BUCKETS),
+        }
+
+
+HELP = {
+    'request_duration_seconds': "Wall time of the request, seconds.",
+    'db_queries': "SQL statements run by the request.",
+    'db_duration_seconds': "Time spent in SQL statements, seconds.",
+    'template_duration_seconds': "Time spent rendering templates, seconds.",
+    'response_size_bytes': "Response body size (0 for streamed responses).",
+}
+
+
+class Registry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.views = {}
+        # Min-heap of (seconds, sequence, entry): the slowest requests seen
+        self.slow = []
+        self._sequence = 0
+
+    def observe(self, view, status, duration, record, size):
+        with self._lock:
+            metrics = self.views.get(view)
+            if metrics is None:
+                metrics = self.views[view] = ViewMetrics()
+            status_class = f'{status // 100}xx'
+            metrics.responses[status_class] = metrics.responses.get(status_class, 0) + 1
+            histograms = metrics.histograms
+            histograms['request_duration_seconds'].observe(duration)
+            histograms['db_queries'].observe(record.queries)
+            histograms['db_duration_seconds'].observe(record.db_seconds)
+            histograms['template_duration_seconds'].observe(record.template_seconds)
+            histograms['response_size_bytes'].observe(size)
+
+    def observe_slow(self, entry):
+        with self._lock:
+            self._sequence += 1
+            item = (entry['seconds'], self._sequence, entry)
+            if len(self.slow) < METRICS_SLOW_LOG_SIZE:
+                heapq.heappush(self.slow, item)
+            elif item > self.slow[0]:
+                heapq.heapreplace(self.slow, item)
+
+    def slow_requests(self):
+        """
+        The slowest requests kept, slowest first.
+        """
+        with self._lock:
+            return [entry for _, _, entry in sorted(self.slow, reverse=True)]
+
+    def reset(self):
+        with self._lock:
+            self.views.clear()
+            self.slow.clear()
+
+    def render(self):
+        """
+        Every histogram in the Prometheus text exposition format.
+        """
+        with self._lock:
+            views = sorted(self.views.items())
+            lines = [
+                "# HELP sidecrew_responses_total Responses by view and status class.",
+                "# TYPE sidecrew_responses_total counter",
+            ]
+            for view, metrics in views:
+                for status_class, count in sorted(metrics.responses.items()):
+                    lines.append(f'sidecrew_responses_total{{view="{view}",status="{status_class}"}} {count}')
+
+            for name, help_text in HELP.items():
+                lines.append(f"# HELP sidecrew_{name} {help_text}")
+                lines.append(f"# TYPE sidecrew_{name} histogram")
+                for view, metrics in views:
+                    histogram = metrics.histograms[name]
+                    total = 0
+                    for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                        total += count
+                        lines.append(f'sidecrew_{name}_bucket{{view="{view}",le="{bound}"}} {total}')
+                    lines.append(f'sidecrew_{name}_sum{{view="{view}"}} {histogram.sum:.6f}')
+                    lines.append(f'sidecrew_{name}_count{{view="{view}"}} {total}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unresolved'
+
+
+def _finish(request, response, start, record):
+    duration = time.perf_counter() - start
+    view = view_name(request)
+    size = 0 if response.streaming else len(response.content)
+    registry.observe(view, response.status_code, duration, record, size)
+
+    if duration >= METRICS_SLOW_REQUEST_SECONDS:
+        slowest = sorted(record.slowest, reverse=True)
+        entry = {
+            'view': view,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'seconds': round(duration, 4),
+            'queries': record.queries,
+            'db_seconds': round(record.db_seconds, 4),
+            'template_seconds': round(record.template_seconds, 4),
+            'slowest_queries': [{'seconds': round(seconds, 4), 'sql': sql} for seconds, sql in slowest],
+        }
+        registry.observe_slow(entry)
+        logger.warning(
+            "Slow request: %s %s took %.3fs (%d queries, %.3fs in SQL, %.3fs in templates); slowest SQL:\n%s",
+            view, entry['path'], duration, record.queries, record.db_seconds, record.template_seconds,
+            '\n'.join(f"  {seconds * 1000:.1f} ms  {sql}" for seconds, sql in slowest) or '  -',
+        )
+
+
+class MetricsMiddleware:
+    """
+    Records the metrics of every request; works under WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        record = RequestRecord()
+        token = _current.set(record)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        _finish(request, response, start, record)
+        return response
+
+    async def __acall__(self, request):
+        record = RequestRecord()
+        token = _current.set(record)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        _finish(request, response, start, record)
+        return response
+
+
+def authorized(request):
+    """
+    A logged-in admin, or a scraper sending "Authorization: Bearer
+    <METRICS_TOKEN>".
+    """
+    if request.session.get('is_loggedin') and request.session.get('user_role') == 'admin':
+        return True
+    return bool(METRICS_TOKEN) and constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {METRICS_TOKEN}'
+    )
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sidecrewapp', '0011_agent_latitude_agent_longitude'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agent',
+            index=models.Index(fields=['status', 'latitude', 'longitude'], name='agent_status_lat_lng_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sidecrewapp', '0012_agent_status_lat_lng_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['location_latitude', 'location_longitude'], name='job_location_idx'),
+        ),
+    ]
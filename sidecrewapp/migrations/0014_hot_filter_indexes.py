@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sidecrewapp', '0013_job_location_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agent',
+            index=models.Index(fields=['status', 'name'], name='agent_status_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['job_posting', 'status'], name='application_posting_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['worker', 'applied_at', 'id'], name='application_worker_applied_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['status', 'name'], name='client_status_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['agent', 'status'], name='job_agent_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'agent', 'created_at'], name='job_status_agent_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['client', 'created_at'], name='job_client_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobposting',
+            index=models.Index(fields=['is_active', 'created_at', 'id'], name='posting_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='worker',
+            index=models.Index(fields=['status', 'name'], name='worker_status_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workproof',
+            index=models.Index(fields=['status', 'uploaded_at'], name='workproof_status_uploaded_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:28
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_totals(apps, schema_editor):
+    """
+    Fills rating_sum / rating_count from every historical rating.
+    """
+    Agent = apps.get_model('sidecrewapp', 'Agent')
+    Worker = apps.get_model('sidecrewapp', 'Worker')
+    Job = apps.get_model('sidecrewapp', 'Job')
+    Application = apps.get_model('sidecrewapp', 'Application')
+
+    for row in Job.objects.filter(
+        agent__isnull=False, client_rating_for_agent__isnull=False
+    ).values('agent').annotate(total=Sum('client_rating_for_agent'), count=Count('id')):
+        Agent.objects.filter(pk=row['agent']).update(
+            rating_sum=row['total'], rating_count=row['count'], rating=row['total'] / row['count']
+        )
+
+    for row in Application.objects.filter(
+        agent_rating_for_worker__isnull=False
+    ).values('worker').annotate(total=Sum('agent_rating_for_worker'), count=Count('id')):
+        Worker.objects.filter(pk=row['worker']).update(
+            rating_sum=row['total'], rating_count=row['count'], rating=row['total'] / row['count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sidecrewapp', '0014_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agent',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agent',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='worker',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='worker',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:28
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_workers_accepted(apps, schema_editor):
+    """
+    Counts every application that took a slot (accepted or further along).
+    """
+    Job = apps.get_model('sidecrewapp', 'Job')
+    taken = Q(postings__applications__status__in=['ACCEPTED', 'PROOF_SUBMITTED', 'PROOF_REJECTED', 'COMPLETED'])
+    for job_id, accepted in Job.objects.annotate(
+        accepted=Count('postings__applications', filter=taken)
+    ).filter(accepted__gt=0).values_list('id', 'accepted'):
+        Job.objects.filter(pk=job_id).update(workers_accepted=accepted)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sidecrewapp', '0015_rating_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='workers_accepted',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_workers_accepted, migrations.RunPython.noop),
+    ]
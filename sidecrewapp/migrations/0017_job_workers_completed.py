@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:29
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_workers_completed(apps, schema_editor):
+    Job = apps.get_model('sidecrewapp', 'Job')
+    for job_id, completed in Job.objects.annotate(
+        completed=Count('postings__applications', filter=Q(postings__applications__status='COMPLETED'))
+    ).filter(completed__gt=0).values_list('id', 'completed'):
+        Job.objects.filter(pk=job_id).update(workers_completed=completed)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sidecrewapp', '0016_job_workers_accepted'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='workers_completed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_workers_completed, migrations.RunPython.noop),
+    ]
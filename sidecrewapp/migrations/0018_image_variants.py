@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sidecrewapp', '0017_job_workers_completed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agent',
+            name='profile_thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='profile_pics/thumbs/'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='profile_thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='profile_pics/thumbs/'),
+        ),
+        migrations.AddField(
+            model_name='worker',
+            name='profile_thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='profile_pics/thumbs/'),
+        ),
+        migrations.AddField(
+            model_name='workproof',
+            name='photo_latitude',
+            field=models.DecimalField(blank=True, decimal_places=7, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='workproof',
+            name='photo_longitude',
+            field=models.DecimalField(blank=True, decimal_places=7, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='workproof',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='work_proofs/thumbs/'),
+        ),
+    ]
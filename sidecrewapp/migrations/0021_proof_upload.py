@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:39
+
+import django.db.models.deletion
+import sidecrewapp.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sidecrewapp', '0020_media_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProofUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(default=sidecrewapp.models._upload_token, max_length=32, unique=True)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField()),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('checksum', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proof_uploads', to='sidecrewapp.application')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['application', 'checksum'], name='proofupload_app_checksum_idx')],
+            },
+        ),
+    ]
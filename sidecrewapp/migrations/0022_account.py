@@ -0,0 +1,115 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+ROLES = ('client', 'worker', 'agent')
+
+
+def create_accounts(apps, schema_editor):
+    """
+    Gives every client, worker and agent an Account with its email,
+    password hash and status.
+    """
+    Account = apps.get_model('sidecrewapp', 'Account')
+    for role in ROLES:
+        Profile = apps.get_model('sidecrewapp', role.capitalize())
+        for profile in Profile.objects.filter(account__isnull=True).iterator():
+            account = Account.objects.create(
+                role=role, email=profile.email, password=profile.password, status=profile.status
+            )
+            Profile.objects.filter(pk=profile.pk).update(account=account)
+
+
+def restore_passwords(apps, schema_editor):
+    for role in ROLES:
+        Profile = apps.get_model('sidecrewapp', role.capitalize())
+        for profile in Profile.objects.select_related('account').filter(account__isnull=False).iterator():
+            Profile.objects.filter(pk=profile.pk).update(password=profile.account.password)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sidecrewapp', '0021_proof_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Account',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('client', 'Client'), ('worker', 'Worker'), ('agent', 'Agent')], max_length=10)),
+                ('email', models.EmailField(max_length=254)),
+                ('password', models.CharField(max_length=128)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending', max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['role', 'status'], name='account_role_status_idx')],
+                'constraints': [models.UniqueConstraint(fields=('email', 'role'), name='account_email_role_uniq')],
+            },
+        ),
+        migrations.AddField(
+            model_name='agent',
+            name='account',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='agent', to='sidecrewapp.account'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='account',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='client', to='sidecrewapp.account'),
+        ),
+        migrations.AddField(
+            model_name='worker',
+            name='account',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='worker', to='sidecrewapp.account'),
+        ),
+        migrations.RunPython(create_accounts, restore_passwords),
+        # A default, so that unapplying can add the column back before
+        # restore_passwords fills it
+        migrations.AlterField(
+            model_name='agent',
+            name='password',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='password',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='worker',
+            name='password',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.RemoveField(
+            model_name='agent',
+            name='password',
+        ),
+        migrations.RemoveField(
+            model_name='client',
+            name='password',
+        ),
+        migrations.RemoveField(
+            model_name='worker',
+            name='password',
+        ),
+        migrations.AlterField(
+            model_name='agent',
+            name='email',
+            field=models.EmailField(max_length=254),
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='email',
+            field=models.EmailField(max_length=254),
+        ),
+        migrations.AlterField(
+            model_name='worker',
+            name='email',
+            field=models.EmailField(max_length=254),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sidecrewapp', '0022_account'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agent',
+            index=models.Index(fields=['email'], name='agent_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['email'], name='client_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['created_at', 'id'], name='job_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='job_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='worker',
+            index=models.Index(fields=['email'], name='worker_email_idx'),
+        ),
+    ]
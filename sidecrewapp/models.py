@@ -1,13 +1,53 @@
-from django.db import models
+import uuid
+
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+
+class Account(models.Model):
+    """
+    Login identity of a client, worker or agent: one row per role an email
+    address is registered for. Registration and login only touch this
+    table (see accounts.py); the profile row links back to it.
+    """
+    ROLE_CHOICES = (
+        ('client', 'Client'),
+        ('worker', 'Worker'),
+        ('agent', 'Agent'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('approved', 'Approved'),
+        ('rejected', 'Rejected'),
+    )
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    email = models.EmailField()
+    password = models.CharField(max_length=128)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            # Login lookup, and the only email uniqueness check
+            models.UniqueConstraint(fields=['email', 'role'], name='account_email_role_uniq'),
+        ]
+        indexes = [
+            # admin_home: counts grouped by role and status
+            models.Index(fields=['role', 'status'], name='account_role_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.email} ({self.role})"
 
 
 class Client(models.Model):
     name = models.CharField(max_length=100)
-    email = models.EmailField(unique=True)
-    password = models.CharField(max_length=100)
+    # email and status are copies of the account's, kept in step by accounts.py
+    account = models.OneToOneField(Account, on_delete=models.CASCADE, null=True, blank=True, related_name='client')
+    email = models.EmailField()
     profile_pic = models.ImageField(upload_to="profile_pics/", blank=True, null=True)
+    profile_thumbnail = models.ImageField(upload_to="profile_pics/thumbs/", blank=True, null=True)
     phone = models.CharField(max_length=15)
     company_name = models.CharField(max_length=100, blank=True, null=True)
 
@@ -21,20 +61,33 @@ class Client(models.Model):
 
     # --- END ADD ---
 
+    class Meta:
+        indexes = [
+            # manage_clients: filter/order by status, then name
+            models.Index(fields=['status', 'name'], name='client_status_name_idx'),
+            # manage_clients search (email prefix)
+            models.Index(fields=['email'], name='client_email_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
 
 class Worker(models.Model):
     name = models.CharField(max_length=100)
-    email = models.EmailField(unique=True)
-    password = models.CharField(max_length=100)
+    # email and status are copies of the account's, kept in step by accounts.py
+    account = models.OneToOneField(Account, on_delete=models.CASCADE, null=True, blank=True, related_name='worker')
+    email = models.EmailField()
     phone = models.CharField(max_length=15)
     profile_pic = models.ImageField(upload_to="profile_pics/", blank=True, null=True)
+    profile_thumbnail = models.ImageField(upload_to="profile_pics/thumbs/", blank=True, null=True)
     address = models.TextField()
     skills = models.TextField()
     availability = models.BooleanField(default=True)
     rating = models.FloatField(default=0)
+    # Running totals behind `rating` (see ratings.py)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
 
     # --- ADD THIS ---
     STATUS_CHOICES = (
@@ -46,19 +99,32 @@ class Worker(models.Model):
 
     # --- END ADD ---
 
+    class Meta:
+        indexes = [
+            # manage_workers: filter/order by status, then name
+            models.Index(fields=['status', 'name'], name='worker_status_name_idx'),
+            # manage_workers search (email prefix)
+            models.Index(fields=['email'], name='worker_email_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
 
 class Agent(models.Model):
     name = models.CharField(max_length=100)
-    email = models.EmailField(unique=True)
-    password = models.CharField(max_length=100)
+    # email and status are copies of the account's, kept in step by accounts.py
+    account = models.OneToOneField(Account, on_delete=models.CASCADE, null=True, blank=True, related_name='agent')
+    email = models.EmailField()
     phone = models.CharField(max_length=15)
     profile_pic = models.ImageField(upload_to="profile_pics/", blank=True, null=True)
+    profile_thumbnail = models.ImageField(upload_to="profile_pics/thumbs/", blank=True, null=True)
     address = models.TextField()
     agency_name = models.CharField(max_length=100)
     rating = models.FloatField(default=0.0)
+    # Running totals behind `rating` (see ratings.py)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
     latitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
     longitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
 
@@ -72,6 +138,16 @@ class Agent(models.Model):
 
     # --- END ADD ---
 
+    class Meta:
+        indexes = [
+            # Used by get_agents_near: status match + bounding-box range scan
+            models.Index(fields=['status', 'latitude', 'longitude'], name='agent_status_lat_lng_idx'),
+            # manage_agents: filter/order by status, then name
+            models.Index(fields=['status', 'name'], name='agent_status_name_idx'),
+            # manage_agents search (email prefix)
+            models.Index(fields=['email'], name='agent_email_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -104,6 +180,12 @@ class Job(models.Model):
 
     client_pay_per_worker = models.DecimalField(max_digits=10, decimal_places=2)
     workers_needed = models.PositiveIntegerField(default=1)
+    # Slots taken by accepted applications; changed only by conditional
+    # UPDATEs in accept_application so it can never exceed workers_needed
+    workers_accepted = models.PositiveIntegerField(default=0)
+    # Workers whose proof has been approved; changed under a row lock in
+    # agent_approve_proof, which completes the job at workers_needed
+    workers_completed = models.PositiveIntegerField(default=0)
 
     status = models.CharField(max_length=20, choices=JOB_STATUS_CHOICES, default='SEEKING_AGENT')
     # --- ADD THIS SECTION ---
@@ -125,6 +207,21 @@ class Job(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Used by "jobs near me": bounding-box range scan on the job location
+            models.Index(fields=['location_latitude', 'location_longitude'], name='job_location_idx'),
+            # agent_home: an agent's jobs by status
+            models.Index(fields=['agent', 'status'], name='job_agent_status_idx'),
+            # agent_home public board: status='SEEKING_AGENT' AND agent IS NULL, newest first
+            models.Index(fields=['status', 'agent', 'created_at'], name='job_status_agent_created_idx'),
+            # client_home: a client's jobs, newest first
+            models.Index(fields=['client', 'created_at'], name='job_client_created_idx'),
+            # admin_manage_jobs: newest first, optionally within one status
+            models.Index(fields=['created_at', 'id'], name='job_created_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='job_status_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} (Client: {self.client.name})"
 
@@ -147,6 +244,12 @@ class JobPosting(models.Model):
     is_active = models.BooleanField(default=True)  # Workers see this if True
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # worker_home feed: active postings, newest first
+            models.Index(fields=['is_active', 'created_at', 'id'], name='posting_active_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} (Posted by Agent: {self.agent.name})"
 
@@ -189,6 +292,14 @@ class Application(models.Model):
 
     # --- END ADD ---
 
+    class Meta:
+        indexes = [
+            # agent_home pending applications / slot checks per posting
+            models.Index(fields=['job_posting', 'status'], name='application_posting_status_idx'),
+            # worker_home "My Applications", newest first
+            models.Index(fields=['worker', 'applied_at', 'id'], name='application_worker_applied_idx'),
+        ]
+
     def __str__(self):
         return f"Application by {self.worker.name} for {self.job_posting.title}"
 
@@ -206,11 +317,17 @@ class WorkProof(models.Model):
 
     # The uploaded image
     image = models.ImageField(upload_to='work_proofs/')
+    # Small variant of the image for review pages (see images.py)
+    thumbnail = models.ImageField(upload_to='work_proofs/thumbs/', blank=True, null=True)
 
     # Geolocation data
     latitude = models.DecimalField(max_digits=10, decimal_places=7)
     longitude = models.DecimalField(max_digits=10, decimal_places=7)
 
+    # Where the camera says the photo was taken (EXIF GPS), if it recorded it
+    photo_latitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
+    photo_longitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
+
     # Status fields (for the agent's review)
     status = models.CharField(max_length=10, choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected')], default='PENDING')
     uploaded_at = models.DateTimeField(auto_now_add=True)
@@ -218,5 +335,95 @@ class WorkProof(models.Model):
     # A field for the agent to explain a rejection
     agent_remarks = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Pending proof counts and the review dashboard
+            models.Index(fields=['status', 'uploaded_at'], name='workproof_status_uploaded_idx'),
+        ]
+
+    def __str__(self):
+        return f"Proof for Application {self.application.id} - {self.status}"
+
+class Task(models.Model):
+    """
+    A unit of background work (see taskqueue.py), run by `manage.py run_workers`.
+    """
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    # Not picked up before this time (used for retry backoff)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    # Set when a worker claims the task. If the worker dies, the task is
+    # handed out again once locked_until has passed.
+    locked_until = models.DateTimeField(blank=True, null=True)
+    claim_token = models.CharField(max_length=32, blank=True)
+
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Picking up queued tasks and reclaiming expired ones
+            models.Index(fields=['status', 'run_after'], name='task_status_run_after_idx'),
+            models.Index(fields=['status', 'locked_until'], name='task_status_locked_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+
+class MediaBlob(models.Model):
+    """
+    A file in the content-addressed media storage (see storage.py), with
+    the number of saved references to it.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+
+def _upload_token():
+    return uuid.uuid4().hex
+
+
+class ProofUpload(models.Model):
+    """
+    A chunked, resumable work-proof upload in progress (see uploads.py).
+    The chunks themselves live on disk until the upload is finalized.
+    """
+    token = models.CharField(max_length=32, unique=True, default=_upload_token)
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='proof_uploads')
+
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    # SHA-256 of the whole file, as announced by the client
+    checksum = models.CharField(max_length=64)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Resuming: the same file for the same application
+            models.Index(fields=['application', 'checksum'], name='proofupload_app_checksum_idx'),
+        ]
+
     def __str__(self):
-        return f"Proof for Application {self.application.id} - {self.status}"
\ No newline at end of file
+        return f"Upload {self.token} for Application {self.application_id}"
@@ -0,0 +1,98 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are fetched with a WHERE on the last row seen instead of OFFSET, so
+page N costs the same as page 1 as long as the ordering columns are indexed.
+The cursor handed to the browser is an opaque, URL-safe string.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise InvalidCursor(cursor)
+
+    decoded = []
+    for field, value in zip(fields, values):
+        if field.endswith('_at'):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError) as exc:
+                raise InvalidCursor(cursor) from exc
+        elif not isinstance(value, (int, str)):
+            raise InvalidCursor(cursor)
+        decoded.append(value)
+    return decoded
+
+
+def _after(fields, values, descending):
+    """
+    Builds the row-value comparison (a, b) < (x, y) as
+    a < x OR (a = x AND b < y), which every backend can index.
+    """
+    lookup = 'lt' if descending else 'gt'
+    condition = Q()
+    for i, field in enumerate(fields):
+        step = Q(**{f'{field}__{lookup}': values[i]})
+        for prev_field, prev_value in zip(fields[:i], values[:i]):
+            step &= Q(**{prev_field: prev_value})
+        condition |= step
+    return condition
+
+
+def _page_queryset(queryset, cursor, fields, page_size, descending):
+    ordering = [f'-{field}' if descending else field for field in fields]
+    queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        queryset = queryset.filter(_after(fields, decode_cursor(cursor, fields), descending))
+
+    # One extra row tells us whether there is another page
+    return queryset[:page_size + 1]
+
+
+def _split_page(items, fields, page_size):
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, field) for field in fields])
+    return items, next_cursor
+
+
+def keyset_page(queryset, cursor=None, fields=('created_at', 'id'), page_size=20, descending=True):
+    """
+    Returns (items, next_cursor) for the page after `cursor`.
+
+    `fields` must end with a unique column (normally 'id') so the ordering
+    is total. next_cursor is None on the last page.
+    """
+    items = list(_page_queryset(queryset, cursor, fields, page_size, descending))
+    return _split_page(items, fields, page_size)
+
+
+async def akeyset_page(queryset, cursor=None, fields=('created_at', 'id'), page_size=20, descending=True):
+    """
+    keyset_page() for async views, using the async ORM.
+    """
+    items = [item async for item in _page_queryset(queryset, cursor, fields, page_size, descending)]
+    return _split_page(items, fields, page_size)
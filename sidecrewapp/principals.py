@@ -0,0 +1,65 @@
+"""
+The logged-in agent, client or worker ("principal") of a request.
+
+load_principal() resolves it once per request (memoized on the request)
+and otherwise serves it from the cache, under a key with the row's id and
+a version stamp. Every save or delete of the row bumps the version (see
+signals.py), as does code that changes it with a queryset update, so an
+edited profile or a changed status is seen on the very next request.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cacheversions import bump_version, get_version
+from .models import Agent, Client, Worker
+
+PRINCIPAL_CACHE_TIMEOUT = getattr(settings, 'PRINCIPAL_CACHE_TIMEOUT', 60)
+
+ROLE_MODELS = {
+    'agent': Agent,
+    'client': Client,
+    'worker': Worker,
+}
+
+
+def _version_key(role, pk):
+    return f'principal:{role}:{pk}:version'
+
+
+def _cache_key(role, pk):
+    return f'principal:{role}:{pk}:{get_version(_version_key(role, pk))}'
+
+
+def load_principal(request, role):
+    """
+    Returns the logged-in Agent / Client / Worker for `role`, using the id
+    in the session. Raises the model's DoesNotExist (like .get()) when the
+    session has no id or the row is gone.
+    """
+    model = ROLE_MODELS[role]
+    memo = request.__dict__.setdefault('_principals', {})
+    if role in memo:
+        return memo[role]
+
+    pk = request.session.get(f'{role}_id')
+    if pk is None:
+        raise model.DoesNotExist(f"No {role} in the session.")
+
+    key = _cache_key(role, pk)
+    principal = cache.get(key)
+    if principal is None:
+        # .get() raises DoesNotExist for a deleted user
+        principal = model.objects.get(pk=pk)
+        cache.set(key, principal, PRINCIPAL_CACHE_TIMEOUT)
+
+    memo[role] = principal
+    return principal
+
+
+def invalidate_principal(role, pk):
+    """
+    Drops the cached `role` with id `pk` once the current transaction
+    commits.
+    """
+    transaction.on_commit(lambda: bump_version(_version_key(role, pk)))
@@ -0,0 +1,60 @@
+"""
+Running rating aggregates for agents and workers.
+
+Agent and Worker keep rating_sum and rating_count next to the displayed
+average (rating). A new rating is applied with F() expressions, so the
+database does the arithmetic on the locked row: it costs two single-row
+UPDATEs no matter how many ratings came before, and concurrent raters
+cannot overwrite each other's totals.
+"""
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Sum
+from django.db.models.functions import Cast
+
+from .models import Agent, Application, Job, Worker
+from .principals import invalidate_principal
+
+
+def _average():
+    return ExpressionWrapper(
+        Cast(F('rating_sum'), FloatField()) / F('rating_count'),
+        output_field=FloatField()
+    )
+
+
+def _add_rating(model, pk, rating):
+    # Must run inside the caller's transaction: the first UPDATE locks the
+    # row, the second derives the average from the new totals.
+    model.objects.filter(pk=pk).update(
+        rating_sum=F('rating_sum') + rating,
+        rating_count=F('rating_count') + 1,
+    )
+    model.objects.filter(pk=pk, rating_count__gt=0).update(rating=_average())
+    invalidate_principal(model._meta.model_name, pk)
+
+
+def add_agent_rating(agent_id, rating):
+    _add_rating(Agent, agent_id, rating)
+
+
+def add_worker_rating(worker_id, rating):
+    _add_rating(Worker, worker_id, rating)
+
+
+def totals_from_history():
+    """
+    Returns ({agent_id: (sum, count)}, {worker_id: (sum, count)}) computed
+    from every rated Job / Application.
+    """
+    agent_totals = {
+        row['agent']: (row['total'], row['count'])
+        for row in Job.objects.filter(
+            agent__isnull=False, client_rating_for_agent__isnull=False
+        ).values('agent').annotate(total=Sum('client_rating_for_agent'), count=Count('id'))
+    }
+    worker_totals = {
+        row['worker']: (row['total'], row['count'])
+        for row in Application.objects.filter(
+            agent_rating_for_worker__isnull=False
+        ).values('worker').annotate(total=Sum('agent_rating_for_worker'), count=Count('id'))
+    }
+    return agent_totals, worker_totals
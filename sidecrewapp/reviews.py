@@ -0,0 +1,117 @@
+"""
+Bulk review of work proofs.
+
+review_proofs() approves or rejects many proofs of one agent in a single
+transaction: the affected job rows are locked first (the same order the
+single-proof approval uses), then the proofs. Proofs, applications and
+jobs are written back with one bulk_update each, and every job's
+completion is recomputed once however many of its proofs were approved.
+The workers, and the clients of completed jobs, are sent a live event
+each (events.py) once the transaction commits.
+"""
+from collections import Counter
+
+from django.db import transaction
+
+from . import events
+from .models import Application, Job, WorkProof
+
+APPROVE = 'approve'
+REJECT = 'reject'
+
+# Upper bound on proofs per request, to keep the transaction short
+MAX_BULK_REVIEW = 200
+
+# Per-item results
+APPROVED = 'approved'
+REJECTED = 'rejected'
+ALREADY_REVIEWED = 'already_reviewed'
+NOT_FOUND = 'not_found'
+
+
+def review_proofs(agent_id, proof_ids, action, remarks=''):
+    """
+    Applies `action` (APPROVE or REJECT) to every proof in `proof_ids`
+    that belongs to a job managed by `agent_id`.
+
+    Returns (results, completed_jobs): `results` is a list of
+    {'id', 'result', 'worker'} dicts in the order of `proof_ids`, and
+    `completed_jobs` the jobs that reached their worker count.
+    """
+    if action not in (APPROVE, REJECT):
+        raise ValueError(f"Unknown review action: {action}")
+
+    proof_ids = list(dict.fromkeys(proof_ids))
+    if len(proof_ids) > MAX_BULK_REVIEW:
+        raise ValueError(f"At most {MAX_BULK_REVIEW} proofs can be reviewed at once")
+
+    # SECURITY CHECK: every query below is limited to the agent's own proofs
+    agent_proofs = WorkProof.objects.filter(id__in=proof_ids, application__job_posting__agent_id=agent_id)
+
+    with transaction.atomic():
+        # 1. Lock the affected jobs first, in id order, so bulk and single
+        #    approvals of the same job queue up instead of deadlocking
+        jobs = {}
+        if action == APPROVE:
+            job_ids = set(agent_proofs.values_list('application__job_posting__job_id', flat=True))
+            jobs = Job.objects.select_for_update().only(
+                'title', 'client_id', 'workers_needed', 'workers_completed', 'status'
+            ).filter(id__in=job_ids).order_by('id').in_bulk()
+
+        # 2. Lock the proofs, reading their status under the lock
+        proofs = {
+            proof.id: proof
+            for proof in agent_proofs.select_for_update().select_related('application__worker', 'application__job_posting')
+        }
+
+        # 3. Apply the transitions in memory
+        results = []
+        changed_proofs, changed_applications = [], []
+        approved_per_job = Counter()
+        for proof_id in proof_ids:
+            proof = proofs.get(proof_id)
+            if proof is None:
+                results.append({'id': proof_id, 'result': NOT_FOUND, 'worker': None})
+                continue
+
+            worker = proof.application.worker.name
+            if proof.status != 'PENDING':
+                results.append({'id': proof_id, 'result': ALREADY_REVIEWED, 'worker': worker})
+                continue
+
+            application = proof.application
+            if action == APPROVE:
+                proof.status = 'APPROVED'
+                application.status = 'COMPLETED'
+                approved_per_job[application.job_posting.job_id] += 1
+                results.append({'id': proof_id, 'result': APPROVED, 'worker': worker})
+            else:
+                proof.status = 'REJECTED'
+                proof.agent_remarks = remarks
+                # Back to the worker, who can re-submit
+                application.status = 'PROOF_REJECTED'
+                results.append({'id': proof_id, 'result': REJECTED, 'worker': worker})
+            changed_proofs.append(proof)
+            changed_applications.append(application)
+
+        # 4. Write everything back, one statement per table
+        WorkProof.objects.bulk_update(changed_proofs, ['status', 'agent_remarks'])
+        Application.objects.bulk_update(changed_applications, ['status'])
+
+        completed_jobs = []
+        changed_jobs = []
+        for job_id, approved in approved_per_job.items():
+            job = jobs[job_id]
+            job.workers_completed += approved
+            if job.workers_completed >= job.workers_needed and job.status != 'COMPLETED':
+                job.status = 'COMPLETED'
+                completed_jobs.append(job)
+            changed_jobs.append(job)
+        Job.objects.bulk_update(changed_jobs, ['workers_completed', 'status'])
+
+        for application in changed_applications:
+            events.publish_application_status(application)
+        for job in completed_jobs:
+            events.publish_job_status(job, f"All workers have finished '{job.title}'.")
+
+    return results, completed_jobs
@@ -0,0 +1,125 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .adminstats import invalidate_admin_stats
+from .geo import agent_coordinates
+from .principals import invalidate_principal
+from .models import Account, Agent, Client, Worker, WorkProof
+
+
+# Agents are approved, rejected, moved (profile edit) or deleted through
+# .save()/.delete(), so dropping the cached arrays here keeps the map in sync.
+# Waiting for the commit stops a concurrent reload from caching the old rows.
+@receiver(post_save, sender=Agent)
+@receiver(post_delete, sender=Agent)
+def reset_agent_coordinates(sender, **kwargs):
+    transaction.on_commit(agent_coordinates.invalidate)
+
+
+# Profile edits, status changes (approve / reject) and deletes all go
+# through .save()/.delete(): drop the cached principal (see principals.py).
+@receiver(post_save, sender=Agent)
+@receiver(post_save, sender=Client)
+@receiver(post_save, sender=Worker)
+@receiver(post_delete, sender=Agent)
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=Worker)
+def reset_cached_principal(sender, instance, **kwargs):
+    invalidate_principal(sender._meta.model_name, instance.pk)
+
+
+# Deleting a profile (admin delete, "delete my profile") also deletes its
+# login (and the admin counts); the account's own delete cascades the
+# other way.
+@receiver(post_delete, sender=Agent)
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=Worker)
+def delete_account(sender, instance, origin=None, **kwargs):
+    # `origin` is what .delete() was called on: nothing to do when the
+    # account itself (or a queryset of accounts) is being deleted
+    if instance.account_id and getattr(origin, 'model', type(origin)) is not Account:
+        Account.objects.filter(pk=instance.account_id).delete()
+    invalidate_admin_stats()
+
+
+# --- Media references (see storage.py) ---
+# A file is released once the row that pointed at it is deleted, or saved
+# with a different file. The names a row was loaded with are remembered
+# on the instance, so this needs no extra query. Re-uploading the same
+# content gives the same name, but the upload still took a reference:
+# the one the row held before is released too.
+
+MEDIA_FIELDS = {
+    Client: ('profile_pic', 'profile_thumbnail'),
+    Worker: ('profile_pic', 'profile_thumbnail'),
+    Agent: ('profile_pic', 'profile_thumbnail'),
+    WorkProof: ('image', 'thumbnail'),
+}
+
+
+def _file_names(instance):
+    names = {}
+    for field in MEDIA_FIELDS[type(instance)]:
+        if field in instance.__dict__:  # not deferred
+            value = instance.__dict__[field]
+            names[field] = value if isinstance(value, str) else getattr(value, 'name', None) or ''
+    return names
+
+
+def _release(instance, names):
+    for field, name in names.items():
+        if name:
+            storage = instance._meta.get_field(field).storage
+            transaction.on_commit(lambda storage=storage, name=name: storage.delete(name))
+
+
+def _field_values(instance):
+    return {field: instance.__dict__.get(field) for field in MEDIA_FIELDS[type(instance)]}
+
+
+def remember_media(sender, instance, **kwargs):
+    instance._media_names = _file_names(instance)
+    instance._media_values = _field_values(instance)
+
+
+def note_uploaded_media(sender, instance, raw=False, **kwargs):
+    """
+    Notes the fields this save gives a newly stored file, each of which
+    took a blob reference: an assigned upload, stored by the save itself,
+    or a name set by FieldFile.save(), which stores the file first.
+    """
+    loaded = getattr(instance, '_media_values', {})
+    instance._media_uploads = set()
+    for field, value in _field_values(instance).items():
+        if isinstance(value, str):
+            if value is not loaded.get(field):
+                instance._media_uploads.add(field)
+        elif value is not None and not getattr(instance, field)._committed:
+            instance._media_uploads.add(field)
+
+
+def release_replaced_media(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    current = _file_names(instance)
+    previous = getattr(instance, '_media_names', {})
+    uploaded = getattr(instance, '_media_uploads', set())
+    _release(instance, {
+        field: name for field, name in previous.items()
+        if field in current and (current[field] != name or field in uploaded)
+    })
+    instance._media_names = current
+    instance._media_values = _field_values(instance)
+    instance._media_uploads = set()
+
+
+def release_deleted_media(sender, instance, **kwargs):
+    _release(instance, _file_names(instance))
+
+
+for model in MEDIA_FIELDS:
+    post_init.connect(remember_media, sender=model, dispatch_uid=f'remember_media_{model.__name__}')
+    pre_save.connect(note_uploaded_media, sender=model, dispatch_uid=f'note_uploaded_media_{model.__name__}')
+    post_save.connect(release_replaced_media, sender=model, dispatch_uid=f'release_replaced_media_{model.__name__}')
+    post_delete.connect(release_deleted_media, sender=model, dispatch_uid=f'release_deleted_media_{model.__name__}')
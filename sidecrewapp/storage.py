@@ -0,0 +1,120 @@
+"""
+Content-addressed storage for uploaded media.
+
+Every file is stored once under the SHA-256 of its content
+(media/blobs/ab/ab12...ef.jpg), whatever name it was uploaded with, so
+re-uploading the same picture costs no disk space. The MediaBlob table
+counts how many saves reference each blob: save() adds a reference and
+delete() drops one, removing the file with the last reference. signals.py
+releases the files of deleted or replaced profiles and proofs, and
+`manage.py gc_media` repairs the counts and moves older files in.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+BLOB_DIR = 'blobs'
+
+
+def blob_name(digest, original_name):
+    ext = os.path.splitext(original_name)[1].lower()[:10]
+    if ext == '.jpeg':
+        ext = '.jpg'
+    return f'{BLOB_DIR}/{digest[:2]}/{digest}{ext}'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_DIR + '/')
+
+
+def _blobs():
+    # Looked up lazily: this module is loaded with the settings, before the apps
+    return apps.get_model('sidecrewapp', 'MediaBlob')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content (see _save), and two files
+        # with the same name have the same content, so never rename
+        return name
+
+    def _save(self, name, content):
+        sha = hashlib.sha256()
+        size = 0
+        for chunk in content.chunks():
+            sha.update(chunk)
+            size += len(chunk)
+        name = blob_name(sha.hexdigest(), name)
+
+        # Take the reference before checking the file: a concurrent delete
+        # of the last reference holds the row lock while it removes the
+        # file, so by the time we get here it is either still there or we
+        # write it again below.
+        self._add_reference(name, size)
+        if not self.exists(name):
+            self._write(name, content)
+        return name
+
+    def _write(self, name, content):
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file and rename it into place, so a reader
+        # never sees a half-written blob, even if two uploads of the same
+        # content race each other.
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in content.chunks():
+                    tmp.write(chunk)
+            os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _add_reference(self, name, size):
+        MediaBlob = _blobs()
+        now = timezone.now()
+        if MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1, updated_at=now):
+            return
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.create(name=name, size=size, refcount=1)
+        except IntegrityError:
+            # Someone else stored the same content at the same moment
+            MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1, updated_at=now)
+
+    def delete(self, name):
+        """
+        Drops one reference to `name`; the file is removed with the last
+        one. Files from before this storage (no MediaBlob row) are removed
+        straight away.
+
+        Call it outside any surrounding transaction (e.g. from
+        transaction.on_commit): the file is gone even if that transaction
+        is rolled back.
+        """
+        if not is_blob(name):
+            super().delete(name)
+            return
+
+        MediaBlob = _blobs()
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return
+            if blob.refcount > 1:
+                MediaBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1, updated_at=timezone.now())
+                return
+            blob.delete()
+            super().delete(name)
@@ -0,0 +1,137 @@
+"""
+A small job queue backed by the Task table, so no broker is needed.
+
+Views call enqueue() and return straight away; `manage.py run_workers`
+claims and runs the tasks. Claiming is a conditional UPDATE (the same
+pattern as accept_application), so two workers can never claim the same
+task. A claimed task is invisible to other workers until its visibility
+timeout passes: if the worker crashes, the task is picked up again. Failed
+tasks are retried with exponential backoff up to `max_attempts` times.
+"""
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+TASK_VISIBILITY_TIMEOUT = getattr(settings, 'TASK_VISIBILITY_TIMEOUT', 300)
+TASK_MAX_ATTEMPTS = getattr(settings, 'TASK_MAX_ATTEMPTS', 5)
+# Delay before the first retry in seconds; doubles with every attempt
+TASK_RETRY_DELAY = getattr(settings, 'TASK_RETRY_DELAY', 30)
+
+# How many candidates a worker tries before concluding the queue is empty
+CLAIM_CANDIDATES = 10
+
+_registry = {}
+
+
+def task(name):
+    """
+    Registers a function as a task handler, e.g.
+
+        @task('process_work_proof_image')
+        def process_work_proof_image(proof_id): ...
+
+    Handler arguments must be JSON serialisable.
+    """
+    def register(func):
+        _registry[name] = func
+        return func
+    return register
+
+
+def enqueue(name, max_attempts=None, **kwargs):
+    """
+    Queues the task `name` to be called with `kwargs`. The row is written
+    in the caller's transaction, so it only becomes visible to the
+    workers if that transaction commits.
+    """
+    if name not in _registry:
+        raise ValueError(f"Unknown task: {name}")
+    return Task.objects.create(name=name, args=kwargs, max_attempts=max_attempts or TASK_MAX_ATTEMPTS)
+
+
+def _ready(now):
+    # Queued and due, or claimed by a worker that never finished it
+    return Q(status='QUEUED', run_after__lte=now) | Q(status='RUNNING', locked_until__lt=now)
+
+
+def claim(visibility_timeout=TASK_VISIBILITY_TIMEOUT):
+    """
+    Claims the next runnable task for this worker, or returns None.
+    """
+    now = timezone.now()
+    candidates = Task.objects.filter(_ready(now)).order_by('run_after', 'id').values_list('id', flat=True)
+
+    for task_id in candidates[:CLAIM_CANDIDATES]:
+        token = uuid.uuid4().hex
+        # Only one worker's UPDATE can match the row while it is still ready
+        claimed = Task.objects.filter(_ready(now), id=task_id).update(
+            status='RUNNING',
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=visibility_timeout),
+            claim_token=token,
+        )
+        if claimed:
+            return Task.objects.get(id=task_id)
+    return None
+
+
+def _finish(task_obj, **fields):
+    # Guarded by the claim token: if this worker overran the visibility
+    # timeout and someone else reclaimed the task, leave their claim alone
+    return Task.objects.filter(id=task_obj.id, claim_token=task_obj.claim_token).update(**fields)
+
+
+def run(task_obj):
+    """
+    Runs one claimed task and records the outcome. Returns the new status.
+    """
+    now = timezone.now()
+    handler = _registry.get(task_obj.name)
+
+    if handler is None or task_obj.attempts > task_obj.max_attempts:
+        # Unknown name, or a task that kept crashing its workers
+        error = f"Unknown task: {task_obj.name}" if handler is None else "Too many attempts"
+        _finish(task_obj, status='FAILED', last_error=error, finished_at=now, locked_until=None)
+        return 'FAILED'
+
+    try:
+        handler(**task_obj.args)
+    except Exception:
+        error = traceback.format_exc()[-4000:]
+        logger.warning("Task %s #%s failed (attempt %s)", task_obj.name, task_obj.id, task_obj.attempts)
+
+        if task_obj.attempts >= task_obj.max_attempts:
+            _finish(task_obj, status='FAILED', last_error=error, finished_at=timezone.now(), locked_until=None)
+            return 'FAILED'
+
+        delay = TASK_RETRY_DELAY * 2 ** (task_obj.attempts - 1)
+        _finish(task_obj, status='QUEUED', last_error=error, locked_until=None,
+                run_after=timezone.now() + timedelta(seconds=delay))
+        return 'QUEUED'
+
+    _finish(task_obj, status='DONE', finished_at=timezone.now(), locked_until=None)
+    return 'DONE'
+
+
+def run_pending(visibility_timeout=TASK_VISIBILITY_TIMEOUT, limit=None):
+    """
+    Runs runnable tasks until the queue is empty (or `limit` tasks ran).
+    Returns the number of tasks run.
+    """
+    count = 0
+    while limit is None or count < limit:
+        task_obj = claim(visibility_timeout)
+        if task_obj is None:
+            break
+        run(task_obj)
+        count += 1
+    return count
@@ -0,0 +1,59 @@
+"""
+Background task handlers, run by `manage.py run_workers` (see taskqueue.py).
+
+Handlers must be safe to run more than once: a task is retried when it
+fails, or when its worker dies half-way through.
+"""
+from django.apps import apps
+
+from .images import (
+    InvalidImage, process_stored_image,
+    PROFILE_PIC_SIZE, PROFILE_THUMB_SIZE, WORK_PROOF_SIZE, WORK_PROOF_THUMB_SIZE,
+)
+from .models import WorkProof
+from .principals import invalidate_principal
+from .taskqueue import enqueue, task
+
+PROFILE_MODELS = ('client', 'worker', 'agent')
+
+
+@task('process_work_proof_image')
+def process_work_proof_image(proof_id):
+    proof = WorkProof.objects.filter(id=proof_id).first()
+    # Deleted, or already processed by an earlier run
+    if proof is None or proof.thumbnail:
+        return
+    try:
+        process_stored_image(proof, 'image', 'thumbnail', WORK_PROOF_SIZE, WORK_PROOF_THUMB_SIZE,
+                             delete_original=True)
+    except (InvalidImage, FileNotFoundError):
+        # Retrying won't help; the original stays as uploaded
+        pass
+
+
+@task('process_profile_pic')
+def process_profile_pic(model, pk):
+    if model not in PROFILE_MODELS:
+        raise ValueError(f"Unknown profile model: {model}")
+    user = apps.get_model('sidecrewapp', model).objects.filter(pk=pk).first()
+    if user is None or not user.profile_pic or user.profile_thumbnail:
+        return
+    try:
+        processed = process_stored_image(user, 'profile_pic', 'profile_thumbnail', PROFILE_PIC_SIZE,
+                                         PROFILE_THUMB_SIZE, delete_original=True)
+    except (InvalidImage, FileNotFoundError):
+        return
+    if processed:
+        # The cached copy still points at the original file
+        invalidate_principal(model, pk)
+
+
+def queue_profile_pic(user):
+    """
+    Queues processing of a freshly saved profile picture.
+    """
+    enqueue('process_profile_pic', model=user._meta.model_name, pk=user.pk)
+
+
+def queue_work_proof_image(proof):
+    enqueue('process_work_proof_image', proof_id=proof.pk)
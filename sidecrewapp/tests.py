@@ -1,3 +1,1890 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import ExifTags, Image
+
+from .dashboard import dashboard_cache_stats, invalidate_client_dashboards, invalidate_worker_dashboards
+from .geo import agent_coordinates, haversine_many, points_within
+from .principals import load_principal
+from .images import InvalidImage, process_image
+from . import api, events, metrics, taskqueue, uploads, urls
+from .models import Account, Agent, Application, Client, Job, JobPosting, MediaBlob, ProofUpload, Task, Worker, WorkProof
+
+
+def make_account(role, email, password="x", status='approved'):
+    return Account.objects.create(role=role, email=email, password=password, status=status)
+
+
+def make_client(n=0, **kwargs):
+    email = f"client{n}@example.com"
+    return Client.objects.create(
+        name=f"Client {n}", email=email, account=make_account('client', email),
+        phone="9000000000", status='approved', **kwargs
+    )
+
+
+def make_worker(n=0, **kwargs):
+    email = f"worker{n}@example.com"
+    return Worker.objects.create(
+        name=f"Worker {n}", email=email, account=make_account('worker', email),
+        phone="9000000000", address="Kochi", skills="Serving", status='approved', **kwargs
+    )
+
+
+def make_agent(n=0, **kwargs):
+    email = f"agent{n}@example.com"
+    fields = {'latitude': '9.9312', 'longitude': '76.2673', 'status': 'approved', **kwargs}
+    return Agent.objects.create(
+        name=f"Agent {n}", email=email, account=make_account('agent', email),
+        phone="9000000000", address="Kochi", agency_name=f"Agency {n}", **fields
+    )
+
+
+def make_job(client, agent=None, status='OPEN', n=0, **kwargs):
+    return Job.objects.create(
+        client=client, agent=agent, status=status, title=f"Job {n}",
+        description="Event staff", client_pay_per_worker=500, workers_needed=kwargs.pop('workers_needed', 3),
+        location_latitude='9.9312', location_longitude='76.2673', **kwargs
+    )
+
+
+def make_posting(job, n=0):
+    return JobPosting.objects.create(
+        job=job, agent=job.agent, title=f"Posting {n}", description="Event staff", worker_pay_rate=450
+    )
+
+
+def build_agent_dashboard(agent, size):
+    """
+    Gives `agent` `size` jobs in every dashboard section, each posted job
+    with `size` applications in a mix of states.
+    """
+    client = make_client(f"{agent.id}-dash")
+    workers = [make_worker(f"{agent.id}-{i}") for i in range(size)]
+
+    for i in range(size):
+        make_job(client, agent, status='PENDING_AGENT', n=i)
+        make_job(client, None, status='SEEKING_AGENT', n=i)
+        make_job(client, agent, status='OPEN', n=i)
+
+        for status, app_status in [('OPEN', 'PENDING'), ('FILLED', 'PROOF_SUBMITTED'), ('COMPLETED', 'COMPLETED')]:
+            posting = make_posting(make_job(client, agent, status=status, n=i), n=i)
+            for worker in workers:
+                application = Application.objects.create(job_posting=posting, worker=worker, status=app_status)
+                if app_status == 'PROOF_SUBMITTED':
+                    WorkProof.objects.create(application=application, image='work_proofs/x.jpg',
+                                             latitude='9.9312', longitude='76.2673')
+
+
+class LoginMixin:
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def login_as(self, role, user):
+        session = self.client.session
+        session['is_loggedin'] = True
+        session['user_role'] = role
+        session[f'{role}_id'] = user.id
+        session[f'{role}_name'] = user.name
+        session.save()
+
+
+class AgentHomeQueryCountTests(LoginMixin, TestCase):
+    # session + agent + jobs + public board + postings + applications
+    # + pending applications + pending proof count
+    MAX_QUERIES = 8
+
+    def count_queries(self, size):
+        agent = make_agent(size)
+        build_agent_dashboard(agent, size)
+        self.login_as('agent', agent)
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('agent_home'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_bounded(self):
+        self.assertLessEqual(self.count_queries(1), self.MAX_QUERIES)
+
+    def test_query_count_does_not_grow_with_data(self):
+        self.assertEqual(self.count_queries(1), self.count_queries(5))
+
+    def test_sections(self):
+        agent = make_agent()
+        build_agent_dashboard(agent, 2)
+        self.login_as('agent', agent)
+
+        context = self.client.get(reverse('agent_home')).context
+        self.assertEqual(len(context['direct_invites']), 2)
+        self.assertEqual(len(context['new_invites']), 2)
+        self.assertEqual(len(context['active_jobs']), 2)
+        self.assertEqual(len(context['active_postings']), 4)
+        self.assertEqual(len(context['completed_jobs']), 2)
+        self.assertEqual(len(context['pending_applications']), 4)
+        self.assertEqual(context['pending_proof_count'], 4)
+
+
+class AgentDashboardCacheTests(LoginMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.agent = make_agent()
+        self.worker = make_worker()
+        self.posting = make_posting(make_job(make_client(), self.agent, status='OPEN'))
+        self.application = Application.objects.create(job_posting=self.posting, worker=self.worker)
+        self.login_as('agent', self.agent)
+
+    def test_second_load_is_served_from_cache(self):
+        self.client.get(reverse('agent_home'))
+        # The session only: the agent comes from the principal cache
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('agent_home'))
+        self.assertEqual(len(response.context['pending_applications']), 1)
+        self.assertEqual(dashboard_cache_stats()['hits'], 2)
+
+    def test_deleted_agent_is_sent_to_login(self):
+        self.client.get(reverse('agent_home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Agent.objects.filter(pk=self.agent.pk).delete()
+        self.assertRedirects(self.client.get(reverse('agent_home')), reverse('agent_login'))
+
+    def test_state_change_invalidates_dashboard(self):
+        self.client.get(reverse('agent_home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('accept_application', args=[self.application.id]))
+
+        response = self.client.get(reverse('agent_home'))
+        self.assertEqual(response.context['pending_applications'], [])
+
+    def test_worker_or_client_change_only_drops_dashboards_showing_them(self):
+        other = make_agent(1)
+        self.client.get(reverse('agent_home'))
+        self.login_as('agent', other)
+        self.client.get(reverse('agent_home'))
+
+        for invalidate in (lambda: invalidate_worker_dashboards(self.worker.id),
+                           lambda: invalidate_client_dashboards(self.posting.job.client_id)):
+            with self.captureOnCommitCallbacks(execute=True):
+                invalidate()
+            misses = dashboard_cache_stats()['misses']
+            # The other agent never dealt with the worker or client
+            self.login_as('agent', other)
+            self.client.get(reverse('agent_home'))
+            self.assertEqual(dashboard_cache_stats()['misses'], misses)
+            self.login_as('agent', self.agent)
+            self.client.get(reverse('agent_home'))
+            self.assertEqual(dashboard_cache_stats()['misses'], misses + 1)
+
+    def test_new_application_invalidates_dashboard(self):
+        self.client.get(reverse('agent_home'))
+
+        self.login_as('worker', make_worker(1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('apply_for_job', args=[self.posting.id]))
+        self.login_as('agent', self.agent)
+
+        response = self.client.get(reverse('agent_home'))
+        self.assertEqual(len(response.context['pending_applications']), 2)
+
+
+class WorkerFeedTests(LoginMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.worker = make_worker()
+        agent = make_agent()
+        client = make_client()
+        self.postings = [make_posting(make_job(client, agent, n=i), n=i) for i in range(25)]
+        Application.objects.create(job_posting=self.postings[3], worker=self.worker)
+        self.login_as('worker', self.worker)
+
+    def test_feed_pages_cover_every_unapplied_posting_once(self):
+        response = self.client.get(reverse('worker_home'))
+        seen = [job.id for job in response.context['available_jobs']]
+        cursor = response.context['jobs_cursor']
+
+        while cursor:
+            data = self.client.get(reverse('worker_job_feed'), {'cursor': cursor}).json()
+            seen.extend(int(i) for i in re.findall(r'/worker/apply/(\d+)/', data['html']))
+            cursor = data['next_cursor']
+
+        expected = sorted((p.id for p in self.postings if p != self.postings[3]), reverse=True)
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('worker_job_feed'), {'cursor': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_application_feed(self):
+        data = self.client.get(reverse('worker_application_feed')).json()
+        self.assertEqual(data['count'], 1)
+        self.assertIsNone(data['next_cursor'])
+
+
+class WorkerJobsNearTests(LoginMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.worker = make_worker()
+        agent = make_agent()
+        client = make_client()
+        # Kochi, Thrissur (~70 km away) and Bengaluru (~360 km away)
+        self.kochi = make_posting(make_job(client, agent, n=1))
+        self.thrissur = make_posting(make_job(client, agent, n=2, location_address='Thrissur'))
+        Job.objects.filter(pk=self.thrissur.job_id).update(location_latitude='10.5276', location_longitude='76.2144')
+        self.bengaluru = make_posting(make_job(client, agent, n=3))
+        Job.objects.filter(pk=self.bengaluru.job_id).update(location_latitude='12.9716', location_longitude='77.5946')
+        self.login_as('worker', self.worker)
+
+    def near(self, **params):
+        return self.client.get(reverse('worker_jobs_near'), {'lat': '9.95', 'lng': '76.27', **params})
+
+    def test_ranked_by_distance_within_radius(self):
+        jobs = self.near(radius=100).json()['jobs']
+        self.assertEqual([job['id'] for job in jobs], [self.kochi.id, self.thrissur.id])
+        self.assertLess(float(jobs[0]['distance']), float(jobs[1]['distance']))
+
+    def test_radius_and_limit(self):
+        self.assertEqual(len(self.near(radius=10).json()['jobs']), 1)
+        self.assertEqual(len(self.near(radius=100, limit=1).json()['jobs']), 1)
+
+    def test_excludes_applied_postings(self):
+        Application.objects.create(job_posting=self.kochi, worker=self.worker)
+        jobs = self.near(radius=100).json()['jobs']
+        self.assertEqual([job['id'] for job in jobs], [self.thrissur.id])
+
+    def test_invalid_params(self):
+        self.assertEqual(self.near(radius=0).status_code, 400)
+        self.assertEqual(self.client.get(reverse('worker_jobs_near')).status_code, 400)
+
+    def test_worker_home_near_mode(self):
+        response = self.client.get(reverse('worker_home'), {'near': 1, 'lat': '9.95', 'lng': '76.27', 'radius': 25})
+        self.assertEqual([job.id for job in response.context['available_jobs']], [self.kochi.id])
+        self.assertContains(response, 'km away')
+
+
+class RatingAggregateTests(LoginMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.agent = make_agent()
+        self.client_user = make_client()
+        self.worker = make_worker()
+        posting = make_posting(make_job(self.client_user, self.agent, status='COMPLETED'))
+        self.jobs = [make_job(self.client_user, self.agent, status='COMPLETED', n=i) for i in range(2)]
+        self.applications = [
+            Application.objects.create(job_posting=posting, worker=self.worker, status='COMPLETED') for _ in range(2)
+        ]
+
+    def test_client_ratings_update_running_average(self):
+        self.login_as('client', self.client_user)
+        self.client.post(reverse('client_rate_agent', args=[self.jobs[0].id]), {'rating': 5})
+        self.client.post(reverse('client_rate_agent', args=[self.jobs[1].id]), {'rating': 2})
+        # A second rating for the same job is ignored
+        self.client.post(reverse('client_rate_agent', args=[self.jobs[1].id]), {'rating': 1})
+
+        self.agent.refresh_from_db()
+        self.assertEqual((self.agent.rating_sum, self.agent.rating_count), (7, 2))
+        self.assertAlmostEqual(self.agent.rating, 3.5)
+
+    def test_agent_rating_is_constant_queries(self):
+        self.login_as('agent', self.agent)
+        # Warm the cached principal so both requests do the same work
+        self.client.get(reverse('agent_review_dashboard'))
+        with CaptureQueriesContext(connection) as first:
+            self.client.post(reverse('agent_rate_worker', args=[self.applications[0].id]), {'rating': 4})
+        with CaptureQueriesContext(connection) as second:
+            self.client.post(reverse('agent_rate_worker', args=[self.applications[1].id]), {'rating': 3})
+        self.assertEqual(len(first), len(second))
+
+        self.worker.refresh_from_db()
+        self.assertEqual((self.worker.rating_sum, self.worker.rating_count), (7, 2))
+        self.assertAlmostEqual(self.worker.rating, 3.5)
+
+    def test_invalid_rating_is_rejected(self):
+        self.login_as('agent', self.agent)
+        self.client.post(reverse('agent_rate_worker', args=[self.applications[0].id]), {'rating': 9})
+        self.worker.refresh_from_db()
+        self.assertEqual(self.worker.rating_count, 0)
+
+    def test_rebuild_ratings(self):
+        Job.objects.filter(pk=self.jobs[0].pk).update(client_rating_for_agent=4)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_ratings', '--check', stdout=StringIO())
+
+        call_command('rebuild_ratings', stdout=StringIO())
+        self.agent.refresh_from_db()
+        self.assertEqual((self.agent.rating_sum, self.agent.rating_count, self.agent.rating), (4, 1, 4.0))
+        call_command('rebuild_ratings', '--check', stdout=StringIO())
+
+
+class AcceptApplicationTests(LoginMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.agent = make_agent()
+        self.job = make_job(make_client(), self.agent, status='OPEN', workers_needed=2)
+        self.posting = make_posting(self.job)
+        self.applications = [
+            Application.objects.create(job_posting=self.posting, worker=make_worker(i)) for i in range(3)
+        ]
+        self.login_as('agent', self.agent)
+
+    def accept(self, application):
+        return self.client.get(reverse('accept_application', args=[application.id]))
+
+    def test_last_slot_fills_and_closes_job(self):
+        self.accept(self.applications[0])
+        self.accept(self.applications[1])
+
+        self.job.refresh_from_db()
+        self.posting.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.workers_accepted), ('FILLED', 2))
+        self.assertFalse(self.posting.is_active)
+
+    def test_full_job_rejects_more_accepts(self):
+        for application in self.applications:
+            self.accept(application)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.workers_accepted, 2)
+        self.assertEqual(Application.objects.filter(status='ACCEPTED').count(), 2)
+        self.applications[2].refresh_from_db()
+        self.assertEqual(self.applications[2].status, 'PENDING')
+
+    def test_double_submit_takes_one_slot(self):
+        self.accept(self.applications[0])
+        self.accept(self.applications[0])
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.workers_accepted, 1)
+
+    def test_no_count_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.accept(self.applications[0])
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+
+
+class AcceptApplicationConcurrencyTests(LoginMixin, TransactionTestCase):
+    THREADS = 12
+    WORKERS_NEEDED = 3
+
+    def test_concurrent_accepts_never_overfill(self):
+        cache.clear()
+        agent = make_agent()
+        job = make_job(make_client(), agent, status='OPEN', workers_needed=self.WORKERS_NEEDED)
+        posting = make_posting(job)
+        applications = [
+            Application.objects.create(job_posting=posting, worker=make_worker(i)) for i in range(self.THREADS)
+        ]
+
+        browsers = []
+        for _ in range(self.THREADS):
+            self.client = self.client_class()
+            self.login_as('agent', agent)
+            browsers.append(self.client)
+
+        start = threading.Barrier(self.THREADS)
+
+        def accept(browser, application):
+            try:
+                start.wait()
+                # Every application is clicked twice to mix double submits
+                # into the race for the last slots.
+                for _ in range(2):
+                    try:
+                        browser.get(reverse('accept_application', args=[application.id]))
+                    except OperationalError:
+                        # SQLite refuses concurrent writers outright
+                        # ("database table is locked"); that is a failed
+                        # accept, never an overfill.
+                        pass
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=accept, args=(browser, application))
+            for browser, application in zip(browsers, applications)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        job.refresh_from_db()
+        accepted = Application.objects.filter(job_posting=posting, status='ACCEPTED').count()
+        self.assertLessEqual(accepted, self.WORKERS_NEEDED)
+        self.assertEqual(job.workers_accepted, accepted)
+        self.assertGreaterEqual(accepted, 1)
+
+
+class ApproveProofTests(LoginMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.agent = make_agent()
+        self.job = make_job(make_client(), self.agent, status='FILLED', workers_needed=2)
+        posting = make_posting(self.job)
+        self.proofs = []
+        for i in range(2):
+            application = Application.objects.create(job_posting=posting, worker=make_worker(i), status='PROOF_SUBMITTED')
+            self.proofs.append(WorkProof.objects.create(application=application, image='work_proofs/x.jpg',
+                                                        latitude='9.9312', longitude='76.2673'))
+        self.login_as('agent', self.agent)
+
+    def approve(self, proof):
+        return self.client.post(reverse('agent_approve_proof', args=[proof.id]))
+
+    def test_last_approval_completes_job(self):
+        self.approve(self.proofs[0])
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.workers_completed), ('FILLED', 1))
+
+        self.approve(self.proofs[1])
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.workers_completed), ('COMPLETED', 2))
+        self.assertEqual(Application.objects.filter(status='COMPLETED').count(), 2)
+
+    def test_double_approval_counts_once(self):
+        self.approve(self.proofs[0])
+        self.approve(self.proofs[0])
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.workers_completed, 1)
+
+    def test_other_agent_cannot_approve(self):
+        self.login_as('agent', make_agent(1))
+        self.approve(self.proofs[0])
+        self.proofs[0].refresh_from_db()
+        self.assertEqual(self.proofs[0].status, 'PENDING')
+
+    def test_approved_proof_cannot_be_rejected(self):
+        self.approve(self.proofs[0])
+        self.client.post(reverse('agent_reject_proof', args=[self.proofs[0].id]), {'remarks': "Blurry"})
+
+        self.proofs[0].refresh_from_db()
+        self.assertEqual(self.proofs[0].status, 'APPROVED')
+        self.assertEqual(Application.objects.get(pk=self.proofs[0].application_id).status, 'COMPLETED')
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.workers_completed), ('FILLED', 1))
+
+    def test_other_agent_cannot_reject(self):
+        self.login_as('agent', make_agent(1))
+        self.client.post(reverse('agent_reject_proof', args=[self.proofs[0].id]), {'remarks': "Blurry"})
+        self.proofs[0].refresh_from_db()
+        self.assertEqual(self.proofs[0].status, 'PENDING')
+
+    def test_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as first:
+            self.approve(self.proofs[0])
+        with CaptureQueriesContext(connection) as last:
+            self.approve(self.proofs[1])
+        self.assertEqual(len(first), len(last))
+        self.assertFalse([q for q in first.captured_queries if 'COUNT(' in q['sql']])
+
+
+class BulkReviewProofTests(LoginMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.agent = make_agent()
+        self.login_as('agent', self.agent)
+
+    def make_proofs(self, job, count, offset=0):
+        posting = make_posting(job, offset)
+        proofs = []
+        for i in range(count):
+            application = Application.objects.create(job_posting=posting, worker=make_worker(offset + i),
+                                                     status='PROOF_SUBMITTED')
+            proofs.append(WorkProof.objects.create(application=application, image='work_proofs/x.jpg',
+                                                   latitude='9.9312', longitude='76.2673'))
+        return proofs
+
+    def review(self, proofs, action, **extra):
+        data = {'proof_ids': [proof.id for proof in proofs], 'action': action, **extra}
+        return self.client.post(reverse('agent_bulk_review_proofs'), data, HTTP_ACCEPT='application/json')
+
+    def test_bulk_approve_completes_each_job_once(self):
+        job_a = make_job(make_client(), self.agent, status='FILLED', workers_needed=3)
+        job_b = make_job(make_client(1), self.agent, status='FILLED', n=1, workers_needed=5)
+        proofs = self.make_proofs(job_a, 3) + self.make_proofs(job_b, 2, offset=3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.review(proofs, 'approve')
+
+        data = response.json()
+        self.assertEqual([item['result'] for item in data['results']], ['approved'] * 5)
+        self.assertEqual([job['id'] for job in data['completed_jobs']], [job_a.id])
+        job_a.refresh_from_db()
+        job_b.refresh_from_db()
+        self.assertEqual((job_a.status, job_a.workers_completed), ('COMPLETED', 3))
+        self.assertEqual((job_b.status, job_b.workers_completed), ('FILLED', 2))
+        self.assertEqual(Application.objects.filter(status='COMPLETED').count(), 5)
+
+    def test_bulk_reject_requires_remarks(self):
+        job = make_job(make_client(), self.agent, status='FILLED', workers_needed=2)
+        proofs = self.make_proofs(job, 2)
+
+        self.assertEqual(self.review(proofs, 'reject').status_code, 400)
+
+        data = self.review(proofs, 'reject', remarks='Blurry photo').json()
+        self.assertEqual([item['result'] for item in data['results']], ['rejected'] * 2)
+        self.assertEqual(WorkProof.objects.filter(status='REJECTED', agent_remarks='Blurry photo').count(), 2)
+        self.assertEqual(Application.objects.filter(status='PROOF_REJECTED').count(), 2)
+
+    def test_per_item_results(self):
+        job = make_job(make_client(), self.agent, status='FILLED', workers_needed=3)
+        proofs = self.make_proofs(job, 2)
+        other_job = make_job(make_client(1), make_agent(1), status='FILLED', n=1)
+        foreign = self.make_proofs(other_job, 1, offset=2)
+
+        self.review(proofs[:1], 'approve')
+        data = self.review(proofs + foreign, 'approve').json()
+
+        self.assertEqual([item['result'] for item in data['results']], ['already_reviewed', 'approved', 'not_found'])
+        job.refresh_from_db()
+        self.assertEqual(job.workers_completed, 2)
+        foreign[0].refresh_from_db()
+        self.assertEqual(foreign[0].status, 'PENDING')
+
+    def test_query_count_does_not_grow_with_batch(self):
+        job = make_job(make_client(), self.agent, status='FILLED', workers_needed=50)
+        proofs = self.make_proofs(job, 30)
+
+        with CaptureQueriesContext(connection) as small:
+            self.review(proofs[:2], 'approve')
+        with CaptureQueriesContext(connection) as large:
+            self.review(proofs[2:], 'approve')
+        self.assertEqual(len(small), len(large))
+
+    def test_form_post_redirects_with_messages(self):
+        job = make_job(make_client(), self.agent, status='FILLED', workers_needed=1)
+        proofs = self.make_proofs(job, 1)
+
+        response = self.client.post(reverse('agent_bulk_review_proofs'),
+                                    {'proof_ids': [proofs[0].id], 'action': 'approve'}, follow=True)
+        self.assertRedirects(response, reverse('agent_review_dashboard'))
+        self.assertContains(response, '1 proof(s) approved.')
+
+
+def make_photo(name='IMG_0001.JPG', size=(4000, 3000), gps=True):
+    """
+    A phone-style JPEG upload: large, rotated by EXIF and tagged with the
+    camera model and (optionally) a GPS position in Kochi.
+    """
+    exif = Image.Exif()
+    exif[ExifTags.Base.Model] = "Phone X"
+    exif[ExifTags.Base.Orientation] = 6
+    if gps:
+        exif.get_ifd(ExifTags.IFD.GPSInfo).update({
+            ExifTags.GPS.GPSLatitudeRef: 'N', ExifTags.GPS.GPSLatitude: (9.0, 55.0, 52.32),
+            ExifTags.GPS.GPSLongitudeRef: 'E', ExifTags.GPS.GPSLongitude: (76.0, 16.0, 2.28),
+        })
+    buffer = BytesIO()
+    Image.new('RGB', size, 'orange').save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class TempMediaMixin:
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+
+class ImagePipelineTests(TempMediaMixin, LoginMixin, TestCase):
+
+    def test_process_image(self):
+        processed = process_image(make_photo('Photo.pdf.jpg'), 1920, 480)
+
+        self.assertEqual(processed.gps, (Decimal('9.9312000'), Decimal('76.2673000')))
+        self.assertTrue(processed.image.name.startswith('Photo.'))
+        image = Image.open(processed.image)
+        # Rotated upright by the EXIF orientation, then bounded
+        self.assertEqual(image.size, (1440, 1920))
+        self.assertEqual(dict(image.getexif()), {})
+        self.assertEqual(max(Image.open(processed.thumbnail).size), 480)
+
+    def test_invalid_image(self):
+        with self.assertRaises(InvalidImage):
+            process_image(SimpleUploadedFile('cv.pdf', b'%PDF-1.4'), 1920, 480)
+
+    def test_upload_proof_stores_processed_image(self):
+        agent, worker = make_agent(), make_worker()
+        posting = make_posting(make_job(make_client(), agent, status='FILLED'))
+        application = Application.objects.create(job_posting=posting, worker=worker, status='ACCEPTED')
+        self.login_as('worker', worker)
+
+        self.client.post(reverse('worker_upload_proof', args=[application.id]), {
+            'image': make_photo(), 'latitude': '9.93', 'longitude': '76.26',
+        })
+
+        # Stored as uploaded; the processing is queued for the workers
+        proof = WorkProof.objects.get(application=application)
+        self.assertFalse(proof.thumbnail)
+        self.assertEqual(Task.objects.filter(name='process_work_proof_image', status='QUEUED').count(), 1)
+        original = proof.image.name
+
+        call_command('run_workers', '--once', '--processes', '1')
+
+        proof.refresh_from_db()
+        self.assertFalse(proof.image.storage.exists(original))
+        self.assertEqual(max(Image.open(proof.image.path).size), 1920)
+        self.assertEqual(max(Image.open(proof.thumbnail.path).size), 480)
+        self.assertEqual((proof.photo_latitude, proof.photo_longitude), (Decimal('9.9312000'), Decimal('76.2673000')))
+
+        self.login_as('agent', agent)
+        self.assertContains(self.client.get(reverse('agent_review_dashboard')), proof.thumbnail.url)
+
+    def test_profile_pic_upload_rejects_non_images(self):
+        worker = make_worker()
+        self.login_as('worker', worker)
+        data = {'name': worker.name, 'email': worker.email, 'phone': worker.phone,
+                'address': worker.address, 'skills': worker.skills}
+
+        self.client.post(reverse('worker_profile'), {**data, 'profile_pic': SimpleUploadedFile('cv.pdf', b'%PDF')})
+        worker.refresh_from_db()
+        self.assertFalse(worker.profile_pic)
+
+        self.client.post(reverse('worker_profile'), {**data, 'profile_pic': make_photo(gps=False)})
+        call_command('run_workers', '--once', '--processes', '1')
+        worker.refresh_from_db()
+        self.assertEqual(max(Image.open(worker.profile_thumbnail.path).size), 256)
+
+    def test_process_media_backfills_existing_files(self):
+        agent = make_agent()
+        agent.profile_pic.save('agent.jpg', make_photo(), save=True)
+        original = agent.profile_pic.name
+
+        call_command('process_media', stdout=StringIO(), stderr=StringIO())
+
+        agent.refresh_from_db()
+        self.assertNotEqual(agent.profile_pic.name, original)
+        self.assertEqual(max(Image.open(agent.profile_pic.path).size), 1024)
+        self.assertTrue(agent.profile_thumbnail)
+        self.assertFalse(agent.profile_pic.storage.exists(original))
+
+    def test_process_media_can_keep_originals(self):
+        agent = make_agent()
+        agent.profile_pic.save('agent.jpg', make_photo(), save=True)
+        original = agent.profile_pic.name
+
+        call_command('process_media', '--keep-originals', stdout=StringIO(), stderr=StringIO())
+
+        agent.refresh_from_db()
+        self.assertNotEqual(agent.profile_pic.name, original)
+        self.assertTrue(agent.profile_pic.storage.exists(original))
+
+
+calls = []
+
+
+@taskqueue.task('test_flaky')
+def flaky_task(fail_times):
+    calls.append(fail_times)
+    if len(calls) <= fail_times:
+        raise RuntimeError("boom")
+
+
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_claim_is_exclusive(self):
+        task = taskqueue.enqueue('test_flaky', fail_times=0)
+        claimed = taskqueue.claim()
+        self.assertEqual(claimed.id, task.id)
+        self.assertEqual((claimed.status, claimed.attempts), ('RUNNING', 1))
+        self.assertIsNone(taskqueue.claim())
+
+    def test_retries_with_backoff(self):
+        task = taskqueue.enqueue('test_flaky', fail_times=1)
+
+        with self.assertLogs('sidecrewapp.taskqueue', 'WARNING'):
+            self.assertEqual(taskqueue.run(taskqueue.claim()), 'QUEUED')
+        task.refresh_from_db()
+        self.assertIn('boom', task.last_error)
+        self.assertGreater(task.run_after, timezone.now())
+        # Not due yet
+        self.assertIsNone(taskqueue.claim())
+
+        Task.objects.filter(id=task.id).update(run_after=timezone.now())
+        self.assertEqual(taskqueue.run_pending(), 1)
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), ('DONE', 2))
+
+    def test_gives_up_after_max_attempts(self):
+        task = taskqueue.enqueue('test_flaky', max_attempts=1, fail_times=5)
+        with self.assertLogs('sidecrewapp.taskqueue', 'WARNING'):
+            self.assertEqual(taskqueue.run(taskqueue.claim()), 'FAILED')
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'FAILED')
+
+    def test_expired_claim_is_handed_out_again(self):
+        task = taskqueue.enqueue('test_flaky', fail_times=0)
+        stale = taskqueue.claim(visibility_timeout=0)
+        Task.objects.filter(id=task.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        fresh = taskqueue.claim()
+        self.assertEqual((fresh.id, fresh.attempts), (task.id, 2))
+        self.assertEqual(taskqueue.run(fresh), 'DONE')
+        # The first worker finishing late must not overwrite the outcome
+        taskqueue.run(stale)
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'DONE')
+
+
+class ContentAddressedStorageTests(TempMediaMixin, TestCase):
+
+    def upload(self, user, content=b'same picture', name='me.jpg'):
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile_pic.save(name, ContentFile(content), save=True)
+        return user.profile_pic.name
+
+    def test_same_content_is_stored_once(self):
+        first = self.upload(make_agent(0), name='shugunan.jpg')
+        second = self.upload(make_agent(1), name='shugunan_27nCni0.jpg')
+
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('blobs/'))
+        self.assertEqual(len(os.listdir(os.path.dirname(default_storage.path(first)))), 1)
+        self.assertEqual(MediaBlob.objects.get(name=first).refcount, 2)
+
+    def test_deleting_last_reference_removes_file(self):
+        agents = [make_agent(0), make_agent(1)]
+        name = [self.upload(agent) for agent in agents][0]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            agents[0].delete()
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            agents[1].delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    def test_replacing_picture_releases_old_blob(self):
+        worker = make_worker()
+        old = self.upload(worker, b'old picture')
+        new = self.upload(Worker.objects.get(pk=worker.pk), b'new picture')
+
+        self.assertNotEqual(old, new)
+        self.assertFalse(default_storage.exists(old))
+        self.assertTrue(default_storage.exists(new))
+
+    def test_reuploading_same_content_keeps_one_reference(self):
+        worker = make_worker()
+        name = self.upload(worker)
+        self.assertEqual(self.upload(Worker.objects.get(pk=worker.pk)), name)
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
+
+        # As the profile views do it: assign the upload, then save
+        worker = Worker.objects.get(pk=worker.pk)
+        worker.profile_pic = ContentFile(b'same picture', name='me.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            worker.save()
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
+
+        # A save without a new file keeps the reference
+        worker = Worker.objects.get(pk=worker.pk)
+        self.assertTrue(worker.profile_pic.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            worker.save()
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Worker.objects.get(pk=worker.pk).delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    def test_gc_media_adopts_legacy_files_and_repairs_counts(self):
+        legacy = FileSystemStorage()
+        first = make_client(0, profile_pic=legacy.save('profile_pics/mishal.jpg', ContentFile(b'mishal')))
+        second = make_client(1, profile_pic=legacy.save('profile_pics/mishal_E6OnTAL.jpg', ContentFile(b'mishal')))
+        orphan = self.upload(make_worker(), b'orphan')
+        Worker.objects.update(profile_pic='')
+        MediaBlob.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+        call_command('gc_media', stdout=StringIO())
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.profile_pic.name, second.profile_pic.name)
+        self.assertEqual(MediaBlob.objects.get(name=first.profile_pic.name).refcount, 2)
+        self.assertFalse(legacy.exists('profile_pics/mishal.jpg'))
+        self.assertFalse(default_storage.exists(orphan))
+
+
+class ChunkedProofUploadTests(TempMediaMixin, LoginMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch.object(uploads, 'UPLOAD_CHUNK_DIR', os.path.join(self.media_root, 'chunks')))
+        self.enterContext(mock.patch.object(uploads, 'UPLOAD_CHUNK_SIZE', 1024))
+        self.worker = make_worker()
+        posting = make_posting(make_job(make_client(), make_agent(), status='FILLED'))
+        self.application = Application.objects.create(job_posting=posting, worker=self.worker, status='ACCEPTED')
+        self.photo = make_photo(size=(200, 150)).read()
+        self.login_as('worker', self.worker)
+
+    def start(self, checksum=None):
+        return self.client.post(reverse('proof_upload_start', args=[self.application.id]), {
+            'filename': 'IMG_0001.JPG', 'size': len(self.photo),
+            'checksum': checksum or hashlib.sha256(self.photo).hexdigest(),
+        })
+
+    def send(self, upload_id, index, data=None):
+        if data is None:
+            data = self.photo[index * 1024:(index + 1) * 1024]
+        return self.client.post(reverse('proof_upload_chunk', args=[upload_id, index]), data,
+                                content_type='application/octet-stream')
+
+    def finish(self, upload_id):
+        return self.client.post(reverse('proof_upload_finish', args=[upload_id]),
+                                {'latitude': '9.93', 'longitude': '76.26'})
+
+    def test_upload_in_chunks_and_resume(self):
+        upload = self.start().json()
+        self.assertGreater(upload['chunk_count'], 1)
+        self.assertEqual(upload['received'], [])
+
+        # Connection drops after the last chunk was sent
+        self.send(upload['upload_id'], upload['chunk_count'] - 1)
+        resumed = self.start().json()
+        self.assertEqual(resumed['upload_id'], upload['upload_id'])
+        self.assertEqual(resumed['received'], [upload['chunk_count'] - 1])
+
+        self.assertEqual(self.finish(upload['upload_id']).status_code, 400)
+        for index in range(upload['chunk_count']):
+            self.assertEqual(self.send(upload['upload_id'], index).status_code, 200)
+
+        response = self.finish(upload['upload_id'])
+        self.assertEqual(response.json(), {'redirect': reverse('worker_home')})
+
+        proof = WorkProof.objects.get(application=self.application)
+        with proof.image.open('rb') as stored:
+            self.assertEqual(stored.read(), self.photo)
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.status, 'PROOF_SUBMITTED')
+        self.assertFalse(ProofUpload.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(uploads.UPLOAD_CHUNK_DIR, upload['upload_id'])))
+
+    def test_checksum_mismatch_discards_upload(self):
+        upload = self.start(checksum='0' * 64).json()
+        for index in range(upload['chunk_count']):
+            self.send(upload['upload_id'], index)
+
+        response = self.finish(upload['upload_id'])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('checksum', response.json()['error'])
+        self.assertFalse(WorkProof.objects.exists())
+        self.assertFalse(ProofUpload.objects.exists())
+
+    def test_rejects_bad_chunks(self):
+        upload = self.start().json()
+        self.assertEqual(self.send(upload['upload_id'], 0, b'short').status_code, 400)
+        self.assertEqual(self.send(upload['upload_id'], upload['chunk_count']).status_code, 400)
+
+    def test_other_workers_cannot_use_the_upload(self):
+        upload = self.start().json()
+        self.login_as('worker', make_worker(1))
+        self.assertEqual(self.send(upload['upload_id'], 0).status_code, 404)
+        self.assertEqual(self.start().status_code, 403)
+
+    def test_expire_uploads(self):
+        upload = self.start().json()
+        self.send(upload['upload_id'], 0)
+        ProofUpload.objects.update(created_at=timezone.now() - timedelta(days=2))
+
+        call_command('expire_uploads', stdout=StringIO())
+        self.assertFalse(ProofUpload.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(uploads.UPLOAD_CHUNK_DIR, upload['upload_id'])))
+
+
+class PrincipalCacheTests(LoginMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.worker = make_worker()
+        self.login_as('worker', self.worker)
+
+    def worker_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, [q['sql'] for q in ctx.captured_queries if 'FROM "sidecrewapp_worker"' in q['sql']]
+
+    def test_principal_is_cached_between_requests(self):
+        _, first = self.worker_queries(reverse('worker_profile'))
+        response, second = self.worker_queries(reverse('worker_profile'))
+        self.assertEqual(len(first), 1)
+        self.assertEqual(second, [])
+        self.assertContains(response, self.worker.name)
+        # The password hash is on the account, never in the cached profile
+        self.assertNotIn('password', response.context['worker'].__dict__)
+
+    def test_memoized_per_request(self):
+        request = self.client.get(reverse('worker_profile')).wsgi_request
+        with self.assertNumQueries(0):
+            self.assertIs(load_principal(request, 'worker'), load_principal(request, 'worker'))
+
+    def test_profile_edit_and_status_change_bump_version(self):
+        self.client.get(reverse('worker_profile'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Worker.objects.get(pk=self.worker.pk).save()
+        _, queries = self.worker_queries(reverse('worker_profile'))
+        self.assertEqual(len(queries), 1)
+
+        self.login_as('admin', self.worker)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('reject_worker', args=[self.worker.pk]))
+        self.login_as('worker', self.worker)
+        response = self.client.get(reverse('worker_profile'))
+        self.assertEqual(response.context['worker'].status, 'rejected')
+
+    def test_deleted_user_is_sent_to_login(self):
+        self.client.get(reverse('worker_profile'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Worker.objects.filter(pk=self.worker.pk).delete()
+        self.assertRedirects(self.client.get(reverse('worker_profile')), reverse('worker_login'))
+
+
+class LoginThroughputTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.worker = make_worker()
+
+    def login(self, password, email='worker0@example.com', **extra):
+        return self.client.post(reverse('worker_login'), {'email': email, 'password': password}, **extra)
+
+    def test_legacy_hash_is_upgraded_on_login(self):
+        Account.objects.filter(pk=self.worker.account_id).update(password=make_password('secret', hasher='pbkdf2_sha256'))
+
+        response = self.login('secret')
+        self.assertRedirects(response, reverse('worker_home'), fetch_redirect_response=False)
+        account = Account.objects.get(pk=self.worker.account_id)
+        self.assertTrue(account.password.startswith('scrypt$'))
+        self.assertTrue(check_password('secret', account.password))
+
+    def test_current_hash_is_not_rewritten(self):
+        Account.objects.filter(pk=self.worker.account_id).update(password=make_password('secret'))
+        encoded = Account.objects.get(pk=self.worker.account_id).password
+
+        self.login('secret')
+        self.assertEqual(Account.objects.get(pk=self.worker.account_id).password, encoded)
+
+    def test_failed_logins_are_rate_limited_per_email(self):
+        Account.objects.filter(pk=self.worker.account_id).update(password=make_password('secret'))
+        for _ in range(5):
+            self.login('wrong')
+
+        # Blocked before the password is hashed, even with the right one
+        with mock.patch('sidecrewapp.logins.check_password') as check:
+            response = self.login('secret')
+        check.assert_not_called()
+        self.assertRedirects(response, reverse('worker_login'), fetch_redirect_response=False)
+        self.assertNotIn('worker_id', self.client.session)
+
+    def test_rate_limited_per_ip_across_emails(self):
+        with mock.patch('sidecrewapp.logins.LOGIN_MAX_FAILURES_PER_IP', 3):
+            for n in range(3):
+                self.login('wrong', email=f'nobody{n}@example.com')
+            with self.assertNumQueries(0):
+                self.login('wrong', email='someone-else@example.com')
+
+    def test_failures_elsewhere_only_slow_the_owner_down(self):
+        Account.objects.filter(pk=self.worker.account_id).update(password=make_password('secret'))
+        for _ in range(5):
+            self.login('wrong', REMOTE_ADDR='203.0.113.9')
+
+        # From another address the email waits out a short backoff...
+        self.login('secret', REMOTE_ADDR='198.51.100.1')
+        self.assertNotIn('worker_id', self.client.session)
+        # ...and is not locked out for the window
+        with mock.patch('sidecrewapp.logins.time') as clock:
+            clock.time.return_value = time.time() + 2
+            response = self.login('secret', REMOTE_ADDR='198.51.100.1')
+        self.assertRedirects(response, reverse('worker_home'), fetch_redirect_response=False)
+
+    def test_client_ip_comes_from_the_trusted_proxy_header(self):
+        Account.objects.filter(pk=self.worker.account_id).update(password=make_password('secret'))
+        with mock.patch.multiple('sidecrewapp.logins', LOGIN_CLIENT_IP_HEADER='HTTP_X_FORWARDED_FOR',
+                                 LOGIN_MAX_FAILURES_PER_IP=3):
+            # Entries the client sent ahead of the proxy's change nothing
+            for n in range(3):
+                self.login('wrong', email=f'nobody{n}@example.com',
+                           HTTP_X_FORWARDED_FOR=f'10.0.0.{n}, 203.0.113.9')
+            with self.assertNumQueries(0):
+                self.login('wrong', email='someone-else@example.com', HTTP_X_FORWARDED_FOR='203.0.113.9')
+
+            # Another client behind the same proxy is not blocked
+            response = self.login('secret', HTTP_X_FORWARDED_FOR='198.51.100.1')
+        self.assertRedirects(response, reverse('worker_home'), fetch_redirect_response=False)
+
+    def test_successful_login_resets_the_count(self):
+        Account.objects.filter(pk=self.worker.account_id).update(password=make_password('secret'))
+        for _ in range(4):
+            self.login('wrong')
+        self.login('secret')
+        self.client.session.flush()
+        for _ in range(4):
+            self.login('wrong')
+        response = self.login('secret')
+        self.assertRedirects(response, reverse('worker_home'), fetch_redirect_response=False)
+
+    def test_bench_logins(self):
+        out = StringIO()
+        call_command('bench_logins', seconds=0.05, stdout=out)
+        self.assertIn('TunedScryptPasswordHasher', out.getvalue())
+        self.assertIn('logins/s/core', out.getvalue())
+
+
+
+class AccountTests(LoginMixin, TestCase):
+
+    def register_worker(self, email='new@example.com'):
+        return self.client.post(reverse('worker_register'), {
+            'name': "New", 'email': email, 'phone': "9000000000", 'address': "Kochi",
+            'skills': "Serving", 'password': 'secret', 'confirm_password': 'secret',
+        })
+
+    def test_registration_creates_account_and_profile(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.register_worker()
+        self.assertRedirects(response, reverse('worker_login'), fetch_redirect_response=False)
+        # No exists() check before the inserts
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('SELECT')])
+
+        worker = Worker.objects.select_related('account').get(email='new@example.com')
+        self.assertEqual((worker.account.role, worker.account.status, worker.status), ('worker', 'pending', 'pending'))
+        self.assertTrue(check_password('secret', worker.account.password))
+
+    def test_email_is_unique_per_role(self):
+        make_worker()
+        self.register_worker('worker0@example.com')
+        self.assertEqual(Worker.objects.count(), 1)
+
+        # The same person may also sign up as a client
+        response = self.client.post(reverse('client_register'), {
+            'name': "New", 'email': 'worker0@example.com', 'phone': "9000000000",
+            'password': 'secret', 'confirm_password': 'secret',
+        })
+        self.assertRedirects(response, reverse('client_login'), fetch_redirect_response=False)
+        self.assertEqual(Account.objects.filter(email='worker0@example.com').count(), 2)
+
+    def test_login_is_one_account_lookup(self):
+        worker = make_worker()
+        Account.objects.filter(pk=worker.account_id).update(password=make_password('secret'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('worker_login'), {'email': worker.email, 'password': 'secret'})
+        self.assertRedirects(response, reverse('worker_home'), fetch_redirect_response=False)
+        self.assertEqual(self.client.session['worker_id'], worker.id)
+        profile_queries = [q for q in ctx.captured_queries if 'sidecrewapp_' in q['sql']]
+        self.assertEqual(len(profile_queries), 1)
+
+    def test_status_and_email_changes_reach_the_account(self):
+        worker = make_worker()
+        self.login_as('admin', worker)
+        self.client.get(reverse('reject_worker', args=[worker.pk]))
+        self.assertEqual(Account.objects.get(pk=worker.account_id).status, 'rejected')
+
+        make_worker(1)
+        self.login_as('worker', worker)
+        self.client.post(reverse('worker_profile'), {
+            'name': worker.name, 'email': 'worker1@example.com', 'phone': worker.phone,
+            'address': worker.address, 'skills': worker.skills,
+        })
+        worker.refresh_from_db()
+        self.assertEqual(worker.email, 'worker0@example.com')
+
+        self.client.post(reverse('worker_profile'), {
+            'name': worker.name, 'email': 'moved@example.com', 'phone': worker.phone,
+            'address': worker.address, 'skills': worker.skills,
+        })
+        worker.refresh_from_db()
+        self.assertEqual((worker.email, worker.account.email), ('moved@example.com', 'moved@example.com'))
+
+    def test_deleting_profile_deletes_account(self):
+        worker = make_worker()
+        self.login_as('admin', worker)
+        self.client.get(reverse('delete_worker', args=[worker.pk]))
+        self.assertFalse(Account.objects.filter(pk=worker.account_id).exists())
+
+    def test_admin_home_counts_in_one_query(self):
+        make_worker()
+        Account.objects.filter(pk=make_worker(1).account_id).update(status='pending')
+        make_client()
+        self.login_as('admin', make_agent())
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin_home'))
+        self.assertEqual(len([q for q in ctx.captured_queries if 'sidecrewapp_account' in q['sql']]), 1)
+        self.assertEqual(response.context['worker_count'], 2)
+        self.assertEqual(response.context['pending_workers'], 1)
+        self.assertEqual(response.context['client_count'], 1)
+
+
+class AdminStatsTests(LoginMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.agent = make_agent()
+        self.worker = make_worker()
+        make_job(make_client(), self.agent, status='COMPLETED', client_payment_status='paid')
+        make_job(make_client(1), None, status='SEEKING_AGENT', n=1)
+        self.login_as('admin', self.agent)
+
+    def stats_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin_home'))
+        return response, [q['sql'] for q in ctx.captured_queries if 'sidecrewapp_' in q['sql']]
+
+    def test_one_query_per_table_then_cached(self):
+        response, queries = self.stats_queries()
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(response.context['client_count'], 2)
+        self.assertEqual(response.context['total_jobs'], 2)
+        self.assertIn(('Completed', 1), response.context['job_status_breakdown'])
+        self.assertIn(('Seeking Agent', 1), response.context['job_status_breakdown'])
+        self.assertIn(('Paid', 1), response.context['client_payment_breakdown'])
+        self.assertContains(response, 'Worker Payouts')
+
+        _, queries = self.stats_queries()
+        self.assertEqual(queries, [])
+
+    def test_approval_refreshes_snapshot(self):
+        Account.objects.filter(pk=self.worker.account_id).update(status='pending')
+        Worker.objects.filter(pk=self.worker.pk).update(status='pending')
+        response, _ = self.stats_queries()
+        self.assertEqual(response.context['pending_workers'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('approve_worker', args=[self.worker.pk]))
+        response, _ = self.stats_queries()
+        self.assertEqual(response.context['pending_workers'], 0)
+
+
+@mock.patch('sidecrewapp.adminlists.ADMIN_PAGE_SIZE', 2)
+class AdminListTests(LoginMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.workers = [make_worker(n) for n in range(5)]
+        self.login_as('admin', self.workers[0])
+
+    def test_keyset_pages_in_status_name_order(self):
+        Worker.objects.filter(pk=self.workers[4].pk).update(status='pending')
+        response = self.client.get(reverse('manage_workers'))
+        self.assertEqual([w.name for w in response.context['workers']], ["Worker 0", "Worker 1"])
+
+        seen = []
+        cursor = None
+        while True:
+            response = self.client.get(reverse('manage_workers'), {'cursor': cursor} if cursor else {})
+            seen += [w.name for w in response.context['workers']]
+            cursor = response.context['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, ["Worker 0", "Worker 1", "Worker 2", "Worker 3", "Worker 4"])
+
+        response = self.client.get(reverse('manage_workers'), {'status': 'pending'})
+        self.assertEqual([w.name for w in response.context['workers']], ["Worker 4"])
+
+    def test_prefix_search_on_name_and_email(self):
+        Worker.objects.filter(pk=self.workers[3].pk).update(name="Zed")
+        response = self.client.get(reverse('manage_workers'), {'q': 'ze'})
+        self.assertEqual([w.pk for w in response.context['workers']], [self.workers[3].pk])
+        response = self.client.get(reverse('manage_workers'), {'q': 'worker2@'})
+        self.assertEqual([w.pk for w in response.context['workers']], [self.workers[2].pk])
+        # Prefix, not substring
+        response = self.client.get(reverse('manage_workers'), {'q': 'orker'})
+        self.assertEqual(list(response.context['workers']), [])
+
+    def test_invalid_cursor_shows_first_page(self):
+        response = self.client.get(reverse('manage_workers'), {'cursor': 'nonsense'})
+        self.assertEqual(len(response.context['workers']), 2)
+
+    def test_bulk_reject_is_one_update_per_table(self):
+        ids = [w.pk for w in self.workers[:3]]
+        # Warm the principal cache of a worker that will be rejected
+        self.login_as('worker', self.workers[1])
+        self.client.get(reverse('worker_profile'))
+        self.login_as('admin', self.workers[0])
+
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin_bulk_action', args=['worker']),
+                                        {'action': 'reject', 'ids': ids, 'status': 'approved'})
+        self.assertRedirects(response, reverse('manage_workers') + '?status=approved', fetch_redirect_response=False)
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(Worker.objects.filter(status='rejected').count(), 3)
+        self.assertEqual(Account.objects.filter(role='worker', status='rejected').count(), 3)
+
+        self.login_as('worker', self.workers[1])
+        response = self.client.get(reverse('worker_profile'))
+        self.assertEqual(response.context['worker'].status, 'rejected')
+
+    def test_bulk_delete_removes_profiles_and_accounts(self):
+        ids = [w.pk for w in self.workers[3:]]
+        self.client.post(reverse('admin_bulk_action', args=['worker']), {'action': 'delete', 'ids': ids})
+        self.assertEqual(Worker.objects.count(), 3)
+        self.assertEqual(Account.objects.filter(role='worker').count(), 3)
+
+    def test_bulk_action_validates_input(self):
+        url = reverse('admin_bulk_action', args=['worker'])
+        self.client.post(url, {'action': 'approve', 'ids': ['x']})
+        self.client.post(url, {'action': 'explode', 'ids': [self.workers[0].pk]})
+        self.client.post(url, {'action': 'delete'})
+        self.assertEqual(Worker.objects.count(), 5)
+        self.assertRedirects(self.client.post(reverse('admin_bulk_action', args=['admin']), {}),
+                             reverse('admin_home'), fetch_redirect_response=False)
+
+    def test_jobs_list_and_bulk_delete(self):
+        client = make_client()
+        jobs = [make_job(client, status='OPEN' if n % 2 else 'SEEKING_AGENT', n=n) for n in range(4)]
+        response = self.client.get(reverse('admin_manage_jobs'), {'status': 'OPEN'})
+        self.assertEqual({j.pk for j in response.context['jobs']}, {jobs[1].pk, jobs[3].pk})
+
+        self.client.post(reverse('admin_bulk_delete_jobs'), {'action': 'delete', 'ids': [jobs[0].pk, jobs[1].pk]})
+        self.assertEqual(set(Job.objects.values_list('pk', flat=True)), {jobs[2].pk, jobs[3].pk})
+
+    def test_every_list_renders(self):
+        make_client()
+        make_agent()
+        for name in ('manage_clients', 'manage_workers', 'manage_agents', 'admin_manage_jobs'):
+            response = self.client.get(reverse(name))
+            self.assertContains(response, 'bulk-form')
+
+
+class RecordingBus:
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel_name, event):
+        self.published.append((channel_name, event['type'], event['data']))
+
+
+class LiveEventTests(LoginMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.agent = make_agent()
+        self.client_user = make_client()
+        self.worker = make_worker()
+        self.job = make_job(self.client_user, self.agent, status='OPEN', workers_needed=1)
+        self.posting = make_posting(self.job)
+        self.bus = RecordingBus()
+        patcher = mock.patch.object(events, '_bus', self.bus)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_views_publish_after_commit(self):
+        self.login_as('worker', self.worker)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('apply_for_job', args=[self.posting.id]))
+        application = Application.objects.get()
+        self.assertEqual(self.bus.published[0][:2], (f'agent:{self.agent.id}', events.APPLICATION_CREATED))
+
+        self.bus.published.clear()
+        self.login_as('agent', self.agent)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('accept_application', args=[application.id]))
+        published = {channel_name: data for channel_name, _, data in self.bus.published}
+        self.assertEqual(published[f'worker:{self.worker.id}']['status'], 'ACCEPTED')
+        self.assertIn(reverse('worker_upload_proof', args=[application.id]), published[f'worker:{self.worker.id}']['html'])
+        # The only slot is taken, so the client hears the job filled
+        self.assertEqual(published[f'client:{self.client_user.id}']['status'], 'FILLED')
+
+    def test_payloads_carry_the_rows_the_pages_patch_in(self):
+        self.login_as('worker', self.worker)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('apply_for_job', args=[self.posting.id]))
+        application = Application.objects.get()
+        created = self.bus.published[-1][2]
+        # The agent's pending-applications row, with its accept / reject actions
+        self.assertIn(f'data-live-item="application-{application.id}"', created['html'])
+        self.assertIn(reverse('accept_application', args=[application.id]), created['html'])
+        self.assertIn(self.worker.name, created['html'])
+
+        proof = WorkProof.objects.create(application=application, image='work_proofs/x.jpg',
+                                         latitude=12.0, longitude=77.0)
+        Application.objects.filter(pk=application.pk).update(status='PROOF_SUBMITTED')
+        with self.captureOnCommitCallbacks(execute=True):
+            events.publish_proof_submitted(application, proof)
+        self.assertEqual(self.bus.published[-1][1], events.PROOF_SUBMITTED)
+        self.assertEqual(self.bus.published[-1][2]['pending_proofs_delta'], 1)
+
+        self.login_as('agent', self.agent)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('agent_reject_proof', args=[proof.id]), {'remarks': "Blurry photo"})
+        rejected = self.bus.published[-1][2]
+        # The worker's row comes back with the reason and the resubmit action
+        self.assertIn(f'data-live-item="application-{application.id}"', rejected['html'])
+        self.assertIn("Blurry photo", rejected['html'])
+        self.assertIn(reverse('worker_upload_proof', args=[application.id]), rejected['html'])
+
+        # The agent's page holds the hooks those payloads are patched into
+        response = self.client.get(reverse('agent_home'))
+        self.assertContains(response, 'data-live-list="pending-applications"')
+        self.assertContains(response, 'data-live-count="pending-proofs"')
+
+    def test_rolled_back_change_publishes_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    events.publish('worker', self.worker.id, events.PAYMENT, message="Paid")
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(self.bus.published, [])
+
+    def test_stream_needs_login_and_asgi(self):
+        self.assertEqual(self.client.get(reverse('event_stream')).status_code, 403)
+        self.login_as('worker', self.worker)
+        # The test client is WSGI: no stream, and 204 stops EventSource retrying
+        self.assertEqual(self.client.get(reverse('event_stream')).status_code, 204)
+
+    async def test_stream_under_asgi(self):
+        bus = events.LocalEventBus()
+        await sync_to_async(self.login_as)('worker', self.worker)
+        self.async_client.cookies = self.client.cookies
+        with mock.patch.object(events, '_bus', bus):
+            response = await self.async_client.get(reverse('event_stream'))
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            stream = aiter(response.streaming_content)
+            self.assertTrue((await anext(stream)).startswith(b'retry:'))
+
+            # Published from a view's worker thread
+            event = {'type': events.PAYMENT, 'data': {'message': "Paid"}}
+            await sync_to_async(bus.publish, thread_sensitive=False)(f'worker:{self.worker.id}', event)
+            chunk = await anext(stream)
+            self.assertIn(b'event: payment\n', chunk)
+            self.assertIn(b'data: {"message": "Paid"}', chunk)
+            await stream.aclose()
+
+
+class CacheEventBusTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_replays_from_last_event_id(self):
+        bus = events.CacheEventBus()
+        for n in range(3):
+            bus.publish('worker:1', {'type': events.PAYMENT, 'data': {'n': n}})
+
+        async def receive(last_event_id):
+            return await bus.subscribe('worker:1', last_event_id).receive(0)
+
+        replayed = async_to_sync(receive)('1')
+        self.assertEqual([(event['id'], event['data']['n']) for event in replayed], [(2, 1), (3, 2)])
+        # A new stream starts from now
+        self.assertEqual(async_to_sync(receive)(None), [])
+
+
+class AsyncApiTests(LoginMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.kochi = make_agent(1)
+        self.thrissur = make_agent(2, latitude='10.5276', longitude='76.2144')
+        make_agent(3, latitude='12.9716', longitude='77.5946')
+        make_agent(4, status='pending')
+        agent_coordinates.invalidate()
+        self.addCleanup(agent_coordinates.invalidate)
+        self.client_user = make_client()
+
+    def near(self, client=None, **params):
+        return (client or self.client).get(reverse('get_agents_near'), {'lat': '10.2', 'lng': '76.25', **params})
+
+    def test_agents_near_is_for_clients(self):
+        self.assertEqual(self.near().status_code, 403)
+        self.login_as('worker', make_worker())
+        self.assertEqual(self.near().status_code, 403)
+
+    def test_agents_near_ranked_by_distance(self):
+        self.login_as('client', self.client_user)
+        agents = self.near().json()['agents']
+        self.assertEqual([agent['id'] for agent in agents], [self.kochi.id, self.thrissur.id])
+        self.assertEqual(self.near(lat='91').status_code, 400)
+        self.assertEqual(self.near(lng='east').status_code, 400)
+
+    def test_only_agents_in_the_box_reach_the_distance_check(self):
+        far = make_agent(5, latitude='10.3', longitude='80.0')
+        agent_coordinates.invalidate()
+        arrays = agent_coordinates.arrays()
+        self.assertEqual(list(arrays[1]), sorted(arrays[1]))
+
+        with mock.patch('sidecrewapp.geo.haversine_many', wraps=haversine_many) as distances:
+            matches = points_within(arrays, 10.2, 76.25, 50)
+        # Bengaluru is outside the latitude band, `far` outside the longitudes
+        self.assertEqual(len(distances.call_args.args[2]), 2)
+        self.assertEqual([agent_id for agent_id, _ in matches], [self.kochi.id, self.thrissur.id])
+        self.assertNotIn(far.id, [agent_id for agent_id, _ in matches])
+
+    async def test_agents_near_under_asgi(self):
+        await sync_to_async(self.login_as)('client', self.client_user)
+        self.async_client.cookies = self.client.cookies
+        response = await self.near(self.async_client)
+        self.assertEqual([agent['id'] for agent in response.json()['agents']], [self.kochi.id, self.thrissur.id])
+
+    async def test_cancelled_lookup_sends_no_more_queries(self):
+        await sync_to_async(self.login_as)('client', self.client_user)
+        request = AsyncRequestFactory().get(reverse('get_agents_near'), {'lat': '10.2', 'lng': '76.25'})
+        request.session = SessionStore(self.client.cookies['sessionid'].value)
+
+        await sync_to_async(agent_coordinates.arrays)()
+        started, release = threading.Event(), threading.Event()
+
+        def slow_points_within(*args):
+            started.set()
+            release.wait(5)
+            return []
+
+        with mock.patch.object(api, 'points_within', slow_points_within), \
+                mock.patch.object(Agent.objects, 'filter') as agent_filter:
+            task = asyncio.create_task(api.agents_near(request))
+            await sync_to_async(started.wait, thread_sensitive=False)(5)
+            # What the ASGI handler does when the browser aborts the fetch
+            task.cancel()
+            release.set()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        agent_filter.assert_not_called()
+
+    def test_worker_job_feed_needs_worker(self):
+        self.login_as('client', self.client_user)
+        self.assertEqual(self.client.get(reverse('worker_job_feed')).status_code, 403)
+
+
+class MetricsTests(LoginMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+        self.agent = make_agent()
+
+    def sample(self, name, view):
+        match = re.search(rf'^sidecrew_{name}{{view="{view}"}} (\S+)$', metrics.registry.render(), re.M)
+        return float(match.group(1)) if match else None
+
+    def test_records_time_queries_templates_and_size_per_view(self):
+        self.login_as('agent', self.agent)
+        response = self.client.get(reverse('agent_home'))
+        self.client.get(reverse('agent_home'))
+
+        self.assertEqual(self.sample('request_duration_seconds_count', 'agent_home'), 2)
+        self.assertGreater(self.sample('db_queries_sum', 'agent_home'), 0)
+        self.assertGreater(self.sample('db_duration_seconds_sum', 'agent_home'), 0)
+        self.assertGreater(self.sample('template_duration_seconds_sum', 'agent_home'), 0)
+        self.assertEqual(self.sample('response_size_bytes_sum', 'agent_home'), 2 * len(response.content))
+        self.assertIn('sidecrew_responses_total{view="agent_home",status="2xx"} 2', metrics.registry.render())
+
+    async def test_counts_queries_of_async_views(self):
+        await sync_to_async(self.login_as)('client', await sync_to_async(make_client)())
+        self.async_client.cookies = self.client.cookies
+        agent_coordinates.invalidate()
+        await self.async_client.get(reverse('get_agents_near'), {'lat': '9.93', 'lng': '76.26'})
+        # Session + agent coordinates + agents
+        self.assertGreaterEqual(self.sample('db_queries_sum', 'get_agents_near'), 3)
+
+    def test_endpoint_is_for_admins_or_the_token(self):
+        self.client.get(reverse('index'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+        with mock.patch.object(metrics, 'METRICS_TOKEN', 'secret'):
+            self.assertEqual(self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+            response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '# TYPE sidecrew_request_duration_seconds histogram')
+        self.assertContains(response, 'sidecrew_request_duration_seconds_bucket{view="index",le="+Inf"} 1')
+
+        self.login_as('admin', self.agent)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_slow_requests_are_logged_with_their_sql(self):
+        self.login_as('agent', self.agent)
+        with mock.patch.object(metrics, 'METRICS_SLOW_REQUEST_SECONDS', 0), \
+                self.assertLogs('sidecrewapp.slow_requests', 'WARNING') as logs:
+            self.client.get(reverse('agent_home'))
+        self.assertIn('agent_home', logs.output[0])
+
+        slow = metrics.registry.slow_requests()
+        self.assertEqual(slow[0]['view'], 'agent_home')
+        self.assertTrue(slow[0]['slowest_queries'])
+        self.assertIn('SELECT', slow[0]['slowest_queries'][0]['sql'])
+
+        self.login_as('admin', self.agent)
+        self.assertEqual(self.client.get(reverse('metrics_slow')).json()['requests'][0]['view'], 'agent_home')
+
+
+class SeedMarketplaceTests(TransactionTestCase):
+
+    def setUp(self):
+        self.addCleanup(metrics.registry.reset)
+        call_command('seed_marketplace', scale=0.002, stdout=StringIO())
+
+    def test_seeds_every_lifecycle_state_consistently(self):
+        self.assertEqual(Worker.objects.count(), 200)
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)),
+                         {'SEEKING_AGENT', 'PENDING_AGENT', 'OPEN', 'FILLED', 'COMPLETED'})
+        self.assertEqual(set(Application.objects.values_list('status', flat=True)),
+                         {'PENDING', 'ACCEPTED', 'REJECTED', 'PROOF_SUBMITTED', 'PROOF_REJECTED', 'COMPLETED'})
+        self.assertEqual(set(WorkProof.objects.values_list('status', flat=True)), {'PENDING', 'REJECTED', 'APPROVED'})
+        self.assertFalse(Job.objects.filter(status='SEEKING_AGENT', agent__isnull=False).exists())
+        call_command('rebuild_ratings', '--check', stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command('seed_marketplace', scale=0.002, stdout=StringIO())
+        call_command('seed_marketplace', scale=0.001, clear=True, stdout=StringIO())
+        self.assertEqual(Worker.objects.count(), 100)
+
+    def test_load_test_replays_the_mix(self):
+        out = StringIO()
+        call_command('load_test', requests=40, concurrency=1, stdout=out)
+        for view in ('agent_home', 'worker_home', 'client_home', 'get_agents_near'):
+            self.assertRegex(out.getvalue(), rf'{view}\s+\d+\s+0\s')
+        # Its sessions are removed afterwards
+        self.assertFalse(SessionStore.get_model_class().objects.exists())
+
+
+def build_marketplace(size):
+    """
+    A marketplace around one client, agent and worker that grows with
+    `size`: `size` jobs in every status, each posted job with `size` + 1
+    applications (one of them the worker's) and their proofs, `size` open
+    postings the worker has not applied for, and `size` more clients,
+    workers and agents for the admin lists. Returns the principals and the
+    rows the state-transition views act on.
+    """
+    client, agent, worker = make_client('perf'), make_agent('perf'), make_worker('perf')
+    workers = [worker] + [make_worker(f'perf-{i}') for i in range(size)]
+    open_jobs = []
+
+    for i in range(size):
+        make_client(f'perf-{i}', company_name="Events Co")
+        make_agent(f'perf-{i}')
+        make_job(client, agent, status='PENDING_AGENT', n=i)
+        make_job(client, None, status='SEEKING_AGENT', n=i)
+        make_posting(make_job(client, agent, status='OPEN', n=i), n=i)
+
+        for status, app_status, proof_status in [
+            ('OPEN', 'PENDING', None), ('OPEN', 'PROOF_SUBMITTED', 'PENDING'),
+            ('FILLED', 'ACCEPTED', None), ('COMPLETED', 'COMPLETED', 'APPROVED'),
+        ]:
+            job = make_job(client, agent, status=status, n=i, workers_needed=len(workers) + 1)
+            if status == 'OPEN':
+                open_jobs.append(job)
+            posting = make_posting(job, n=i)
+            for member in workers:
+                application = Application.objects.create(job_posting=posting, worker=member, status=app_status)
+                if proof_status:
+                    WorkProof.objects.create(application=application, image='work_proofs/x.jpg',
+                                             latitude='9.9312', longitude='76.2673', status=proof_status)
+
+    # One fresh row per transition, the same whatever the size
+    open_job = make_job(client, agent, status='OPEN', n='target')
+    posting = make_posting(open_job, n='target')
+    completed_job = make_job(client, agent, status='COMPLETED', n='target')
+    completed_application = Application.objects.create(
+        job_posting=make_posting(completed_job, n='target'), worker=workers[-1], status='COMPLETED'
+    )
+    return {
+        'client': client, 'agent': agent, 'worker': worker,
+        'invite': make_job(client, agent, status='PENDING_AGENT', n='target'),
+        'seeking_job': make_job(client, None, status='SEEKING_AGENT', n='target'),
+        'open_job': open_job,
+        'posting': posting,
+        'pending_application': Application.objects.create(job_posting=posting, worker=workers[-1]),
+        'accepted_application': Application.objects.filter(worker=worker, status='ACCEPTED').first(),
+        'completed_job': completed_job,
+        'completed_application': completed_application,
+        'proof': WorkProof.objects.filter(status='PENDING', application__worker=workers[-1]).first(),
+        'pending_proof_ids': list(WorkProof.objects.filter(status='PENDING').values_list('id', flat=True)),
+        # The client's busiest job, with applications and proofs below it
+        'busy_job': open_jobs[-1],
+        'open_job_ids': [job.id for job in open_jobs],
+        'other_client': make_client('perf-target'),
+        'other_worker': make_worker('perf-target'),
+        'other_agent': make_agent('perf-target'),
+        'other_worker_ids': [member.id for member in workers[1:]],
+    }
+
+
+def profile_form(user, **extra):
+    return {'name': user.name, 'email': user.email, 'phone': user.phone, **extra}
+
+
+# Every view in urls.py, as (label, role, method, URL name, URL args, POST
+# data or GET params). The args name rows of build_marketplace(); args
+# and data may also be functions of it.
+VIEW_REQUESTS = [
+    # Client
+    ('client_home', 'client', 'GET', 'client_home', (), None),
+    ('client_profile', 'client', 'GET', 'client_profile', (), None),
+    ('client_profile (save)', 'client', 'POST', 'client_profile', (),
+     lambda f: profile_form(f['client'], company_name="Events Co")),
+    ('create_job', 'client', 'GET', 'create_job', (), None),
+    ('create_job (save)', 'client', 'POST', 'create_job', (), lambda f: {
+        'title': "Ushers", 'description': "Wedding", 'client_pay_per_worker': '600', 'workers_needed': '4',
+        'location_address': "Kochi", 'location_latitude': '9.9312', 'location_longitude': '76.2673',
+        'agent_selection': f['agent'].id,
+    }),
+    ('delete_job', 'client', 'POST', 'delete_job', ('busy_job',), None),
+    ('client_pay_for_job', 'client', 'POST', 'client_pay_for_job', ('completed_job',), None),
+    ('client_rate_agent', 'client', 'POST', 'client_rate_agent', ('completed_job',), lambda f: {'rating': '4'}),
+    ('get_agents_near', 'client', 'GET', 'get_agents_near', (), lambda f: {'lat': '9.93', 'lng': '76.26'}),
+    ('delete_client_profile', 'client', 'POST', 'delete_client_profile', (), None),
+
+    # Worker
+    ('worker_home', 'worker', 'GET', 'worker_home', (), None),
+    ('worker_home (near)', 'worker', 'GET', 'worker_home', (),
+     lambda f: {'near': '1', 'lat': '9.93', 'lng': '76.26'}),
+    ('worker_profile', 'worker', 'GET', 'worker_profile', (), None),
+    ('worker_profile (save)', 'worker', 'POST', 'worker_profile', (),
+     lambda f: profile_form(f['worker'], address="Kochi", skills="Serving", availability='on')),
+    ('apply_for_job', 'worker', 'GET', 'apply_for_job', ('posting',), None),
+    ('worker_job_feed', 'worker', 'GET', 'worker_job_feed', (), None),
+    ('worker_application_feed', 'worker', 'GET', 'worker_application_feed', (), None),
+    ('worker_jobs_near', 'worker', 'GET', 'worker_jobs_near', (), lambda f: {'lat': '9.93', 'lng': '76.26'}),
+    ('worker_upload_proof', 'worker', 'GET', 'worker_upload_proof', ('accepted_application',), None),
+    ('delete_worker_profile', 'worker', 'POST', 'delete_worker_profile', (), None),
+
+    # Agent
+    ('agent_home', 'agent', 'GET', 'agent_home', (), None),
+    ('agent_profile', 'agent', 'GET', 'agent_profile', (), None),
+    ('agent_profile (save)', 'agent', 'POST', 'agent_profile', (), lambda f: profile_form(
+        f['agent'], agency_name="Agency", address="Kochi", latitude='9.9312', longitude='76.2673')),
+    ('accept_job', 'agent', 'POST', 'accept_job', ('seeking_job',), None),
+    ('create_job_posting', 'agent', 'GET', 'create_job_posting', ('open_job',), None),
+    ('create_job_posting (save)', 'agent', 'POST', 'create_job_posting', ('open_job',),
+     lambda f: {'title': "Ushers", 'description': "Wedding", 'worker_pay_rate': '450'}),
+    ('accept_application', 'agent', 'POST', 'accept_application', ('pending_application',), None),
+    ('reject_application', 'agent', 'POST', 'reject_application', ('pending_application',), None),
+    ('agent_mark_worker_paid', 'agent', 'POST', 'agent_mark_worker_paid', ('completed_application',), None),
+    ('agent_rate_worker', 'agent', 'POST', 'agent_rate_worker', ('completed_application',),
+     lambda f: {'rating': '5'}),
+    ('accept_direct_invite', 'agent', 'POST', 'accept_direct_invite', ('invite',), None),
+    ('reject_direct_invite', 'agent', 'POST', 'reject_direct_invite', ('invite',), None),
+    ('agent_review_dashboard', 'agent', 'GET', 'agent_review_dashboard', (), None),
+    ('agent_approve_proof', 'agent', 'POST', 'agent_approve_proof', ('proof',), None),
+    ('agent_reject_proof', 'agent', 'POST', 'agent_reject_proof', ('proof',), lambda f: {'remarks': "Blurry"}),
+    ('agent_bulk_review_proofs', 'agent', 'POST', 'agent_bulk_review_proofs', (),
+     lambda f: {'action': 'approve', 'proof_ids': f['pending_proof_ids']}),
+    ('delete_agent_profile', 'agent', 'POST', 'delete_agent_profile', (), None),
+
+    # Admin
+    ('admin_home', 'admin', 'GET', 'admin_home', (), None),
+    ('dashboard_cache_stats', 'admin', 'GET', 'dashboard_cache_stats', (), None),
+    ('admin_manage_jobs', 'admin', 'GET', 'admin_manage_jobs', (), None),
+    ('admin_job_detail', 'admin', 'GET', 'admin_job_detail', ('busy_job',), None),
+    ('admin_delete_job', 'admin', 'POST', 'admin_delete_job', ('busy_job',), None),
+    ('admin_bulk_delete_jobs', 'admin', 'POST', 'admin_bulk_delete_jobs', (),
+     lambda f: {'action': 'delete', 'ids': f['open_job_ids']}),
+    ('manage_clients', 'admin', 'GET', 'manage_clients', (), None),
+    ('approve_client', 'admin', 'POST', 'approve_client', ('other_client',), None),
+    ('reject_client', 'admin', 'POST', 'reject_client', ('other_client',), None),
+    ('delete_client', 'admin', 'POST', 'delete_client', ('client',), None),
+    ('manage_workers', 'admin', 'GET', 'manage_workers', (), None),
+    ('approve_worker', 'admin', 'POST', 'approve_worker', ('other_worker',), None),
+    ('reject_worker', 'admin', 'POST', 'reject_worker', ('other_worker',), None),
+    ('delete_worker', 'admin', 'POST', 'delete_worker', ('worker',), None),
+    ('manage_agents', 'admin', 'GET', 'manage_agents', (), None),
+    ('approve_agent', 'admin', 'POST', 'approve_agent', ('other_agent',), None),
+    ('reject_agent', 'admin', 'POST', 'reject_agent', ('other_agent',), None),
+    ('delete_agent', 'admin', 'POST', 'delete_agent', ('agent',), None),
+    ('admin_bulk_action', 'admin', 'POST', 'admin_bulk_action', lambda f: ['worker'],
+     lambda f: {'action': 'approve', 'ids': f['other_worker_ids']}),
+    ('metrics', 'admin', 'GET', 'metrics', (), None),
+    ('metrics_slow', 'admin', 'GET', 'metrics_slow', (), None),
+]
+
+# Views left out, and why
+UNMEASURED_VIEWS = {
+    'index': "static page",
+    'event_stream': "long-lived stream, ASGI only (LiveEventTests)",
+    'user_logout': "clears the session only",
+    'proof_upload_start': "chunked upload protocol (ChunkedProofUploadTests)",
+    'proof_upload_status': "chunked upload protocol (ChunkedProofUploadTests)",
+    'proof_upload_chunk': "chunked upload protocol (ChunkedProofUploadTests)",
+    'proof_upload_finish': "chunked upload protocol (ChunkedProofUploadTests)",
+    **{name: "login / registration form (AccountTests, LoginThroughputTests)" for name in (
+        'client_register', 'client_login', 'worker_register', 'worker_login',
+        'agent_register', 'agent_login', 'admin_login',
+    )},
+}
+
+
+class ViewPerformanceTests(LoginMixin, TestCase):
+    """
+    Query-count and latency regression checks for every view. Each view
+    is requested with cold caches against build_marketplace() at every
+    size in SIZES; its query count must be the same at each size and
+    within QUERY_BUDGETS, and its time at the largest size within
+    TIME_BUDGET_SECONDS. Run them alone with
+    `manage.py test sidecrewapp.tests.ViewPerformanceTests`; set
+    SIDECREW_PERF_TIME_FACTOR to scale the time budgets on slow machines.
+    """
+    SIZES = (1, 3, 6)
+
+    # Most SQL statements each view may run, cold caches. Includes the
+    # session lookup, and the savepoints of atomic blocks.
+    QUERY_BUDGETS = {
+        'client_home': 6,
+        'client_profile': 2,
+        'client_profile (save)': 9,
+        'create_job': 2,
+        'create_job (save)': 4,
+        'delete_job': 11,
+        'client_pay_for_job': 4,
+        'client_rate_agent': 9,
+        'get_agents_near': 3,
+        'delete_client_profile': 19,
+
+        'worker_home': 4,
+        'worker_home (near)': 4,
+        'worker_profile': 2,
+        'worker_profile (save)': 9,
+        'apply_for_job': 5,
+        'worker_job_feed': 2,
+        'worker_application_feed': 2,
+        'worker_jobs_near': 2,
+        'worker_upload_proof': 6,
+        'delete_worker_profile': 15,
+
+        'agent_home': 8,
+        'agent_profile': 2,
+        'agent_profile (save)': 5,
+        'accept_job': 4,
+        'create_job_posting': 3,
+        'create_job_posting (save)': 4,
+        'accept_application': 8,
+        'reject_application': 4,
+        'agent_mark_worker_paid': 4,
+        'agent_rate_worker': 10,
+        'accept_direct_invite': 4,
+        'reject_direct_invite': 4,
+        'agent_review_dashboard': 3,
+        'agent_approve_proof': 8,
+        'agent_reject_proof': 6,
+        'agent_bulk_review_proofs': 9,
+        'delete_agent_profile': 18,
+
+        'admin_home': 4,
+        'dashboard_cache_stats': 1,
+        'admin_manage_jobs': 2,
+        'admin_job_detail': 3,
+        'admin_delete_job': 10,
+        'admin_bulk_delete_jobs': 13,
+        'manage_clients': 2,
+        'approve_client': 6,
+        'reject_client': 6,
+        'delete_client': 17,
+        'manage_workers': 2,
+        'approve_worker': 6,
+        'reject_worker': 6,
+        'delete_worker': 13,
+        'manage_agents': 2,
+        'approve_agent': 6,
+        'reject_agent': 6,
+        'delete_agent': 16,
+        'admin_bulk_action': 4,
+        'metrics': 1,
+        'metrics_slow': 1,
+    }
+
+    # Wall time per request at the largest size, seconds
+    TIME_BUDGET_SECONDS = 0.5
+    TIME_FACTOR = float(os.environ.get('SIDECREW_PERF_TIME_FACTOR', 1))
+
+    def measure(self, fixtures, label, role, method, url_name, args, data):
+        url = reverse(url_name, args=args(fixtures) if callable(args) else [fixtures[name].id for name in args])
+        params = data(fixtures) if data else {}
+        # Each view runs against the same data: roll back what it changed
+        with transaction.atomic():
+            cache.clear()
+            # A new session: the last one went with the rollback
+            self.client.cookies.pop(settings.SESSION_COOKIE_NAME, None)
+            if role:
+                self.login_as(role, fixtures['agent'] if role == 'admin' else fixtures[role])
+            agent_coordinates.invalidate()
+            request = self.client.post if method == 'POST' else self.client.get
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = request(url, params)
+                elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 400, label)
+        # Not bounced to a login page
+        self.assertNotIn('login', response.get('Location', ''), label)
+        return self.statement_count(ctx.captured_queries), elapsed
+
+    def statement_count(self, queries):
+        # Django deletes 100 rows per DELETE statement; a run of them on one
+        # table counts once, as it is one batched delete
+        count, previous = 0, None
+        for query in queries:
+            statement = query['sql'].split(' WHERE ')[0]
+            if not (statement.startswith('DELETE') and statement == previous):
+                count += 1
+            previous = statement
+        return count
+
+    def test_every_view_is_measured(self):
+        names = {pattern.name for pattern in urls.urlpatterns}
+        measured = {url_name for _, _, _, url_name, _, _ in VIEW_REQUESTS}
+        self.assertEqual(names - measured - set(UNMEASURED_VIEWS), set())
+        self.assertEqual(set(self.QUERY_BUDGETS), {label for label, *_ in VIEW_REQUESTS})
+
+    def test_query_counts_and_times(self):
+        queries, times = {}, {}
+        for size in self.SIZES:
+            with transaction.atomic():
+                fixtures = build_marketplace(size)
+                for label, *request in VIEW_REQUESTS:
+                    count, elapsed = self.measure(fixtures, label, *request)
+                    queries.setdefault(label, []).append(count)
+                    times[label] = elapsed
+                transaction.set_rollback(True)
+
+        for label, counts in queries.items():
+            with self.subTest(view=label):
+                self.assertEqual(len(set(counts)), 1,
+                                 f"{label}: queries grow with the data ({counts} at sizes {self.SIZES})")
+                self.assertLessEqual(counts[0], self.QUERY_BUDGETS[label],
+                                     f"{label}: {counts[0]} queries, budget {self.QUERY_BUDGETS[label]}")
+                self.assertLessEqual(times[label], self.TIME_BUDGET_SECONDS * self.TIME_FACTOR,
+                                     f"{label}: {times[label] * 1000:.0f} ms")
@@ -0,0 +1,152 @@
+"""
+Chunked, resumable uploads of work-proof photos.
+
+The browser announces the file (name, size, SHA-256), sends it in small
+chunks and then finalizes. Each chunk is written to its own file under
+UPLOAD_CHUNK_DIR, so a dropped connection only costs the chunk in flight;
+the browser asks which chunks arrived and sends the rest. On finalize the
+chunks are streamed into one temporary file while hashing, so the photo
+is never held in memory, and the checksum is compared before the file is
+handed to the normal proof submission.
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from .models import ProofUpload
+
+# Bytes per chunk; keeps every request well below reverse-proxy body limits
+UPLOAD_CHUNK_SIZE = getattr(settings, 'UPLOAD_CHUNK_SIZE', 512 * 1024)
+UPLOAD_MAX_SIZE = getattr(settings, 'UPLOAD_MAX_SIZE', 25 * 1024 * 1024)
+UPLOAD_CHUNK_DIR = getattr(settings, 'UPLOAD_CHUNK_DIR', os.path.join(tempfile.gettempdir(), 'sidecrew-chunks'))
+# Unfinished uploads older than this are removed by expire_uploads()
+UPLOAD_EXPIRY_HOURS = getattr(settings, 'UPLOAD_EXPIRY_HOURS', 24)
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(ValueError):
+    pass
+
+
+def _chunk_dir(upload):
+    return os.path.join(UPLOAD_CHUNK_DIR, upload.token)
+
+
+def _chunk_path(upload, index):
+    return os.path.join(_chunk_dir(upload), f'{index:06d}.part')
+
+
+def chunk_count(upload):
+    return max(1, -(-upload.size // upload.chunk_size))
+
+
+def start_upload(application, filename, size, checksum):
+    """
+    Returns the upload session for this file, resuming an unfinished one
+    for the same application and content when there is one.
+    """
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError("Invalid file size.")
+    checksum = (checksum or '').lower()
+
+    if not 0 < size <= UPLOAD_MAX_SIZE:
+        raise UploadError(f"Photos can be at most {UPLOAD_MAX_SIZE // (1024 * 1024)} MB.")
+    if not SHA256_RE.match(checksum):
+        raise UploadError("Invalid checksum.")
+
+    upload = ProofUpload.objects.filter(application=application, checksum=checksum, size=size).first()
+    if upload is None:
+        upload = ProofUpload.objects.create(
+            application=application,
+            filename=os.path.basename(filename or 'proof.jpg')[:255],
+            size=size,
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            checksum=checksum,
+        )
+    return upload
+
+
+def received_chunks(upload):
+    try:
+        names = os.listdir(_chunk_dir(upload))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[:-5]) for name in names if name.endswith('.part'))
+
+
+def store_chunk(upload, index, data):
+    """
+    Stores chunk `index`. Sending the same chunk again (a retry) simply
+    replaces it.
+    """
+    count = chunk_count(upload)
+    if not 0 <= index < count:
+        raise UploadError("Invalid chunk index.")
+
+    expected = upload.chunk_size if index < count - 1 else upload.size - upload.chunk_size * (count - 1)
+    if len(data) != expected:
+        raise UploadError(f"Chunk {index} should be {expected} bytes, got {len(data)}.")
+
+    directory = _chunk_dir(upload)
+    os.makedirs(directory, exist_ok=True)
+    # Written aside and renamed, so a half-written chunk never counts as received
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as tmp:
+        tmp.write(data)
+    os.replace(tmp_path, _chunk_path(upload, index))
+
+
+def assemble(upload):
+    """
+    Joins the chunks into a temporary file and checks its SHA-256.
+    Returns an open django File positioned at the start; the caller
+    closes it (which deletes it).
+    """
+    missing = sorted(set(range(chunk_count(upload))) - set(received_chunks(upload)))
+    if missing:
+        raise UploadError(f"{len(missing)} chunk(s) have not been received yet.")
+
+    sha = hashlib.sha256()
+    target = tempfile.NamedTemporaryFile(suffix=os.path.splitext(upload.filename)[1])
+    for index in range(chunk_count(upload)):
+        with open(_chunk_path(upload, index), 'rb') as chunk:
+            while block := chunk.read(64 * 1024):
+                sha.update(block)
+                target.write(block)
+
+    if sha.hexdigest() != upload.checksum:
+        target.close()
+        # Start over: at least one chunk is corrupt and we cannot tell which
+        discard(upload)
+        raise UploadError("The uploaded file is corrupt (checksum mismatch). Please upload it again.")
+
+    target.seek(0)
+    return File(target, name=upload.filename)
+
+
+def discard(upload):
+    shutil.rmtree(_chunk_dir(upload), ignore_errors=True)
+    if upload.pk:
+        upload.delete()
+
+
+def expire_uploads(hours=UPLOAD_EXPIRY_HOURS):
+    """
+    Removes upload sessions that were never finalized. Returns the count.
+    """
+    stale = ProofUpload.objects.filter(created_at__lt=timezone.now() - timedelta(hours=hours))
+    count = 0
+    for upload in stale.iterator():
+        discard(upload)
+        count += 1
+    return count
@@ -1,11 +1,13 @@
 """
 URL configuration for sidecrewproject project.
 """
-from . import views
+from . import api, views
 from django.urls import path
 
 urlpatterns = [
     path('', views.index, name='index'),
+    # Live events for the logged-in agent / client / worker (ASGI only)
+    path('events/', views.event_stream, name='event_stream'),
 
     # Client Paths
     path('client_register', views.client_register, name='client_register'),
@@ -17,7 +19,7 @@ urlpatterns = [
     path('job/<int:job_id>/delete/', views.delete_job, name='delete_job'),
     path('client/job/pay/<int:job_id>/', views.client_pay_for_job, name='client_pay_for_job'),
     path('rate/agent/<int:job_id>/', views.client_rate_agent, name='client_rate_agent'),
-    path('api/get-agents-near/', views.get_agents_near, name='get_agents_near'),
+    path('api/get-agents-near/', api.agents_near, name='get_agents_near'),
 
     # Worker Paths
     path('worker_register', views.worker_register, name='worker_register'),
@@ -26,11 +28,26 @@ urlpatterns = [
     path('worker_profile', views.worker_profile, name='worker_profile'),
     path('delete_worker_profile', views.delete_worker_profile, name='delete_worker_profile'),
     path('worker/apply/<int:posting_id>/', views.apply_for_job, name='apply_for_job'),
+    path('api/worker/jobs/', api.worker_job_feed, name='worker_job_feed'),
+    path('api/worker/applications/', views.worker_application_feed, name='worker_application_feed'),
+    path('api/worker/jobs-near/', views.worker_jobs_near_api, name='worker_jobs_near'),
 
     # --- NEW WORKER PROOF URL ---
     path('application/<int:application_id>/upload-proof/',
          views.worker_upload_proof,
          name='worker_upload_proof'), # <-- ADDED
+    path('application/<int:application_id>/proof-upload/',
+         views.proof_upload_start,
+         name='proof_upload_start'),
+    path('proof-upload/<str:token>/',
+         views.proof_upload_status,
+         name='proof_upload_status'),
+    path('proof-upload/<str:token>/chunk/<int:index>/',
+         views.proof_upload_chunk,
+         name='proof_upload_chunk'),
+    path('proof-upload/<str:token>/finish/',
+         views.proof_upload_finish,
+         name='proof_upload_finish'),
 
     # Agent Paths
     path('agent_register', views.agent_register, name='agent_register'),
@@ -57,13 +74,18 @@ urlpatterns = [
     path('agent/proof/<int:proof_id>/reject/',
          views.agent_reject_proof,
          name='agent_reject_proof'), # <-- ADDED
+    path('agent/proofs/bulk-review/',
+         views.agent_bulk_review_proofs,
+         name='agent_bulk_review_proofs'),
 
     # Admin Paths
     path('admin_login', views.admin_login, name='admin_login'),
     path('admin_home', views.admin_home, name='admin_home'),
     path('admin_manage_jobs', views.admin_manage_jobs, name='admin_manage_jobs'),
     path('admin_delete_job/<int:job_id>/', views.admin_delete_job, name='admin_delete_job'),
+    path('admin_manage_jobs/bulk/', views.admin_bulk_delete_jobs, name='admin_bulk_delete_jobs'),
     path('admin_job_detail/<int:job_id>/', views.admin_job_detail, name='admin_job_detail'),
+    path('api/dashboard-cache-stats/', views.dashboard_cache_stats_api, name='dashboard_cache_stats'),
 
     # Logout
     path('user_logout', views.user_logout, name='user_logout'),
@@ -83,4 +105,10 @@ urlpatterns = [
     path('approve_agent/<int:pk>/', views.approve_agent, name='approve_agent'),
     path('reject_agent/<int:pk>/', views.reject_agent, name='reject_agent'),
     path('delete_agent/<int:pk>/', views.delete_agent, name='delete_agent'),
+
+    path('manage/<str:role>/bulk/', views.admin_bulk_action, name='admin_bulk_action'),
+
+    # Per-view performance metrics (admins, or METRICS_TOKEN)
+    path('metrics/', views.metrics_endpoint, name='metrics'),
+    path('metrics/slow/', views.slow_requests_api, name='metrics_slow'),
 ]
\ No newline at end of file
@@ -1,14 +1,37 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.contrib.auth.hashers import make_password, check_password
 from .models import Client, Worker, Agent, Application, JobPosting
 from functools import wraps
 from decimal import Decimal, InvalidOperation
-from django.db.models import F, Count
-from .models import Client, Worker, Agent, Application, JobPosting, Job, WorkProof
-from django.db.models import Avg
-import math
-from django.http import JsonResponse
+from django.db.models import F, Count, Exists, OuterRef, Value
+from django.template.loader import render_to_string
+from .models import Account, Client, Worker, Agent, Application, JobPosting, Job, WorkProof, ProofUpload
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import urlencode
+from .geo import bounding_box_filter, haversine_many
+from .pagination import keyset_page, InvalidCursor
+from .ratings import add_agent_rating, add_worker_rating
+from .images import verify_image, InvalidImage
+from .tasks import queue_profile_pic, queue_work_proof_image
+from .uploads import UploadError, assemble, chunk_count, discard, received_chunks, start_upload, store_chunk
+from .reviews import review_proofs, APPROVE, REJECT, APPROVED, REJECTED, ALREADY_REVIEWED, MAX_BULK_REVIEW
+from .principals import load_principal
+from .logins import login_blocked, record_login_failure, reset_login_failures, verify_password
+from .adminstats import JOB_STATUSES, get_admin_stats
+from .adminlists import (
+    ACTION_STATUS, DELETE, MAX_BULK_ACTION,
+    bulk_delete, bulk_delete_jobs, bulk_set_status, job_page, profile_page,
+)
+from . import events, metrics
+from .accounts import EmailTaken, change_email, create_account, get_account, log_in, set_status
+from .dashboard import (
+    get_agent_dashboard, dashboard_cache_stats,
+    invalidate_agent_dashboard, invalidate_job_board, invalidate_all_dashboards,
+    invalidate_client_dashboards, invalidate_worker_dashboards,
+)
 
 # ==================================
 # ADMIN DECORATOR
@@ -49,19 +72,27 @@ def client_register(request):
             messages.error(request, "Passwords do not match")
             return render(request, 'client_register.html', context)
 
-        if Client.objects.filter(email=email).exists():
-            messages.error(request, "Email already registered")
+        if profile_pic:
+            try:
+                verify_image(profile_pic)
+            except InvalidImage as e:
+                messages.error(request, str(e))
+                return render(request, 'client_register.html', context)
+
+        try:
+            client = create_account(
+                'client', email, password,
+                name=name,
+                phone=phone,
+                company_name=company_name,
+                profile_pic=profile_pic,
+            )
+        except EmailTaken as e:
+            messages.error(request, str(e))
             return render(request, 'client_register.html', context)
 
-        Client.objects.create(
-            name=name,
-            email=email,
-            phone=phone,
-            company_name=company_name,
-            password=make_password(password),
-            profile_pic=profile_pic,
-            status='pending'  # <-- Set status to pending
-        )
+        if profile_pic:
+            queue_profile_pic(client)
 
         messages.success(request, "Client registered successfully! Please wait for admin approval.")
         return redirect('client_login')
@@ -74,31 +105,35 @@ def client_login(request):
         email = request.POST.get('email')
         password = request.POST.get('password')
 
+        if login_blocked(request, email):
+            messages.error(request, "Too many failed login attempts. Please try again later.")
+            return redirect('client_login')
+
         try:
-            client = Client.objects.get(email=email)
+            account = get_account('client', email)
 
             # --- STATUS CHECK ---
-            if client.status == 'pending':
+            if account.status == 'pending':
                 messages.warning(request, "Your account is still pending approval.")
                 return redirect('client_login')
 
-            if client.status == 'rejected':
+            if account.status == 'rejected':
                 messages.error(request, "Your account has been rejected. Please contact support.")
                 return redirect('client_login')
             # --- END STATUS CHECK ---
 
-            if check_password(password, client.password) and client.status == 'approved':
-                request.session['client_id'] = client.id
-                request.session['client_name'] = client.name
-                request.session['is_loggedin'] = True
-                request.session['user_role'] = 'client'
+            if verify_password(account, password) and account.status == 'approved':
+                reset_login_failures(request, email)
+                client = log_in(request, account)
                 messages.success(request, f"Welcome back, {client.name}!")
                 return redirect('client_home')
             else:
+                record_login_failure(request, email)
                 messages.error(request, "Invalid credentials. Please try again.")
                 return redirect('client_login')
 
-        except Client.DoesNotExist:
+        except Account.DoesNotExist:
+            record_login_failure(request, email)
             messages.error(request, "Invalid credentials. Please try again.")
             return redirect('client_login')
 
@@ -131,20 +166,28 @@ def worker_register(request):
             messages.error(request, "Passwords do not match")
             return render(request, 'worker_register.html', context)
 
-        if Worker.objects.filter(email=email).exists():
-            messages.error(request, "Email already registered")
+        if profile_pic:
+            try:
+                verify_image(profile_pic)
+            except InvalidImage as e:
+                messages.error(request, str(e))
+                return render(request, 'worker_register.html', context)
+
+        try:
+            worker = create_account(
+                'worker', email, password,
+                name=name,
+                phone=phone,
+                address=address,
+                skills=skills,
+                profile_pic=profile_pic,
+            )
+        except EmailTaken as e:
+            messages.error(request, str(e))
             return render(request, 'worker_register.html', context)
 
-        Worker.objects.create(
-            name=name,
-            email=email,
-            phone=phone,
-            address=address,
-            skills=skills,
-            password=make_password(password),
-            profile_pic=profile_pic,
-            status='pending'  # <-- Set status to pending
-        )
+        if profile_pic:
+            queue_profile_pic(worker)
 
         messages.success(request, "Worker registered successfully! Please wait for admin approval.")
         return redirect('worker_login')
@@ -157,31 +200,35 @@ def worker_login(request):
         email = request.POST.get('email')
         password = request.POST.get('password')
 
+        if login_blocked(request, email):
+            messages.error(request, "Too many failed login attempts. Please try again later.")
+            return redirect('worker_login')
+
         try:
-            worker = Worker.objects.get(email=email)
+            account = get_account('worker', email)
 
             # --- STATUS CHECK ---
-            if worker.status == 'pending':
+            if account.status == 'pending':
                 messages.warning(request, "Your account is still pending approval.")
                 return redirect('worker_login')
 
-            if worker.status == 'rejected':
+            if account.status == 'rejected':
                 messages.error(request, "Your account has been rejected. Please contact support.")
                 return redirect('worker_login')
             # --- END STATUS CHECK ---
 
-            if check_password(password, worker.password) and worker.status == 'approved':
-                request.session['is_loggedin'] = True
-                request.session['worker_id'] = worker.id
-                request.session['user_role'] = 'worker'
-                request.session['worker_name'] = worker.name
+            if verify_password(account, password) and account.status == 'approved':
+                reset_login_failures(request, email)
+                worker = log_in(request, account)
                 messages.success(request, f"Welcome back, {worker.name}!")
                 return redirect('worker_home')
             else:
+                record_login_failure(request, email)
                 messages.error(request, "Invalid email or password.")
                 return render(request, 'worker_login.html', {'email': email})
 
-        except Worker.DoesNotExist:
+        except Account.DoesNotExist:
+            record_login_failure(request, email)
             messages.error(request, "Invalid email or password.")
             return render(request, 'worker_login.html', {'email': email})
 
@@ -227,22 +274,30 @@ def agent_register(request):
             return render(request, 'agent_register.html', context)
         # --- END ADDED ---
 
-        if Agent.objects.filter(email=email).exists():
+        if profile_pic:
+            try:
+                verify_image(profile_pic)
+            except InvalidImage as e:
+                messages.error(request, str(e))
+                return render(request, 'agent_register.html', context)
+
+        try:
+            agent = create_account(
+                'agent', email, password,
+                name=name,
+                phone=phone,
+                agency_name=agency_name,
+                profile_pic=profile_pic,
+                address=address,  # <-- Save the address
+                latitude=latitude,  # <-- Save the latitude
+                longitude=longitude,  # <-- Save the longitude
+            )
+        except EmailTaken:
             messages.error(request, "Email is already registered to an agent")
             return render(request, 'agent_register.html', context)
 
-        Agent.objects.create(
-            name=name,
-            email=email,
-            phone=phone,
-            agency_name=agency_name,
-            password=make_password(password),
-            profile_pic=profile_pic,
-            address=address,  # <-- Save the address
-            latitude=latitude,  # <-- Save the latitude
-            longitude=longitude,  # <-- Save the longitude
-            status='pending'
-        )
+        if profile_pic:
+            queue_profile_pic(agent)
 
         messages.success(request, "Agent registered successfully! Please wait for admin approval.")
         return redirect('agent_login')
@@ -254,36 +309,35 @@ def agent_login(request):
         email = request.POST.get('email')
         password = request.POST.get('password')
 
+        if login_blocked(request, email):
+            messages.error(request, "Too many failed login attempts. Please try again later.")
+            return redirect('agent_login')
+
         try:
-            agent = Agent.objects.get(email=email)
+            account = get_account('agent', email)
 
             # --- STATUS CHECK ---
-            if agent.status == 'pending':
+            if account.status == 'pending':
                 messages.warning(request, "Your account is still pending approval.")
                 return redirect('agent_login')
 
-            if agent.status == 'rejected':
+            if account.status == 'rejected':
                 messages.error(request, "Your account has been rejected. Please contact support.")
                 return redirect('agent_login')
             # --- END STATUS CHECK ---
 
-            if check_password(password, agent.password) and agent.status == 'approved':
-                request.session['is_loggedin'] = True
-
-                # --- THIS IS THE FIX ---
-                # Changed 'user_id' to 'agent_id' to match the profile view
-                request.session['agent_id'] = agent.id
-                # --- END FIX ---
-
-                request.session['user_role'] = 'agent'
-                request.session['agent_name'] = agent.name
+            if verify_password(account, password) and account.status == 'approved':
+                reset_login_failures(request, email)
+                agent = log_in(request, account)
                 messages.success(request, f"Welcome back, {agent.name}!")
                 return redirect('agent_home')
             else:
+                record_login_failure(request, email)
                 messages.error(request, "Invalid email or password.")
                 return render(request, 'agent_login.html', {'email': email})
 
-        except Agent.DoesNotExist:
+        except Account.DoesNotExist:
+            record_login_failure(request, email)
             messages.error(request, "Invalid email or password.")
             return render(request, 'agent_login.html', {'email': email})
 
@@ -300,13 +354,19 @@ def admin_login(request):
         email = request.POST.get('email', '').strip()
         password = request.POST.get('password', '')
 
+        if login_blocked(request, email):
+            messages.error(request, "Too many failed login attempts. Please try again later.")
+            return redirect('admin_login')
+
         if email == ADMIN_EMAIL and password == ADMIN_PASSWORD:
+            reset_login_failures(request, email)
             request.session['is_loggedin'] = True
             request.session['user_role'] = 'admin'
             request.session['user_id'] = 'admin'
             messages.success(request, "Logged in as admin.")
             return redirect('admin_home')
         else:
+            record_login_failure(request, email)
             messages.error(request, "Invalid credentials. Please try again.")
             return redirect('admin_login')
 
@@ -315,16 +375,30 @@ def admin_login(request):
 
 @admin_required
 def admin_home(request):
-    context = {
-        'client_count': Client.objects.count(),
-        'worker_count': Worker.objects.count(),
-        'agent_count': Agent.objects.count(),
-        'pending_clients': Client.objects.filter(status='pending').count(),
-        'pending_workers': Worker.objects.filter(status='pending').count(),
-        'pending_agents': Agent.objects.filter(status='pending').count(),
-        'total_jobs': Job.objects.count(),
-    }
-    return render(request, 'admin_home.html', context)
+    return render(request, 'admin_home.html', get_admin_stats())
+
+
+@admin_required
+def dashboard_cache_stats_api(request):
+    return JsonResponse(dashboard_cache_stats())
+
+
+def metrics_endpoint(request):
+    """
+    Per-view request metrics in the Prometheus text format (metrics.py).
+    """
+    if not metrics.authorized(request):
+        return HttpResponse("Forbidden", status=403, content_type='text/plain')
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def slow_requests_api(request):
+    """
+    The slowest requests this process has served, with their slowest SQL.
+    """
+    if not metrics.authorized(request):
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    return JsonResponse({'requests': metrics.registry.slow_requests()})
 
 
 def user_logout(request):
@@ -334,17 +408,106 @@ def user_logout(request):
 
 
 
+ADMIN_LISTS = {
+    'client': ('manage_clients', 'manage_clients.html'),
+    'worker': ('manage_workers', 'manage_workers.html'),
+    'agent': ('manage_agents', 'manage_agent.html'),
+}
+
+
+def _list_filters(request, status_choices):
+    """
+    The status filter and search text of an admin list, from GET or from
+    the hidden fields of a bulk action form.
+    """
+    params = request.POST if request.method == 'POST' else request.GET
+    status = params.get('status') or ''
+    if status not in dict(status_choices):
+        status = ''
+    return status, (params.get('q') or '').strip()
+
+
+def _admin_list_url(url_name, status, query):
+    params = {key: value for key, value in (('status', status), ('q', query)) if value}
+    return reverse(url_name) + (f'?{urlencode(params)}' if params else '')
+
+
+def _admin_profile_list(request, role):
+    url_name, template = ADMIN_LISTS[role]
+    status, query = _list_filters(request, Account.STATUS_CHOICES)
+    try:
+        items, next_cursor = profile_page(role, status, query, request.GET.get('cursor'))
+    except InvalidCursor:
+        items, next_cursor = profile_page(role, status, query)
+
+    return render(request, template, {
+        f'{role}s': items,
+        'next_cursor': next_cursor,
+        'status': status,
+        'q': query,
+        'statuses': Account.STATUS_CHOICES,
+        'list_url': reverse(url_name),
+        'bulk_url': reverse('admin_bulk_action', args=[role]),
+    })
+
+
+def _selected_ids(request):
+    """
+    The ids ticked in a bulk action form; raises ValueError when they are
+    invalid or too many.
+    """
+    try:
+        ids = [int(pk) for pk in request.POST.getlist('ids')]
+    except ValueError:
+        raise ValueError("Invalid selection.")
+    if not ids:
+        raise ValueError("Select at least one row.")
+    if len(ids) > MAX_BULK_ACTION:
+        raise ValueError(f"You can change at most {MAX_BULK_ACTION} rows at once.")
+    return ids
+
+
+@admin_required
+def admin_bulk_action(request, role):
+    """
+    Approves, rejects or deletes every client / worker / agent selected
+    on a management page, with one UPDATE or DELETE per table.
+    """
+    if role not in ADMIN_LISTS:
+        return redirect('admin_home')
+    url_name = ADMIN_LISTS[role][0]
+    status, query = _list_filters(request, Account.STATUS_CHOICES)
+    back = _admin_list_url(url_name, status, query)
+    if request.method != 'POST':
+        return redirect(back)
+
+    action = request.POST.get('action')
+    try:
+        ids = _selected_ids(request)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect(back)
+
+    if action in ACTION_STATUS:
+        count = bulk_set_status(role, ids, ACTION_STATUS[action])
+        messages.success(request, f"{count} {role}(s) {ACTION_STATUS[action]}.")
+    elif action == DELETE:
+        count = bulk_delete(role, ids)
+        messages.error(request, f"{count} {role}(s) deleted.")
+    else:
+        messages.error(request, "Invalid action.")
+    return redirect(back)
+
+
 @admin_required
 def manage_clients(request):
-    clients = Client.objects.all().order_by('status', 'name')
-    return render(request, 'manage_clients.html', {'clients': clients})
+    return _admin_profile_list(request, 'client')
 
 
 @admin_required
 def approve_client(request, pk):
     client = get_object_or_404(Client, pk=pk)
-    client.status = 'approved'
-    client.save()
+    set_status(client, 'approved')
     messages.success(request, f"Client '{client.name}' has been approved.")
     return redirect('manage_clients')
 
@@ -352,8 +515,7 @@ def approve_client(request, pk):
 @admin_required
 def reject_client(request, pk):
     client = get_object_or_404(Client, pk=pk)
-    client.status = 'rejected'
-    client.save()
+    set_status(client, 'rejected')
     messages.warning(request, f"Client '{client.name}' has been rejected.")
     return redirect('manage_clients')
 
@@ -363,6 +525,7 @@ def delete_client(request, pk):
     client = get_object_or_404(Client, pk=pk)
     name = client.name
     client.delete()
+    invalidate_all_dashboards()
     messages.error(request, f"Client '{name}' has been deleted.")
     return redirect('manage_clients')
 
@@ -370,15 +533,13 @@ def delete_client(request, pk):
 # --- Worker Management ---
 @admin_required
 def manage_workers(request):
-    workers = Worker.objects.all().order_by('status', 'name')
-    return render(request, 'manage_workers.html', {'workers': workers})
+    return _admin_profile_list(request, 'worker')
 
 
 @admin_required
 def approve_worker(request, pk):
     worker = get_object_or_404(Worker, pk=pk)
-    worker.status = 'approved'
-    worker.save()
+    set_status(worker, 'approved')
     messages.success(request, f"Worker '{worker.name}' has been approved.")
     return redirect('manage_workers')
 
@@ -386,8 +547,7 @@ def approve_worker(request, pk):
 @admin_required
 def reject_worker(request, pk):
     worker = get_object_or_404(Worker, pk=pk)
-    worker.status = 'rejected'
-    worker.save()
+    set_status(worker, 'rejected')
     messages.warning(request, f"Worker '{worker.name}' has been rejected.")
     return redirect('manage_workers')
 
@@ -397,6 +557,7 @@ def delete_worker(request, pk):
     worker = get_object_or_404(Worker, pk=pk)
     name = worker.name
     worker.delete()
+    invalidate_all_dashboards()
     messages.error(request, f"Worker '{name}' has been deleted.")
     return redirect('manage_workers')
 
@@ -404,15 +565,13 @@ def delete_worker(request, pk):
 # --- Agent Management ---
 @admin_required
 def manage_agents(request):
-    agents = Agent.objects.all().order_by('status', 'name')
-    return render(request, 'manage_agent.html', {'agents': agents})
+    return _admin_profile_list(request, 'agent')
 
 
 @admin_required
 def approve_agent(request, pk):
     agent = get_object_or_404(Agent, pk=pk)
-    agent.status = 'approved'
-    agent.save()
+    set_status(agent, 'approved')
     messages.success(request, f"Agent '{agent.name}' has been approved.")
     return redirect('manage_agents')
 
@@ -420,8 +579,7 @@ def approve_agent(request, pk):
 @admin_required
 def reject_agent(request, pk):
     agent = get_object_or_404(Agent, pk=pk)
-    agent.status = 'rejected'
-    agent.save()
+    set_status(agent, 'rejected')
     messages.warning(request, f"Agent '{agent.name}' has been rejected.")
     return redirect('manage_agents')
 
@@ -457,63 +615,14 @@ def agent_required(view_func):
 @agent_required
 def agent_home(request):
     try:
-        agent_id = request.session['agent_id']
-        agent = Agent.objects.get(id=agent_id)
+        agent = load_principal(request, 'agent')
     except (KeyError, Agent.DoesNotExist):
+        messages.error(request, "Session expired. Please log in.")
         return redirect('agent_login')
 
-    direct_invites = Job.objects.filter(
-        agent=agent,
-        status='PENDING_AGENT'
-    ).order_by('-created_at')
-
-    public_invites = Job.objects.filter(
-        agent__isnull=True,
-        status='SEEKING_AGENT'
-    ).order_by('-created_at')
-
-    unposted_jobs = Job.objects.filter(
-        agent=agent,
-        status='OPEN',
-        postings__isnull=True
-    ).order_by('-created_at')
-
-    active_postings = Job.objects.filter(
-        agent=agent,
-        status__in=['OPEN', 'FILLED'],
-        postings__isnull=False
-    ).prefetch_related(
-        'postings__applications__worker'
-    ).order_by('-created_at')
-
-    completed_jobs = Job.objects.filter(
-        agent=agent,
-        status='COMPLETED',
-        postings__isnull=False
-    ).prefetch_related(
-        'postings__applications__worker'
-    ).order_by('-created_at')
-
-    pending_applications = Application.objects.filter(
-        job_posting__agent=agent,
-        status='PENDING'
-    ).order_by('applied_at')
-
-    pending_proofs = WorkProof.objects.filter(
-        application__job_posting__agent=agent,
-        status='PENDING'
-    )
-
-    context = {
-        'agent': agent,
-        'direct_invites': direct_invites,
-        'new_invites': public_invites,
-        'active_jobs': unposted_jobs,
-        'active_postings': active_postings,
-        'completed_jobs': completed_jobs,
-        'pending_applications': pending_applications,
-        'pending_proofs': pending_proofs,
-    }
+    # All dashboard sections, cached per agent (see dashboard.py)
+    context = get_agent_dashboard(agent.id)
+    context['agent'] = agent
     return render(request, 'agent_home.html', context)
 
 
@@ -522,7 +631,7 @@ def agent_home(request):
 @agent_required
 def accept_direct_invite(request, job_id):
     try:
-        agent = Agent.objects.get(id=request.session['agent_id'])
+        agent = load_principal(request, 'agent')
     except (KeyError, Agent.DoesNotExist):
         return redirect('agent_login')
 
@@ -530,6 +639,8 @@ def accept_direct_invite(request, job_id):
 
     job.status = 'OPEN'
     job.save()
+    invalidate_agent_dashboard(agent.id)
+    events.publish_job_status(job, f"{agent.name} accepted your job '{job.title}'.")
 
     messages.success(request, f"You have accepted the invitation for '{job.title}'. You can now post it to workers.")
     return redirect('agent_home')
@@ -538,7 +649,7 @@ def accept_direct_invite(request, job_id):
 @agent_required
 def reject_direct_invite(request, job_id):
     try:
-        agent = Agent.objects.get(id=request.session['agent_id'])
+        agent = load_principal(request, 'agent')
     except (KeyError, Agent.DoesNotExist):
         return redirect('agent_login')
 
@@ -548,6 +659,9 @@ def reject_direct_invite(request, job_id):
     job.agent = None
     job.status = 'SEEKING_AGENT'
     job.save()
+    invalidate_agent_dashboard(agent.id)
+    invalidate_job_board()
+    events.publish_job_status(job, f"{agent.name} declined '{job.title}'. It is now on the public board.")
 
     messages.warning(request, f"You have rejected the invitation for '{job.title}'. It is now on the public board.")
     return redirect('agent_home')
@@ -555,33 +669,57 @@ def reject_direct_invite(request, job_id):
 @agent_required
 def accept_application(request, application_id):
     try:
-        agent = Agent.objects.get(id=request.session['agent_id'])
+        agent = load_principal(request, 'agent')
     except Agent.DoesNotExist:
         messages.error(request, "Please log in.")
         return redirect('agent_login')
 
-    application = get_object_or_404(Application, id=application_id, job_posting__agent=agent, status='PENDING')
+    application = get_object_or_404(
+        Application.objects.select_related('worker', 'job_posting__job'),
+        id=application_id, job_posting__agent=agent, status='PENDING'
+    )
     job_posting = application.job_posting
-    original_job = job_posting.job
-
-    application.status = 'ACCEPTED'
-    application.save()
-
-
-    accepted_count = Application.objects.filter(
-        job_posting=job_posting,
-        status='ACCEPTED'
-    ).count()
-
-    if accepted_count >= original_job.workers_needed:
-        job_posting.is_active = False
-        job_posting.save()
-
-        original_job.status = 'FILLED'
-        original_job.save()
+    job_id = job_posting.job_id
+
+    with transaction.atomic():
+        # 1. Claim a slot on the job. The conditional UPDATE only succeeds
+        # while a slot is free and locks the job row until commit, so two
+        # clicks can never both take the last slot.
+        got_slot = Job.objects.filter(
+            pk=job_id, workers_accepted__lt=F('workers_needed')
+        ).update(workers_accepted=F('workers_accepted') + 1)
+
+        # 2. Move the application on, unless a double submit already did
+        accepted = got_slot and Application.objects.filter(
+            pk=application.pk, status='PENDING'
+        ).update(status='ACCEPTED')
+
+        if got_slot and not accepted:
+            transaction.set_rollback(True)
+
+        # 3. Close the job once the last slot is taken
+        filled = accepted and Job.objects.filter(
+            pk=job_id, status='OPEN', workers_accepted__gte=F('workers_needed')
+        ).update(status='FILLED')
+        if filled:
+            JobPosting.objects.filter(job_id=job_id).update(is_active=False)
+
+    if not got_slot:
+        messages.error(request, f"'{job_posting.title}' already has all the workers it needs.")
+    elif not accepted:
+        messages.warning(request, "This application has already been processed.")
+    elif filled:
+        invalidate_agent_dashboard(agent.id)
+        application.status = 'ACCEPTED'
+        events.publish_application_status(application)
+        job_posting.job.status = 'FILLED'
+        events.publish_job_status(job_posting.job, f"'{job_posting.job.title}' now has all the workers it needs.")
         messages.success(request,
                          f"Worker {application.worker.name} accepted. This job is now full and has been closed.")
     else:
+        invalidate_agent_dashboard(agent.id)
+        application.status = 'ACCEPTED'
+        events.publish_application_status(application)
         messages.success(request, f"Worker {application.worker.name} accepted for {job_posting.title}.")
 
     return redirect('agent_home')
@@ -590,15 +728,20 @@ def accept_application(request, application_id):
 @agent_required
 def reject_application(request, application_id):
     try:
-        agent = Agent.objects.get(id=request.session['agent_id'])
+        agent = load_principal(request, 'agent')
     except Agent.DoesNotExist:
         messages.error(request, "Please log in.")
         return redirect('agent_login')
 
-    application = get_object_or_404(Application, id=application_id, job_posting__agent=agent, status='PENDING')
+    application = get_object_or_404(
+        Application.objects.select_related('worker', 'job_posting'),
+        id=application_id, job_posting__agent=agent, status='PENDING'
+    )
 
     application.status = 'REJECTED'
     application.save()
+    invalidate_agent_dashboard(agent.id)
+    events.publish_application_status(application)
 
     messages.warning(request, f"Application from {application.worker.name} has been rejected.")
     return redirect('agent_home')
@@ -607,7 +750,7 @@ def reject_application(request, application_id):
 def agent_profile(request):
 
     try:
-        agent = Agent.objects.get(pk=request.session['agent_id'])
+        agent = load_principal(request, 'agent')
     except Agent.DoesNotExist:
         request.session.flush()
         messages.error(request, "Could not find your profile. Please log in again.")
@@ -626,13 +769,6 @@ def agent_profile(request):
         new_latitude = lat if lat else None
         new_longitude = lng if lng else None
 
-        if new_email != agent.email:
-            if Agent.objects.filter(email=new_email).exclude(pk=agent.pk).exists():
-                messages.error(request, "This email address is already in use by another account.")
-                return render(request, 'agent_profile.html', {'agent': agent})
-            else:
-                agent.email = new_email
-
         agent.name = new_name
         agent.agency_name = new_agency_name
         agent.phone = new_phone
@@ -641,12 +777,27 @@ def agent_profile(request):
         agent.latitude = new_latitude
         agent.longitude = new_longitude
 
-        if 'profile_pic' in request.FILES:
-            agent.profile_pic = request.FILES['profile_pic']
+        new_profile_pic = request.FILES.get('profile_pic')
+        if new_profile_pic:
+            try:
+                verify_image(new_profile_pic)
+            except InvalidImage as e:
+                messages.error(request, str(e))
+                return redirect('agent_profile')
+            agent.profile_pic = new_profile_pic
+            # Rebuilt from the new picture by the background worker
+            agent.profile_thumbnail = None
 
         try:
-            agent.save()
+            with transaction.atomic():
+                change_email(agent, new_email)
+                agent.save()
+            if new_profile_pic:
+                queue_profile_pic(agent)
             messages.success(request, "Your profile has been updated successfully!")
+        except EmailTaken as e:
+            messages.error(request, str(e))
+            return render(request, 'agent_profile.html', {'agent': agent})
         except Exception as e:
             messages.error(request, f"An error occurred while saving: {e}")
 
@@ -663,7 +814,7 @@ def agent_profile(request):
 def delete_agent_profile(request):
 
     try:
-        agent = Agent.objects.get(pk=request.session['agent_id'])
+        agent = load_principal(request, 'agent')
 
         agent_name = agent.name
 
@@ -699,13 +850,14 @@ def client_required(view_func):
 @client_required
 def client_home(request):
     try:
-        client = Client.objects.get(id=request.session['client_id'])
+        client = load_principal(request, 'client')
     except (KeyError, Client.DoesNotExist):
         messages.error(request, "Session expired. Please log in.")
         return redirect('client_login')
 
-    # This query now fetches the workers assigned to each job
-    my_jobs = Job.objects.filter(client=client).order_by('-created_at').prefetch_related(
+    # This query now fetches the workers assigned to each job, and the
+    # agent shown on every card
+    my_jobs = Job.objects.filter(client=client).order_by('-created_at').select_related('agent').prefetch_related(
         'postings__applications__worker'
     )
 
@@ -722,7 +874,7 @@ def client_profile(request):
     Allows a client to view and update their profile.
     """
     try:
-        client = Client.objects.get(pk=request.session['client_id'])
+        client = load_principal(request, 'client')
     except Client.DoesNotExist:
         request.session.flush()
         messages.error(request, "Could not find your profile. Please log in again.")
@@ -738,14 +890,6 @@ def client_profile(request):
         new_company_name = request.POST.get('company_name') # --- ADDED THIS LINE ---
         # new_address = request.POST.get('address') # --- REMOVED THIS LINE ---
 
-        # Check if the email is being changed and if it's already taken
-        if new_email != client.email:
-            if Client.objects.filter(email=new_email).exclude(pk=client.pk).exists():
-                messages.error(request, "This email address is already in use by another account.")
-                return render(request, 'client_profile.html', {'client': client})
-            else:
-                client.email = new_email
-
         # Update the client object
         client.name = new_name
         client.phone = new_phone
@@ -753,13 +897,29 @@ def client_profile(request):
         # client.address = new_address # --- REMOVED THIS LINE ---
 
         # Handle the profile picture file upload
-        if 'profile_pic' in request.FILES:
-            client.profile_pic = request.FILES['profile_pic']
+        new_profile_pic = request.FILES.get('profile_pic')
+        if new_profile_pic:
+            try:
+                verify_image(new_profile_pic)
+            except InvalidImage as e:
+                messages.error(request, str(e))
+                return redirect('client_profile')
+            client.profile_pic = new_profile_pic
+            # Rebuilt from the new picture by the background worker
+            client.profile_thumbnail = None
 
         try:
-            client.save()
+            with transaction.atomic():
+                change_email(client, new_email)
+                client.save()
+            if new_profile_pic:
+                queue_profile_pic(client)
+            invalidate_client_dashboards(client.id)
             request.session['client_name'] = client.name
             messages.success(request, "Your profile has been updated successfully!")
+        except EmailTaken as e:
+            messages.error(request, str(e))
+            return render(request, 'client_profile.html', {'client': client})
         except Exception as e:
             messages.error(request, f"An error occurred while saving: {e}")
 
@@ -780,11 +940,12 @@ def delete_client_profile(request):
     Handles the permanent deletion of a client's own profile.
     """
     try:
-        client = Client.objects.get(pk=request.session['client_id'])
+        client = load_principal(request, 'client')
         client_name = client.name # Get name for success message
 
         # Delete the client object
         client.delete()
+        invalidate_all_dashboards()
 
         # Log the user out by clearing their session
         request.session.flush()
@@ -832,39 +993,181 @@ def worker_required(view_func):
 @worker_required
 def worker_home(request):
     try:
-        worker = Worker.objects.get(id=request.session['worker_id'])
+        worker = load_principal(request, 'worker')
     except Worker.DoesNotExist:
         messages.error(request, "Please log in.")
         return redirect('worker_login')
 
-    # 1. Get IDs of jobs this worker has already applied for
-    applied_job_ids = Application.objects.filter(worker=worker).values_list('job_posting_id', flat=True)
-
-    # 2. Get all available jobs (active) that this worker has NOT applied for
-    available_jobs = JobPosting.objects.filter(
-        is_active=True
-    ).exclude(
-        id__in=applied_job_ids
-    ).order_by('-created_at')
+    # "Jobs near me" mode: ?near=1&lat=..&lng=..[&radius=..&limit=..]
+    near = None
+    if request.GET.get('near'):
+        try:
+            near = parse_nearby_params(request.GET)
+        except (TypeError, ValueError):
+            messages.error(request, "Could not read your location. Showing all jobs instead.")
 
-    # 3. Get all of this worker's existing applications
-    my_applications = Application.objects.filter(
-        worker=worker
-    ).order_by('-applied_at')
+    if near:
+        lat, lng, radius, limit = near
+        available_jobs, jobs_cursor = worker_jobs_near(worker.id, lat, lng, radius, limit), None
+    else:
+        available_jobs, jobs_cursor = worker_job_page(worker.id)
+    my_applications, applications_cursor = worker_application_page(worker.id)
 
     context = {
         'available_jobs': available_jobs,
+        'jobs_cursor': jobs_cursor,
+        'near': near,
+        'radius_choices': [5, 10, 25, 50, 100],
         'my_applications': my_applications,
+        'applications_cursor': applications_cursor,
     }
     return render(request, 'worker_home.html', context)
 
 
+WORKER_FEED_PAGE_SIZE = 10
+
+
+def available_postings(worker_id):
+    """
+    Active postings the worker has not applied for yet. "Not applied" is a
+    NOT EXISTS anti-join, so the worker's application history is never
+    loaded into Python.
+    """
+    already_applied = Application.objects.filter(job_posting=OuterRef('pk'), worker_id=worker_id)
+    return JobPosting.objects.filter(
+        # Value() makes every backend emit "is_active = true"; SQLite cannot
+        # use posting_active_created_idx for a bare "WHERE is_active".
+        is_active=Value(True)
+    ).filter(
+        ~Exists(already_applied)
+    ).select_related('agent', 'job')
+
+
+def worker_job_page(worker_id, cursor=None):
+    """
+    One page of available_postings(), newest first. The infinite scroll
+    fetches the following pages from api.worker_job_feed.
+    """
+    return keyset_page(available_postings(worker_id), cursor, fields=('created_at', 'id'),
+                       page_size=WORKER_FEED_PAGE_SIZE)
+
+
+def worker_application_page(worker_id, cursor=None):
+    """
+    One page of the worker's own applications, newest first.
+    """
+    applications = Application.objects.filter(
+        worker_id=worker_id
+    ).select_related('job_posting', 'work_proof')
+    return keyset_page(applications, cursor, fields=('applied_at', 'id'), page_size=WORKER_FEED_PAGE_SIZE)
+
+
+NEARBY_JOBS_DEFAULT_RADIUS_KM = 25
+NEARBY_JOBS_MAX_RADIUS_KM = 200
+NEARBY_JOBS_DEFAULT_LIMIT = 20
+NEARBY_JOBS_MAX_LIMIT = 100
+
+
+def parse_nearby_params(params):
+    """
+    Reads lat, lng, radius (km) and limit from a GET QueryDict.
+    Raises ValueError when they are missing or out of range.
+    """
+    lat = float(params.get('lat'))
+    lng = float(params.get('lng'))
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("Coordinates out of range")
+
+    radius = float(params.get('radius') or NEARBY_JOBS_DEFAULT_RADIUS_KM)
+    limit = int(params.get('limit') or NEARBY_JOBS_DEFAULT_LIMIT)
+    if not (0 < radius <= NEARBY_JOBS_MAX_RADIUS_KM and 0 < limit <= NEARBY_JOBS_MAX_LIMIT):
+        raise ValueError("Radius or limit out of range")
+    return lat, lng, radius, limit
+
+
+def worker_jobs_near(worker_id, lat, lng, radius_km, limit):
+    """
+    Active postings the worker has not applied for, within `radius_km` of
+    (lat, lng), nearest first. Each posting gets a `distance` attribute (km).
+
+    The database only returns postings whose job lies inside the bounding
+    box of the search circle (indexed, see Job.Meta.indexes); exact
+    distances for those candidates are computed in one NumPy pass.
+    """
+    already_applied = Application.objects.filter(job_posting=OuterRef('pk'), worker_id=worker_id)
+    candidates = list(JobPosting.objects.filter(
+        is_active=True,
+        **bounding_box_filter(lat, lng, radius_km, 'job__location_latitude', 'job__location_longitude')
+    ).filter(
+        ~Exists(already_applied)
+    ).select_related('agent', 'job'))
+
+    if not candidates:
+        return []
+
+    distances = haversine_many(
+        lat, lng,
+        [posting.job.location_latitude for posting in candidates],
+        [posting.job.location_longitude for posting in candidates],
+    )
+    nearby = []
+    for posting, distance in zip(candidates, distances.tolist()):
+        if distance <= radius_km:
+            posting.distance = distance
+            nearby.append(posting)
+
+    nearby.sort(key=lambda posting: (posting.distance, -posting.id))
+    return nearby[:limit]
+
+
+@worker_required
+def worker_jobs_near_api(request):
+    """
+    JSON list of active postings near ?lat=&lng=, ranked by distance.
+    Optional ?radius= (km) and ?limit= query parameters.
+    """
+    try:
+        lat, lng, radius, limit = parse_nearby_params(request.GET)
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'Invalid location, radius or limit'}, status=400)
+
+    postings = worker_jobs_near(request.session['worker_id'], lat, lng, radius, limit)
+    return JsonResponse({'jobs': [{
+        'id': posting.id,
+        'title': posting.title,
+        'agency_name': posting.agent.agency_name,
+        'worker_pay_rate': str(posting.worker_pay_rate),
+        'location_address': posting.job.location_address,
+        'latitude': str(posting.job.location_latitude),
+        'longitude': str(posting.job.location_longitude),
+        'distance': f"{posting.distance:.1f}",
+    } for posting in postings]})
+
+
+def _feed_response(request, page_func, template, item_name):
+    try:
+        items, next_cursor = page_func(request.session['worker_id'], request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    html = ''.join(render_to_string(template, {item_name: item}, request=request) for item in items)
+    return JsonResponse({'html': html, 'count': len(items), 'next_cursor': next_cursor})
+
+
+@worker_required
+def worker_application_feed(request):
+    """
+    Infinite-scroll endpoint for the "My Applications" list on worker_home.
+    """
+    return _feed_response(request, worker_application_page, 'partials/worker_application_item.html', 'app')
+
+
 # --- ADD THIS NEW FUNCTION (in the "WORKER VIEWS" section) ---
 
 @worker_required
 def apply_for_job(request, posting_id):
     try:
-        worker = Worker.objects.get(id=request.session['worker_id'])
+        worker = load_principal(request, 'worker')
     except Worker.DoesNotExist:
         messages.error(request, "Please log in.")
         return redirect('worker_login')
@@ -880,11 +1183,13 @@ def apply_for_job(request, posting_id):
         return redirect('worker_home')
 
     # --- This is the "Booking" / "Applying" logic ---
-    Application.objects.create(
+    application = Application.objects.create(
         job_posting=job_posting,
         worker=worker,
         status='PENDING'  # The agent will have to approve this
     )
+    invalidate_agent_dashboard(job_posting.agent_id)
+    events.publish_application_created(application)
 
     messages.success(request, f"You have successfully applied for '{job_posting.title}'!")
     return redirect('worker_home')
@@ -897,7 +1202,7 @@ def worker_profile(request):
     """
     try:
         # Get the worker object based on the ID stored in the session
-        worker = Worker.objects.get(pk=request.session['worker_id'])
+        worker = load_principal(request, 'worker')
     except Worker.DoesNotExist:
         # This handles a bad session (e.g., worker was deleted)
         request.session.flush()  # Clear the bad session
@@ -918,15 +1223,6 @@ def worker_profile(request):
         # will not be in request.POST, so .get() will return None.
         new_availability = request.POST.get('availability') == 'on'
 
-        # Check if the email is being changed and if it's already taken
-        if new_email != worker.email:
-            if Worker.objects.filter(email=new_email).exclude(pk=worker.pk).exists():
-                # This email is taken by *another* user
-                messages.error(request, "This email address is already in use by another account.")
-                return render(request, 'worker_profile.html', {'worker': worker})
-            else:
-                worker.email = new_email
-
         # Update the worker object
         worker.name = new_name
         worker.phone = new_phone
@@ -935,14 +1231,30 @@ def worker_profile(request):
         worker.availability = new_availability
 
         # Handle the profile picture file upload
-        if 'profile_pic' in request.FILES:
-            worker.profile_pic = request.FILES['profile_pic']
+        new_profile_pic = request.FILES.get('profile_pic')
+        if new_profile_pic:
+            try:
+                verify_image(new_profile_pic)
+            except InvalidImage as e:
+                messages.error(request, str(e))
+                return redirect('worker_profile')
+            worker.profile_pic = new_profile_pic
+            # Rebuilt from the new picture by the background worker
+            worker.profile_thumbnail = None
 
         try:
-            worker.save()
+            with transaction.atomic():
+                change_email(worker, new_email)
+                worker.save()
+            if new_profile_pic:
+                queue_profile_pic(worker)
+            invalidate_worker_dashboards(worker.id)
             # IMPORTANT: Update the session name if it changed
             request.session['worker_name'] = worker.name
             messages.success(request, "Your profile has been updated successfully!")
+        except EmailTaken as e:
+            messages.error(request, str(e))
+            return render(request, 'worker_profile.html', {'worker': worker})
         except Exception as e:
             messages.error(request, f"An error occurred while saving: {e}")
 
@@ -964,11 +1276,12 @@ def delete_worker_profile(request):
     Handles the permanent deletion of a worker's own profile.
     """
     try:
-        worker = Worker.objects.get(pk=request.session['worker_id'])
+        worker = load_principal(request, 'worker')
         worker_name = worker.name  # Get name for success message
 
         # Delete the worker object
         worker.delete()
+        invalidate_all_dashboards()
 
         # Log the user out by clearing their session
         request.session.flush()
@@ -992,7 +1305,7 @@ from .forms import JobForm, JobPostingForm  # Import your new form
 @client_required
 def create_job(request):
     try:
-        client = Client.objects.get(id=request.session['client_id'])
+        client = load_principal(request, 'client')
     except (KeyError, Client.DoesNotExist):
         messages.error(request, "You must be logged in to post a job.")
         return redirect('client_login')
@@ -1012,15 +1325,18 @@ def create_job(request):
                     job.agent = invited_agent
                     job.status = 'PENDING_AGENT'
                     job.save()
+                    invalidate_agent_dashboard(invited_agent.id)
                     messages.success(request,
                                      f"Job has been created and sent directly to {invited_agent.agency_name} for approval.")
                 except Agent.DoesNotExist:
                     messages.error(request, "Selected agent not found. Posting to public board.")
                     job.status = 'SEEKING_AGENT'
                     job.save()
+                    invalidate_job_board()
             else:
                 job.status = 'SEEKING_AGENT'
                 job.save()
+                invalidate_job_board()
                 messages.success(request, "Job posted successfully! It is now visible to all agents.")
 
             return redirect('client_home')
@@ -1050,7 +1366,7 @@ from .models import Agent, Job  # Make sure Agent and Job are imported
 @agent_required
 def accept_job(request, job_id):
     try:
-        agent = Agent.objects.get(id=request.session['agent_id'])
+        agent = load_principal(request, 'agent')
     except (KeyError, Agent.DoesNotExist):
         return redirect('agent_login')
 
@@ -1062,6 +1378,9 @@ def accept_job(request, job_id):
     job.agent = agent  # Assign the agent who clicked
     job.status = 'OPEN'  # Set it to 'OPEN' so they can post it
     job.save()
+    invalidate_agent_dashboard(agent.id)
+    invalidate_job_board()
+    events.publish_job_status(job, f"{agent.name} took on your job '{job.title}'.")
     # --- END CHANGE ---
 
     messages.success(request, f"Job '{job.title}' has been claimed! You can now post it to workers.")
@@ -1080,7 +1399,7 @@ def create_job_posting(request, job_id):
     an accepted client Job.
     """
     try:
-        agent_obj = Agent.objects.get(id=request.session['agent_id'])
+        agent_obj = load_principal(request, 'agent')
     except Agent.DoesNotExist:
         messages.error(request, "Agent not found. Please log in.")
         return redirect('agent_login')
@@ -1103,6 +1422,7 @@ def create_job_posting(request, job_id):
             job_post.agent = agent_obj
             job_post.job = original_job
             job_post.save()
+            invalidate_agent_dashboard(agent_obj.id)
 
             messages.success(request, f"New job '{job_post.title}' has been posted for workers.")
             return redirect('agent_home')
@@ -1121,10 +1441,44 @@ def create_job_posting(request, job_id):
 
 # --- ADD TO YOUR "WORKER VIEWS" SECTION ---
 
+def submit_work_proof(application, image, latitude, longitude):
+    """
+    Saves `image` as the (new) proof for `application` and hands it to the
+    agent for review. Shared by the form upload and the chunked upload.
+    Raises InvalidImage if the file is not an image.
+    """
+    # Only a quick check here; resizing and thumbnails happen in the
+    # background worker so the upload returns straight away
+    verify_image(image)
+
+    # Use update_or_create to handle both new uploads and resubmissions
+    proof, created = WorkProof.objects.update_or_create(
+        application=application,
+        defaults={
+            'image': image,
+            'thumbnail': None,
+            'photo_latitude': None,
+            'photo_longitude': None,
+            'latitude': latitude,
+            'longitude': longitude,
+            'status': 'PENDING',
+            'agent_remarks': None # Clear old remarks on resubmission
+        }
+    )
+    queue_work_proof_image(proof)
+
+    # Update the application status
+    application.status = 'PROOF_SUBMITTED'
+    application.save()
+    invalidate_agent_dashboard(application.job_posting.agent_id)
+    events.publish_proof_submitted(application, proof)
+    return proof
+
+
 @worker_required
 def worker_upload_proof(request, application_id):
     try:
-        worker = Worker.objects.get(id=request.session['worker_id'])
+        worker = load_principal(request, 'worker')
     except Worker.DoesNotExist:
         messages.error(request, "Please log in.")
         return redirect('worker_login')
@@ -1151,26 +1505,19 @@ def worker_upload_proof(request, application_id):
 
         if not all([image, latitude, longitude]):
             messages.error(request, "Missing location or image. Please enable location and try again.")
-            return render(request, 'upload_proof.html', {
+            return render(request, 'upload_proofs.html', {
                 'application': application,
                 'proof': existing_proof
             })
 
-        # Use update_or_create to handle both new uploads and resubmissions
-        proof, created = WorkProof.objects.update_or_create(
-            application=application,
-            defaults={
-                'image': image,
-                'latitude': latitude,
-                'longitude': longitude,
-                'status': 'PENDING',
-                'agent_remarks': None # Clear old remarks on resubmission
-            }
-        )
-
-        # Update the application status
-        application.status = 'PROOF_SUBMITTED'
-        application.save()
+        try:
+            submit_work_proof(application, image, latitude, longitude)
+        except InvalidImage as e:
+            messages.error(request, str(e))
+            return render(request, 'upload_proofs.html', {
+                'application': application,
+                'proof': existing_proof
+            })
 
         messages.success(request, "Proof uploaded successfully! Waiting for agent approval.")
         return redirect('worker_home')
@@ -1181,12 +1528,128 @@ def worker_upload_proof(request, application_id):
     })
 
 
+# --- Chunked, resumable proof upload (see uploads.py) ---
+
+def _uploadable_application(request, application_id):
+    # SECURITY + LOGIC CHECK in one query: the worker's own application,
+    # in a state that accepts a proof
+    return Application.objects.select_related('job_posting').filter(
+        id=application_id,
+        worker_id=request.session['worker_id'],
+        status__in=['ACCEPTED', 'PROOF_REJECTED']
+    ).first()
+
+
+def _upload_session(request, token):
+    upload = ProofUpload.objects.filter(
+        token=token,
+        application__worker_id=request.session['worker_id']
+    ).first()
+    if upload is None:
+        return None, JsonResponse({'error': 'Unknown upload'}, status=404)
+    return upload, None
+
+
+def _upload_status(upload):
+    return {
+        'upload_id': upload.token,
+        'chunk_size': upload.chunk_size,
+        'chunk_count': chunk_count(upload),
+        'received': received_chunks(upload),
+    }
+
+
+@worker_required
+def proof_upload_start(request, application_id):
+    """
+    POST filename, size and checksum (SHA-256 hex) to start a chunked
+    upload, or to resume the unfinished upload of the same file.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    application = _uploadable_application(request, application_id)
+    if application is None:
+        return JsonResponse({'error': 'You cannot submit proof for this application at this time.'}, status=403)
+
+    try:
+        upload = start_upload(application, request.POST.get('filename'), request.POST.get('size'),
+                              request.POST.get('checksum'))
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(_upload_status(upload))
+
+
+@worker_required
+def proof_upload_status(request, token):
+    upload, error = _upload_session(request, token)
+    return error or JsonResponse(_upload_status(upload))
+
+
+@worker_required
+def proof_upload_chunk(request, token, index):
+    """
+    POST the raw bytes of chunk `index` as the request body.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    upload, error = _upload_session(request, token)
+    if error:
+        return error
+    try:
+        store_chunk(upload, index, request.body)
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'received': index})
+
+
+@worker_required
+def proof_upload_finish(request, token):
+    """
+    POST latitude and longitude once every chunk is in: assembles the
+    file, checks it and submits it as the proof.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    upload, error = _upload_session(request, token)
+    if error:
+        return error
+
+    application = _uploadable_application(request, upload.application_id)
+    if application is None:
+        return JsonResponse({'error': 'You cannot submit proof for this application at this time.'}, status=403)
+
+    try:
+        latitude = Decimal(request.POST.get('latitude', ''))
+        longitude = Decimal(request.POST.get('longitude', ''))
+    except InvalidOperation:
+        return JsonResponse({'error': 'Missing location. Please enable location and try again.'}, status=400)
+
+    try:
+        image = assemble(upload)
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    try:
+        with image:
+            submit_work_proof(application, image, latitude, longitude)
+    except InvalidImage as e:
+        discard(upload)
+        return JsonResponse({'error': str(e)}, status=400)
+
+    discard(upload)
+    messages.success(request, "Proof uploaded successfully! Waiting for agent approval.")
+    return JsonResponse({'redirect': reverse('worker_home')})
+
+
 # --- ADD TO YOUR "AGENT VIEWS" SECTION ---
 
 @agent_required
 def agent_review_dashboard(request):
     try:
-        agent = Agent.objects.get(id=request.session['agent_id'])
+        agent = load_principal(request, 'agent')
     except Agent.DoesNotExist:
         messages.error(request, "Please log in.")
         return redirect('agent_login')
@@ -1195,7 +1658,7 @@ def agent_review_dashboard(request):
     pending_proofs = WorkProof.objects.filter(
         status='PENDING',
         application__job_posting__agent=agent
-    ).order_by('uploaded_at')
+    ).select_related('application__worker', 'application__job_posting').order_by('uploaded_at')
 
     return render(request, 'agent_review_dashboard.html', {'proofs': pending_proofs})
 
@@ -1207,53 +1670,59 @@ def agent_approve_proof(request, proof_id):
     if request.method != 'POST':
         return redirect('agent_review_dashboard')
 
-    try:
-        agent = Agent.objects.get(id=request.session['agent_id'])
-    except Agent.DoesNotExist:
-        messages.error(request, "Please log in.")
-        return redirect('agent_login')
+    agent_id = request.session['agent_id']
 
-    proof = get_object_or_404(WorkProof, id=proof_id)
+    # SECURITY CHECK: done in the query itself, which also loads the
+    # application, worker, posting and job in the same round trip
+    proof = WorkProof.objects.select_related(
+        'application__worker', 'application__job_posting__job'
+    ).filter(id=proof_id, application__job_posting__agent_id=agent_id).first()
 
-    # SECURITY CHECK
-    if proof.application.job_posting.agent != agent:
+    if proof is None:
         messages.error(request, "You do not have permission to review this proof.")
         return redirect('agent_review_dashboard')
 
-    # 1. Approve the Proof
-    proof.status = 'APPROVED'
-    proof.save()
-
-    # 2. Update the Application status to final
     application = proof.application
-    application.status = 'COMPLETED'
-    application.save()
-
-    # --- NEW LOGIC: CHECK IF THE WHOLE JOB IS COMPLETE ---
-
-    # Get the original job this application belongs to
     original_job = application.job_posting.job
 
-    # Count how many applications for this *entire job* are now 'COMPLETED'
-    completed_app_count = Application.objects.filter(
-        job_posting__job=original_job,
-        status='COMPLETED'
-    ).count()
-
-    # Check if all needed workers have completed the job
-    if completed_app_count >= original_job.workers_needed:
-        original_job.status = 'COMPLETED'
-        original_job.save()
+    with transaction.atomic():
+        # Lock the job row: concurrent approvals for the same job queue up
+        # here, so the completed-worker counter is never lost or misread.
+        job = Job.objects.select_for_update().only(
+            'workers_needed', 'workers_completed', 'status'
+        ).get(pk=original_job.pk)
+
+        # 1. Approve the Proof (only once, even on a double submit)
+        approved = WorkProof.objects.filter(pk=proof.pk, status='PENDING').update(status='APPROVED')
+
+        if approved:
+            # 2. Update the Application status to final
+            Application.objects.filter(pk=application.pk).update(status='COMPLETED')
+
+            # 3. Count the worker on the job, completing it with the last one
+            job.workers_completed += 1
+            if job.workers_completed >= job.workers_needed:
+                job.status = 'COMPLETED'
+            job.save(update_fields=['workers_completed', 'status'])
+
+    if not approved:
+        messages.warning(request, "This proof has already been reviewed.")
+    elif job.status == 'COMPLETED':
+        invalidate_agent_dashboard(agent_id)
+        application.status = original_job.status = 'COMPLETED'
+        events.publish_application_status(application)
+        events.publish_job_status(original_job, f"All workers have finished '{original_job.title}'.")
         messages.success(request,
                          f"Proof from {application.worker.name} approved. This was the final worker, so the job '{original_job.title}' is now marked as COMPLETED.")
     else:
+        invalidate_agent_dashboard(agent_id)
+        application.status = 'COMPLETED'
+        events.publish_application_status(application)
         # Not the last worker, just give a standard message
-        remaining = original_job.workers_needed - completed_app_count
+        remaining = job.workers_needed - job.workers_completed
         messages.success(request,
                          f"Proof from {application.worker.name} approved. Still waiting on {remaining} more worker(s).")
 
-    # --- END NEW LOGIC ---
-
     return redirect('agent_review_dashboard')
 
 
@@ -1262,38 +1731,108 @@ def agent_reject_proof(request, proof_id):
     if request.method != 'POST':
         return redirect('agent_review_dashboard')
 
-    try:
-        agent = Agent.objects.get(id=request.session['agent_id'])
-    except Agent.DoesNotExist:
-        messages.error(request, "Please log in.")
-        return redirect('agent_login')
-
-    proof = get_object_or_404(WorkProof, id=proof_id)
+    agent_id = request.session['agent_id']
     remarks = request.POST.get('remarks')
 
     if not remarks:
         messages.error(request, "A reason is required for rejection.")
         return redirect('agent_review_dashboard')
 
-    # SECURITY CHECK
-    if proof.application.job_posting.agent != agent:
+    # SECURITY CHECK: done in the query itself, as in agent_approve_proof
+    proof = WorkProof.objects.select_related(
+        'application__worker', 'application__job_posting'
+    ).filter(id=proof_id, application__job_posting__agent_id=agent_id).first()
+
+    if proof is None:
         messages.error(request, "You do not have permission to review this proof.")
         return redirect('agent_review_dashboard')
 
-    # 1. Reject the Proof
-    proof.status = 'REJECTED'
-    proof.agent_remarks = remarks
-    proof.save()
-
-    # 2. Update the Application, setting it back so the worker can re-submit
     application = proof.application
+
+    with transaction.atomic():
+        # 1. Reject the Proof, only while it is still pending: an approved
+        # proof has already been counted on the job
+        rejected = WorkProof.objects.filter(pk=proof.pk, status='PENDING').update(
+            status='REJECTED', agent_remarks=remarks
+        )
+
+        # 2. Update the Application, setting it back so the worker can re-submit
+        if rejected:
+            Application.objects.filter(pk=application.pk).update(status='PROOF_REJECTED')
+
+    if not rejected:
+        messages.warning(request, "This proof has already been reviewed.")
+        return redirect('agent_review_dashboard')
+
+    invalidate_agent_dashboard(agent_id)
+    proof.status, proof.agent_remarks = 'REJECTED', remarks
     application.status = 'PROOF_REJECTED'
-    application.save()
+    events.publish_application_status(application)
 
     messages.warning(request, f"Proof from {application.worker.name} rejected. Worker has been notified to resubmit.")
     return redirect('agent_review_dashboard')
 
 
+@agent_required
+def agent_bulk_review_proofs(request):
+    """
+    Approves or rejects every proof in the POSTed `proof_ids` list in one
+    transaction (see reviews.py). Answers with JSON per-item results when
+    the request accepts JSON, otherwise with messages and a redirect.
+    """
+    if request.method != 'POST':
+        return redirect('agent_review_dashboard')
+
+    wants_json = 'application/json' in request.headers.get('Accept', '')
+    action = request.POST.get('action')
+    remarks = (request.POST.get('remarks') or '').strip()
+
+    def fail(error):
+        if wants_json:
+            return JsonResponse({'error': error}, status=400)
+        messages.error(request, error)
+        return redirect('agent_review_dashboard')
+
+    try:
+        proof_ids = [int(proof_id) for proof_id in request.POST.getlist('proof_ids')]
+    except ValueError:
+        return fail("Invalid proof selection.")
+
+    if not proof_ids:
+        return fail("Select at least one proof to review.")
+    if len(proof_ids) > MAX_BULK_REVIEW:
+        return fail(f"You can review at most {MAX_BULK_REVIEW} proofs at once.")
+    if action not in (APPROVE, REJECT):
+        return fail("Invalid review action.")
+    if action == REJECT and not remarks:
+        return fail("A reason is required for rejection.")
+
+    agent_id = request.session['agent_id']
+    results, completed_jobs = review_proofs(agent_id, proof_ids, action, remarks)
+
+    done = [item for item in results if item['result'] in (APPROVED, REJECTED)]
+    if done:
+        invalidate_agent_dashboard(agent_id)
+
+    if wants_json:
+        return JsonResponse({
+            'results': results,
+            'completed_jobs': [{'id': job.id, 'title': job.title} for job in completed_jobs],
+        })
+
+    skipped = len(results) - len(done)
+    if done and action == APPROVE:
+        messages.success(request, f"{len(done)} proof(s) approved.")
+    elif done:
+        messages.warning(request, f"{len(done)} proof(s) rejected. Workers have been notified to resubmit.")
+    for job in completed_jobs:
+        messages.success(request, f"The job '{job.title}' has all its workers and is now marked as COMPLETED.")
+    if skipped:
+        already = sum(1 for item in results if item['result'] == ALREADY_REVIEWED)
+        messages.info(request, f"{skipped} proof(s) skipped ({already} already reviewed, {skipped - already} not found).")
+    return redirect('agent_review_dashboard')
+
+
 @client_required
 def delete_job(request, job_id):
     """
@@ -1301,7 +1840,7 @@ def delete_job(request, job_id):
     """
     try:
         # Get the logged-in client
-        client = Client.objects.get(id=request.session['client_id'])
+        client = load_principal(request, 'client')
     except (KeyError, Client.DoesNotExist):
         messages.error(request, "Session expired. Please log in.")
         return redirect('client_login')
@@ -1320,7 +1859,10 @@ def delete_job(request, job_id):
     # We will allow this, but a confirmation is essential.
 
     job_title = job.title
+    agent_id = job.agent_id
     job.delete()
+    invalidate_agent_dashboard(agent_id)
+    invalidate_job_board()
 
     messages.success(request, f"Job '{job_title}' and all related postings have been deleted.")
     return redirect('client_home')
@@ -1334,7 +1876,7 @@ def client_pay_for_job(request, job_id):
     Simulates a client paying an agent for a job.
     """
     try:
-        client = Client.objects.get(id=request.session['client_id'])
+        client = load_principal(request, 'client')
     except (KeyError, Client.DoesNotExist):
         messages.error(request, "Session expired. Please log in.")
         return redirect('client_login')
@@ -1348,6 +1890,9 @@ def client_pay_for_job(request, job_id):
 
     job.client_payment_status = 'paid'
     job.save()
+    invalidate_agent_dashboard(job.agent_id)
+    events.publish('agent', job.agent_id, events.PAYMENT, job_id=job.id,
+                   message=f"{client.name} paid for '{job.title}'.")
 
     messages.success(request, f"Payment for '{job.title}' was successful! The agent has been notified.")
     return redirect('client_home')
@@ -1363,14 +1908,14 @@ def agent_mark_worker_paid(request, application_id):
         return redirect('agent_home')
 
     try:
-        agent = Agent.objects.get(id=request.session['agent_id'])
+        agent = load_principal(request, 'agent')
     except Agent.DoesNotExist:
         messages.error(request, "Please log in.")
         return redirect('agent_login')
 
     # Get the application, ensuring it belongs to this agent and is 'COMPLETED'
     application = get_object_or_404(
-        Application,
+        Application.objects.select_related('worker', 'job_posting'),
         id=application_id,
         job_posting__agent=agent,
         status='COMPLETED'
@@ -1378,46 +1923,59 @@ def agent_mark_worker_paid(request, application_id):
 
     application.worker_payment_status = 'paid'
     application.save()
+    invalidate_agent_dashboard(agent.id)
+    events.publish('worker', application.worker_id, events.PAYMENT, application_id=application.id,
+                   message=f"You have been paid for '{application.job_posting.title}'.")
 
     messages.success(request, f"Worker {application.worker.name} has been marked as paid.")
     return redirect('agent_home')
 
 
+def parse_rating(value):
+    """
+    Returns the submitted star rating as an int from 1 to 5, or None.
+    """
+    try:
+        rating = int(value)
+    except (TypeError, ValueError):
+        return None
+    return rating if 1 <= rating <= 5 else None
+
+
 @client_required
 def client_rate_agent(request, job_id):
     if request.method == 'POST':
         try:
-            client = Client.objects.get(id=request.session['client_id'])
+            client = load_principal(request, 'client')
         except (KeyError, Client.DoesNotExist):
             return redirect('client_login')
 
         # Get the job, ensure it belongs to this client and is completed
         job = get_object_or_404(Job, id=job_id, client=client, status='COMPLETED')
 
-        # Ensure it hasn't been rated yet
-        if job.client_rating_for_agent is not None:
-            messages.error(request, "You have already rated this agent for this job.")
-            return redirect('client_home')
-
-        rating = request.POST.get('rating')
-        if not rating:
+        rating = parse_rating(request.POST.get('rating'))
+        if rating is None:
             messages.error(request, "Please select a rating.")
             return redirect('client_home')
 
-        # 1. Save the rating on the job
-        job.client_rating_for_agent = int(rating)
-        job.save()
+        with transaction.atomic():
+            # 1. Save the rating on the job, only if it hasn't been rated yet.
+            # The conditional UPDATE makes a double submit a no-op.
+            rated = Job.objects.filter(
+                pk=job.pk, client_rating_for_agent__isnull=True
+            ).update(client_rating_for_agent=rating)
 
-        # 2. Recalculate the agent's average rating
-        agent = job.agent
-        all_agent_ratings = Job.objects.filter(agent=agent, client_rating_for_agent__isnull=False).aggregate(
-            avg_rating=Avg('client_rating_for_agent')
-        )
+            # 2. Add it to the agent's running totals
+            if rated and job.agent_id:
+                add_agent_rating(job.agent_id, rating)
 
-        agent.rating = all_agent_ratings['avg_rating'] or 0.0
-        agent.save()
+        if not rated:
+            messages.error(request, "You have already rated this agent for this job.")
+            return redirect('client_home')
 
-        messages.success(request, f"You have successfully rated {agent.name} {rating} stars.")
+        invalidate_agent_dashboard(job.agent_id)
+        agent_name = job.agent.name if job.agent_id else "the agent"
+        messages.success(request, f"You have successfully rated {agent_name} {rating} stars.")
 
     return redirect('client_home')
 
@@ -1426,7 +1984,7 @@ def client_rate_agent(request, job_id):
 def agent_rate_worker(request, application_id):
     if request.method == 'POST':
         try:
-            agent = Agent.objects.get(id=request.session['agent_id'])
+            agent = load_principal(request, 'agent')
         except (KeyError, Agent.DoesNotExist):
             return redirect('agent_login')
 
@@ -1438,30 +1996,29 @@ def agent_rate_worker(request, application_id):
             status='COMPLETED'
         )
 
-        # Ensure it hasn't been rated yet
-        if application.agent_rating_for_worker is not None:
-            messages.error(request, "You have already rated this worker for this job.")
-            return redirect('agent_home')
-
-        rating = request.POST.get('rating')
-        if not rating:
+        rating = parse_rating(request.POST.get('rating'))
+        if rating is None:
             messages.error(request, "Please select a rating.")
             return redirect('agent_home')
 
-        # 1. Save the rating on the application
-        application.agent_rating_for_worker = int(rating)
-        application.save()
+        with transaction.atomic():
+            # 1. Save the rating on the application, only if it hasn't been
+            # rated yet. The conditional UPDATE makes a double submit a no-op.
+            rated = Application.objects.filter(
+                pk=application.pk, agent_rating_for_worker__isnull=True
+            ).update(agent_rating_for_worker=rating)
 
-        # 2. Recalculate the worker's average rating
-        worker = application.worker
-        all_worker_ratings = Application.objects.filter(worker=worker, agent_rating_for_worker__isnull=False).aggregate(
-            avg_rating=Avg('agent_rating_for_worker')
-        )
+            # 2. Add it to the worker's running totals
+            if rated:
+                add_worker_rating(application.worker_id, rating)
 
-        worker.rating = all_worker_ratings['avg_rating'] or 0.0
-        worker.save()
+        if not rated:
+            messages.error(request, "You have already rated this worker for this job.")
+            return redirect('agent_home')
 
-        messages.success(request, f"You have successfully rated {worker.name} {rating} stars.")
+        # The worker's rating is shown on the dashboards of the agents they worked for
+        invalidate_worker_dashboards(application.worker_id)
+        messages.success(request, f"You have successfully rated {application.worker.name} {rating} stars.")
 
     return redirect('agent_home')
 
@@ -1471,16 +2028,51 @@ def agent_rate_worker(request, application_id):
 @admin_required
 def admin_manage_jobs(request):
     """
-    Shows a new admin page to list all jobs in the system.
+    Lists the jobs in the system a page at a time, newest first, with
+    client and agent info.
     """
-    # Get all jobs, ordered by most recent, with client and agent info
-    all_jobs = Job.objects.select_related('client', 'agent').all().order_by('-created_at')
+    status, query = _list_filters(request, JOB_STATUSES)
+    try:
+        jobs, next_cursor = job_page(status, query, request.GET.get('cursor'))
+    except InvalidCursor:
+        jobs, next_cursor = job_page(status, query)
 
     return render(request, 'admin_manage_jobs.html', {
-        'jobs': all_jobs
+        'jobs': jobs,
+        'next_cursor': next_cursor,
+        'status': status,
+        'q': query,
+        'statuses': JOB_STATUSES,
+        'list_url': reverse('admin_manage_jobs'),
+        'bulk_url': reverse('admin_bulk_delete_jobs'),
     })
 
 
+@admin_required
+def admin_bulk_delete_jobs(request):
+    """
+    Deletes every job selected on the jobs page.
+    """
+    status, query = _list_filters(request, JOB_STATUSES)
+    back = _admin_list_url('admin_manage_jobs', status, query)
+    if request.method != 'POST':
+        return redirect(back)
+
+    try:
+        ids = _selected_ids(request)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect(back)
+
+    if request.POST.get('action') != DELETE:
+        messages.error(request, "Invalid action.")
+        return redirect(back)
+
+    count = bulk_delete_jobs(ids)
+    messages.error(request, f"{count} job(s) and all related data have been permanently deleted.")
+    return redirect(back)
+
+
 @admin_required
 def admin_delete_job(request, job_id):
     """
@@ -1492,6 +2084,8 @@ def admin_delete_job(request, job_id):
 
     if request.method == 'POST':
         job.delete()
+        invalidate_agent_dashboard(job.agent_id)
+        invalidate_job_board()
         messages.error(request, f"Job '{job_title}' and all related data have been permanently deleted.")
         return redirect('admin_manage_jobs')
 
@@ -1522,50 +2116,38 @@ def admin_job_detail(request, job_id):
 
 
 
-def haversine(lat1, lon1, lat2, lon2):
-
-    R = 6371
-
-    dLat = math.radians(lat2 - lat1)
-    dLon = math.radians(lon2 - lon1)
-    lat1 = math.radians(lat1)
-    lat2 = math.radians(lat2)
-
-    a = math.sin(dLat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dLon / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    distance = R * c
-    return distance
-
-
-def get_agents_near(request):
-
-    try:
-        job_lat = Decimal(request.GET.get('lat'))
-        job_lng = Decimal(request.GET.get('lng'))
-    except (TypeError, ValueError, InvalidOperation):
-        return JsonResponse({'error': 'Invalid location data'}, status=400)
-
-    SEARCH_RADIUS_KM = 50
-
-    all_agents = Agent.objects.filter(
-        status='approved',
-        latitude__isnull=False,
-        longitude__isnull=False
+async def event_stream(request):
+    """
+    Server-Sent Events stream of the logged-in agent / client / worker's
+    live events (see events.py). Only served under ASGI; a WSGI worker
+    answers 204 so the browser stops reconnecting.
+    """
+    role = await request.session.aget('user_role')
+    actor_id = await request.session.aget(f'{role}_id') if role in events.ROLES else None
+    if actor_id is None:
+        return JsonResponse({'error': 'Not logged in'}, status=403)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    subscription = events.get_bus().subscribe(
+        events.channel(role, actor_id), request.headers.get('Last-Event-ID')
     )
 
-    nearby_agents = []
-    for agent in all_agents:
-        distance = haversine(job_lat, job_lng, agent.latitude, agent.longitude)
-
-        if distance <= SEARCH_RADIUS_KM:
-            nearby_agents.append({
-                'id': agent.id,
-                'name': agent.name,
-                'agency_name': agent.agency_name,
-                'rating': agent.rating,
-                'distance': f"{distance:.1f}"
-            })
-
-    nearby_agents.sort(key=lambda x: float(x['distance']))
-
-    return JsonResponse({'agents': nearby_agents})
+    async def stream():
+        try:
+            yield f"retry: {events.EVENT_HEARTBEAT_SECONDS * 1000}\n\n"
+            while True:
+                received = await subscription.receive(events.EVENT_HEARTBEAT_SECONDS)
+                if not received:
+                    # Keeps proxies from timing out an idle connection
+                    yield ": keepalive\n\n"
+                for event in received:
+                    yield events.format_sse(event)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Tells nginx not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -2,6 +2,9 @@
 ASGI config for sidecrewproject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it (e.g. ``uvicorn sidecrewproject.asgi:application``) for the live
+dashboard events at /events/ (sidecrewapp/events.py); under WSGI the pages
+work the same without them.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -40,6 +40,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the other middleware too
+    'sidecrewapp.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,7 +55,8 @@ ROOT_URLCONF = 'sidecrewproject.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timing renders for the metrics (sidecrewapp/metrics.py)
+        'BACKEND': 'sidecrewapp.metrics.InstrumentedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'template')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -85,6 +88,102 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory is per process. When running more than one process, point
+# this at a shared backend (database, memcached, redis) so dashboard
+# invalidations reach every process.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sidecrew',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# Seconds an agent dashboard stays cached when nothing changes
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Seconds the admin_home statistics snapshot is reused (approvals, rejections
+# and deletes refresh it straight away)
+ADMIN_STATS_CACHE_TIMEOUT = 60
+
+# Rows per page on the admin management lists (manage_clients etc.)
+ADMIN_PAGE_SIZE = 50
+
+# Seconds the logged-in agent / client / worker is cached between requests
+PRINCIPAL_CACHE_TIMEOUT = 60
+
+# Background task queue (manage.py run_workers)
+TASK_WORKER_PROCESSES = 2
+# Seconds before a task whose worker went quiet is handed to another worker
+TASK_VISIBILITY_TIMEOUT = 300
+TASK_MAX_ATTEMPTS = 5
+
+# Chunked proof uploads (sidecrewapp/uploads.py). Chunks stay well below
+# the usual 1 MB reverse-proxy body limit.
+UPLOAD_CHUNK_SIZE = 512 * 1024
+UPLOAD_MAX_SIZE = 25 * 1024 * 1024
+UPLOAD_CHUNK_DIR = os.path.join(BASE_DIR, 'upload_chunks')
+
+
+# Password hashing (sidecrewapp/hashers.py). The first hasher hashes new
+# passwords; the others verify older hashes, which are upgraded on login.
+# scrypt with N=2**14, r=8 takes ~16 MB and ~50 ms per login on one core;
+# run `manage.py bench_logins` after changing the work factors.
+# Argon2 is opt-in: it needs argon2-cffi, which is not in requirements.txt.
+# Install it and put 'sidecrewapp.hashers.TunedArgon2PasswordHasher' first.
+PASSWORD_HASHERS = [
+    'sidecrewapp.hashers.TunedScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+SCRYPT_WORK_FACTOR = 2 ** 14
+SCRYPT_BLOCK_SIZE = 8
+SCRYPT_PARALLELISM = 1
+# Only used once the Argon2 hasher is added to PASSWORD_HASHERS
+ARGON2_TIME_COST = 2
+ARGON2_MEMORY_COST = 19 * 1024  # KiB
+ARGON2_PARALLELISM = 1
+
+# Login brute-force protection (sidecrewapp/logins.py): failed attempts
+# allowed per IP and per email from one IP within the window (seconds)
+LOGIN_RATE_WINDOW = 15 * 60
+LOGIN_MAX_FAILURES_PER_EMAIL_IP = 5
+LOGIN_MAX_FAILURES_PER_IP = 50
+# Past this many failures on an email from any IP, each further failure
+# doubles the wait before its next attempt, from 1 s up to 60 s
+LOGIN_BACKOFF_AFTER = 5
+LOGIN_BACKOFF_BASE = 1
+LOGIN_BACKOFF_MAX = 60
+# Behind a reverse proxy: the header holding the client address, e.g.
+# 'HTTP_X_FORWARDED_FOR', and how many proxies append to it
+LOGIN_CLIENT_IP_HEADER = None
+LOGIN_TRUSTED_PROXY_COUNT = 1
+
+# Live events (sidecrewapp/events.py), streamed from /events/ under ASGI.
+# LocalEventBus serves a single process; with several ASGI processes use
+# 'sidecrewapp.events.CacheEventBus' and a shared cache.
+EVENT_BUS = 'sidecrewapp.events.LocalEventBus'
+EVENT_HEARTBEAT_SECONDS = 15
+# CacheEventBus: seconds events are kept for reconnecting browsers, and
+# seconds between polls of the cache
+EVENT_RETENTION_SECONDS = 5 * 60
+EVENT_POLL_INTERVAL = 1.0
+
+# Threads for the distance math of the async map endpoints (sidecrewapp/api.py)
+API_DISTANCE_THREADS = 4
+
+# Per-view metrics (sidecrewapp/metrics.py), served at /metrics/ to admins
+# and to scrapers sending "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.environ.get('SIDECREW_METRICS_TOKEN')
+# Requests at least this slow (seconds) are logged with their slowest SQL
+METRICS_SLOW_REQUEST_SECONDS = 1.0
+METRICS_SLOW_LOG_SIZE = 20
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -128,6 +227,16 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Uploads are stored once per unique content (see sidecrewapp/storage.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'sidecrewapp.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,132 @@
+/*
+ * Live dashboard events (sidecrewapp/events.py).
+ *
+ * Listens to /events/ and, for each event, shows a short notification and
+ * patches the page in place:
+ *
+ * - rows that events carry as rendered html are swapped for the element
+ *   with the same data-live-item="application-ID", or appended to the
+ *   data-live-list they belong to;
+ * - data-live-count="NAME" shows the size of a list (or a count the event
+ *   moves by a delta), with data-live-plural="NAME" holding its "s" and
+ *   data-live-empty / data-live-nonempty="NAME" shown by whether it is 0;
+ * - data-live-status="job-ID" badges get the new label and colours.
+ *
+ * The server answers 204 when it cannot stream (WSGI), which closes the
+ * EventSource for good.
+ */
+(function () {
+    const script = document.currentScript;
+    if (!script || !window.EventSource) return;
+
+    const BADGE_COLOURS = {
+        'SEEKING_AGENT': 'bg-yellow-100 text-yellow-800',
+        'OPEN': 'bg-blue-100 text-blue-800',
+        'FILLED': 'bg-indigo-100 text-indigo-800',
+        'COMPLETED': 'bg-green-100 text-green-800',
+    };
+
+    let toasts = null;
+
+    // `refresh` adds a button to reload the page, for events it cannot patch
+    function notify(message, refresh = false) {
+        if (!toasts) {
+            toasts = document.createElement('div');
+            toasts.className = 'fixed bottom-4 right-4 z-50 flex flex-col gap-2 max-w-sm';
+            document.body.appendChild(toasts);
+        }
+        const toast = document.createElement('div');
+        toast.className = 'bg-slate-800 text-white text-sm rounded-lg shadow-lg px-4 py-3';
+        toast.textContent = message;
+        if (refresh) {
+            const reload = document.createElement('button');
+            reload.type = 'button';
+            reload.className = 'ml-3 underline font-semibold';
+            reload.textContent = 'Refresh';
+            reload.addEventListener('click', () => window.location.reload());
+            toast.appendChild(reload);
+        }
+        toasts.appendChild(toast);
+        setTimeout(() => toast.remove(), 8000);
+    }
+
+    function fragment(html) {
+        const template = document.createElement('template');
+        template.innerHTML = html.trim();
+        return template.content.firstElementChild;
+    }
+
+    function setCount(name, count) {
+        document.querySelectorAll(`[data-live-count="${name}"]`).forEach(element => {
+            element.textContent = count;
+        });
+        document.querySelectorAll(`[data-live-plural="${name}"]`).forEach(element => {
+            element.textContent = count === 1 ? '' : 's';
+        });
+        document.querySelectorAll(`[data-live-empty="${name}"]`).forEach(element => {
+            element.hidden = count > 0;
+        });
+        document.querySelectorAll(`[data-live-nonempty="${name}"]`).forEach(element => {
+            element.hidden = count === 0;
+        });
+    }
+
+    function addToCount(name, delta) {
+        const element = document.querySelector(`[data-live-count="${name}"]`);
+        if (!element) return;
+        const current = parseInt(element.textContent, 10) || 0;
+        setCount(name, Math.max(0, current + delta));
+    }
+
+    // Replaces the row with the same data-live-item, or appends it to `listName`
+    function putItem(html, listName) {
+        const item = fragment(html);
+        if (!item) return;
+        const current = document.querySelector(`[data-live-item="${item.dataset.liveItem}"]`);
+        if (current) {
+            current.replaceWith(item);
+            return;
+        }
+        const list = listName && document.querySelector(`[data-live-list="${listName}"]`);
+        if (!list) return;
+        const empty = list.querySelector(`[data-live-empty="${listName}"]`);
+        list.insertBefore(item, empty);
+        setCount(listName, list.querySelectorAll('[data-live-item]').length);
+    }
+
+    function setBadge(key, data) {
+        document.querySelectorAll(`[data-live-status="${key}"]`).forEach(badge => {
+            badge.textContent = data.label;
+            const colours = BADGE_COLOURS[data.status];
+            if (colours) {
+                badge.className = badge.className.replace(/\bbg-\S+|\btext-(?!xs\b)\S+/g, '').trim() + ' ' + colours;
+            }
+        });
+    }
+
+    const source = new EventSource(script.dataset.url);
+
+    source.addEventListener('application.created', event => {
+        const data = JSON.parse(event.data);
+        putItem(data.html, 'pending-applications');
+        notify(data.message);
+    });
+    source.addEventListener('proof.submitted', event => {
+        const data = JSON.parse(event.data);
+        addToCount('pending-proofs', data.pending_proofs_delta);
+        notify(data.message);
+    });
+    source.addEventListener('payment', event => {
+        notify(JSON.parse(event.data).message, true);
+    });
+    source.addEventListener('application.status', event => {
+        const data = JSON.parse(event.data);
+        putItem(data.html);
+        notify(data.message);
+    });
+    source.addEventListener('job.status', event => {
+        const data = JSON.parse(event.data);
+        setBadge(`job-${data.job_id}`, data);
+        notify(data.message);
+    });
+})();